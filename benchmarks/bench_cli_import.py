@@ -0,0 +1,145 @@
+# benchmarks/bench_cli_import.py
+"""
+CLI の起動（import）にかかる時間を `python -X importtime` で測り、予算を超えていないか確かめる。
+
+    python -m benchmarks.bench_cli_import
+    python -m benchmarks.bench_cli_import --budget-ms 100 --repeat 10
+
+- 新しいプロセスで `import src.steam_report_grader.cli` を --repeat 回流し、
+  -X importtime の累積時間（cumulative）の中央値を予算と比べる
+- 重い依存（pandas / numpy / scikit-learn / python-docx / openpyxl など）が
+  起動時に読み込まれていたら、時間に関係なく NG（どのモジュールから入ったかも出す）
+- NG なら終了コード 1（CI や変更前の確認に使う）
+
+GUI はコマンドごとに CLI を起動し直すので、ここが遅いと 1 回の実行全体が遅くなる。
+パイプラインは cli._dispatch の各コマンドの中で import すること。
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# CLI の import にかけてよい時間（ミリ秒、-X importtime の累積時間の中央値）
+CLI_IMPORT_BUDGET_MS = 150.0
+
+# 起動時に読み込んではいけないモジュール（トップレベルのパッケージ名）
+HEAVY_MODULES = ("pandas", "numpy", "scipy", "sklearn", "docx", "openpyxl", "requests", "tkinter")
+
+CLI_MODULE = "src.steam_report_grader.cli"
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    -X importtime の出力を (モジュール名, 自分の時間 us, 累積時間 us, 深さ) のリストにする。
+    深さはモジュール名の前の空白の数（2 つで 1 段）。
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # 見出し行（self [us] | cumulative | imported package）
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def _import_chain(rows: List[Tuple[str, int, int, int]], index: int) -> List[str]:
+    """
+    rows[index] のモジュールを読み込んだ親をたどる（importtime は子が親より先に出る）。
+    """
+    chain = [rows[index][0]]
+    depth = rows[index][3]
+    for name, _, _, d in rows[index + 1:]:
+        if d < depth:
+            chain.append(name)
+            depth = d
+            if d == 0:
+                break
+    return list(reversed(chain))
+
+
+def measure_once(module: str = CLI_MODULE) -> Dict[str, object]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = parse_importtime(proc.stderr)
+    index = next((i for i, r in enumerate(rows) if r[0] == module and r[3] == 0), None)
+    if index is None:
+        raise RuntimeError(f"{module} not found in -X importtime output")
+    cumulative_us = rows[index][2]
+
+    # module が読み込んだぶんだけ見る（site などインタプリタ起動時のものは除く）。
+    # importtime は子が親より先に出るので、1 つ前の深さ 0 の行の次から module の行まで
+    start = index
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    subtree = rows[start : index + 1]
+
+    heavy: Dict[str, List[str]] = {}
+    for i, (name, _, _, _) in enumerate(subtree):
+        top = name.split(".")[0]
+        if top in HEAVY_MODULES and top not in heavy:
+            heavy[top] = _import_chain(subtree, i)
+
+    # 累積時間の大きい、module から直接読まれたモジュール（深さ 1）
+    direct = sorted(
+        ((name, c) for name, _, c, d in subtree if d == 1),
+        key=lambda x: -x[1],
+    )
+    return {"cumulative_ms": cumulative_us / 1000.0, "heavy": heavy, "top": direct[:5]}
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="CLI import-time budget check (-X importtime)")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=CLI_IMPORT_BUDGET_MS,
+        help="import にかけてよい時間（ミリ秒、累積時間の中央値）",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="測る回数（中央値を使う）")
+    parser.add_argument("--module", default=CLI_MODULE, help="測るモジュール")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.module) for _ in range(max(1, args.repeat))]
+    times = [r["cumulative_ms"] for r in runs]
+    median_ms = statistics.median(times)
+    last = runs[-1]
+
+    print(f"{args.module}: median {median_ms:.1f} ms (min {min(times):.1f}, max {max(times):.1f}, "
+          f"n={len(times)}), budget {args.budget_ms:.1f} ms")
+    for name, c in last["top"]:
+        print(f"  {c / 1000.0:8.1f} ms  {name}")
+
+    ok = True
+    if last["heavy"]:
+        ok = False
+        for top, chain in sorted(last["heavy"].items()):
+            print(f"HEAVY IMPORT: {top} ({' -> '.join(chain)})")
+    if median_ms > args.budget_ms:
+        ok = False
+        print(f"OVER BUDGET: {median_ms:.1f} ms > {args.budget_ms:.1f} ms")
+
+    print("OK" if ok else "NG")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_final_report.py
+"""
+final-report の受験者数スケーリングを測るベンチマーク。
+
+    python -m benchmarks.bench_final_report --students 1000 5000
+    python -m benchmarks.bench_final_report --students 5000 --jobs 0 --zip
+
+合成した absolute_scores.csv / id_map.xlsx を一時ディレクトリに作り、
+run_final_report を丸ごと実行して「1受験者あたりの時間」を出す。
+受験者数を増やしても 1受験者あたりの時間がほぼ一定なら線形にスケールしている。
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.steam_report_grader.pipelines.final_report_pipeline import run_final_report
+
+
+def make_synthetic_cohort(
+    out_dir: Path,
+    n_students: int,
+    n_questions: int = 5,
+    seed: int = 0,
+) -> tuple[Path, Path]:
+    """
+    absolute_scores.csv と id_map.xlsx（sheet: id_map）を out_dir に書いてパスを返す。
+    """
+    rng = np.random.default_rng(seed)
+    sids = [f"S{i:05d}" for i in range(1, n_students + 1)]
+    questions = [f"Q{i}" for i in range(1, n_questions + 1)]
+
+    scores_df = pd.DataFrame(
+        {
+            "student_id": np.repeat(sids, n_questions),
+            "question": np.tile(questions, n_students),
+            "score": rng.integers(0, 11, size=n_students * n_questions),
+        }
+    )
+    scores_df["brief"] = "要点は押さえているが、根拠の説明がやや不足している。"
+    scores_df["detailed"] = "具体例を1つ加えると、主張と根拠のつながりが明確になる。" * 3
+
+    id_df = pd.DataFrame(
+        {
+            "student_id": sids,
+            "real_name": [f"受験者{i}" for i in range(1, n_students + 1)],
+            "source_file": [f"{sid}.docx" for sid in sids],
+        }
+    )
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    scores_csv = out_dir / "absolute_scores.csv"
+    id_map = out_dir / "steam_exam_id_map.xlsx"
+    scores_df.to_csv(scores_csv, index=False, encoding="utf-8-sig")
+    with pd.ExcelWriter(id_map, engine="openpyxl") as writer:
+        id_df.to_excel(writer, index=False, sheet_name="id_map")
+    return scores_csv, id_map
+
+
+def bench_once(
+    n_students: int,
+    n_questions: int,
+    jobs: int = 1,
+    bundle_zip: bool = False,
+) -> float:
+    """
+    一時ディレクトリで final-report を 1 回実行し、経過秒数を返す。
+    final_report_pipeline は data/intermediate/... を相対パスで読むので、
+    実データを拾わないよう一時ディレクトリに chdir して実行する。
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_final_report_") as tmp:
+        tmp_dir = Path(tmp)
+        scores_csv, id_map = make_synthetic_cohort(
+            tmp_dir / "in", n_students, n_questions
+        )
+        os.chdir(tmp_dir)
+        try:
+            start = time.perf_counter()
+            run_final_report(
+                absolute_scores_csv=scores_csv,
+                id_map_excel=id_map,
+                ranking_csv_path=tmp_dir / "final" / "ranking.csv",
+                feedback_dir=tmp_dir / "final" / "feedback",
+                log_path=tmp_dir / "final_report.log",
+                jobs=jobs,
+                feedback_zip=tmp_dir / "final" / "feedback.zip" if bundle_zip else None,
+            )
+            return time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="final-report scaling benchmark")
+    parser.add_argument(
+        "--students",
+        type=int,
+        nargs="+",
+        default=[1000, 5000],
+        help="計測する受験者数（複数指定可）",
+    )
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="final-report の --jobs（0 以下で CPU コア数）",
+    )
+    parser.add_argument("--zip", action="store_true", help="feedback.zip も書く")
+    args = parser.parse_args(argv)
+
+    # 受験者ごとの INFO ログで計測が埋もれないよう、ルートにハンドラを先に付けておく
+    # （setup_logging はハンドラがあれば何も追加しない）
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    print(f"{'students':>9} {'seconds':>9} {'ms/student':>11}")
+    for n in args.students:
+        elapsed = bench_once(n, args.questions, jobs=args.jobs, bundle_zip=args.zip)
+        print(f"{n:>9} {elapsed:>9.2f} {1000 * elapsed / n:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
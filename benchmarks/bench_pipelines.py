@@ -0,0 +1,432 @@
+# benchmarks/bench_pipelines.py
+"""
+パイプラインごとのスループットとピークメモリを、合成コホート＋Ollama もどきで測るベンチマーク。
+
+    python -m benchmarks.bench_pipelines --students 100 1000 10000
+    python -m benchmarks.bench_pipelines --students 1000 --scenarios score translate \\
+        --latency lognormal:0.5,0.4 --backends 2 --workers 4
+    python -m benchmarks.bench_pipelines --students 1000 --json after.json --baseline before.json
+
+- 受験者数ごとに一時ディレクトリへ docx コホートを作り、シナリオを依存順に流す
+  （final-report だけ指定しても、前段の preprocess / score は自動で走る）
+- シナリオは 1 つずつ別プロセス（spawn）で動かし、そのプロセスのピーク RSS を取る
+- LLM はすべて benchmarks.mock_ollama のサーバに向く（本物の GPU は要らない）
+- --baseline に以前の --json を渡すと、秒数の比（今回 / 前回）を並べて出す
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.steam_report_grader.config import SCORING_MAX_WORKERS
+
+from .mock_ollama import MockOllamaServer, install_mock_backends
+from .synthetic_cohort import make_docx_cohort
+
+# 比がこれを超えたら REGRESSION と表示する
+REGRESSION_RATIO = 1.2
+
+
+@dataclass
+class Workspace:
+    """
+    1 コホートぶんの入出力パス。パイプラインの既定パスは相対なので、実行時は root に chdir する。
+    """
+    root: Path
+    docx_dir: Path
+    rubric_dir: Path
+    ai_ref_dir: Path
+    workers: int = SCORING_MAX_WORKERS
+
+    @property
+    def excel_dir(self) -> Path:
+        return self.root / "excel"
+
+    @property
+    def features_dir(self) -> Path:
+        return self.root / "features"
+
+    @property
+    def responses(self) -> Path:
+        return self.excel_dir / "steam_exam_responses.xlsx"
+
+    @property
+    def id_map(self) -> Path:
+        return self.excel_dir / "steam_exam_id_map.xlsx"
+
+    @property
+    def scores_csv(self) -> Path:
+        return self.features_dir / "absolute_scores.csv"
+
+    @property
+    def log_path(self) -> Path:
+        return self.root / "bench.log"
+
+
+def _preprocess(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.preprocess_pipeline import run_preprocess
+
+    run_preprocess(docx_dir=ws.docx_dir, output_excel_dir=ws.excel_dir, log_path=ws.log_path)
+
+
+def _score(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.scoring_pipeline import run_scoring
+
+    run_scoring(
+        responses_excel_path=ws.responses,
+        rubric_dir=ws.rubric_dir,
+        output_path=ws.scores_csv,
+        log_path=ws.log_path,
+        max_workers=ws.workers,
+    )
+
+
+def _similarity(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.ai_similarity_pipeline import run_ai_similarity
+    from src.steam_report_grader.pipelines.peer_similarity_pipeline import run_peer_similarity
+    from src.steam_report_grader.pipelines.symbolic_features_pipeline import run_symbolic_features
+
+    run_ai_similarity(
+        responses_excel=ws.responses,
+        ai_reference_dir=ws.ai_ref_dir,
+        output_csv=ws.features_dir / "ai_similarity.csv",
+        log_path=ws.log_path,
+        index_path=ws.features_dir / "ai_similarity_index.sqlite",
+        full_recompute=True,
+    )
+    run_peer_similarity(
+        responses_excel=ws.responses,
+        per_student_output_csv=ws.features_dir / "peer_similarity_per_student.csv",
+        pair_output_csv=ws.features_dir / "peer_similarity_pairs.csv",
+        log_path=ws.log_path,
+        index_path=ws.features_dir / "peer_similarity_index.sqlite",
+    )
+    run_symbolic_features(
+        responses_excel=ws.responses,
+        output_csv=ws.features_dir / "symbolic_features.csv",
+        log_path=ws.log_path,
+    )
+
+
+def _ai_likeness(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.ai_likeness_pipeline import run_ai_likeness
+
+    run_ai_likeness(
+        responses_excel=ws.responses,
+        ai_similarity_csv=ws.features_dir / "ai_similarity.csv",
+        peer_similarity_csv=ws.features_dir / "peer_similarity_per_student.csv",
+        symbolic_features_csv=ws.features_dir / "symbolic_features.csv",
+        output_excel=ws.excel_dir / "ai_likeness_report.xlsx",
+        log_path=ws.log_path,
+        likeness_csv=ws.features_dir / "ai_likeness.csv",
+    )
+
+
+def _clustering(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.ai_cluster_pipeline import run_ai_cluster
+
+    run_ai_cluster(
+        responses_excel=ws.responses,
+        rubric_dir=ws.rubric_dir,
+        output_excel=ws.excel_dir / "ai_cluster_report.xlsx",
+        log_path=ws.log_path,
+    )
+
+
+def _explain(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.explanations_pipeline import run_explanations
+
+    run_explanations(
+        absolute_scores_csv=ws.scores_csv,
+        id_map_excel=ws.id_map,
+        output_excel=ws.excel_dir / "score_explanations.xlsx",
+        log_path=ws.log_path,
+    )
+
+
+def _translate(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.translate_reports_pipeline import run_translate_reports
+
+    run_translate_reports(
+        output_dir=ws.root,
+        log_path=ws.log_path,
+        memory_path=ws.root / "translation_memory.sqlite",
+        ai_likeness_csv=ws.features_dir / "ai_likeness.csv",
+    )
+
+
+def _final_report(ws: Workspace) -> None:
+    from src.steam_report_grader.pipelines.final_report_pipeline import run_final_report
+
+    final_dir = ws.root / "final"
+    run_final_report(
+        absolute_scores_csv=ws.scores_csv,
+        id_map_excel=ws.id_map,
+        ranking_csv_path=final_dir / "ranking.csv",
+        feedback_dir=final_dir / "feedback",
+        log_path=ws.log_path,
+    )
+
+
+# name → (前提シナリオ, 実行関数)。この順に流せば前提は必ず先に済んでいる
+SCENARIOS: Dict[str, Tuple[Tuple[str, ...], Callable[[Workspace], None]]] = {
+    "preprocess": ((), _preprocess),
+    "score": (("preprocess",), _score),
+    "similarity": (("preprocess",), _similarity),
+    "ai-likeness": (("similarity",), _ai_likeness),
+    "clustering": (("preprocess",), _clustering),
+    "explain": (("score",), _explain),
+    "translate": (("explain", "ai-likeness"), _translate),
+    "final-report": (("score",), _final_report),
+}
+
+DEFAULT_SCENARIOS = [
+    "preprocess",
+    "score",
+    "similarity",
+    "ai-likeness",
+    "clustering",
+    "translate",
+    "final-report",
+]
+
+
+def resolve_scenarios(selected: Sequence[str]) -> List[str]:
+    """
+    指定されたシナリオに前提シナリオを足して、SCENARIOS の順に並べる。
+    """
+    needed = set()
+
+    def _add(name: str) -> None:
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (choose from {list(SCENARIOS)})")
+        if name in needed:
+            return
+        needed.add(name)
+        for dep in SCENARIOS[name][0]:
+            _add(dep)
+
+    for name in selected:
+        _add(name)
+    return [name for name in SCENARIOS if name in needed]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # Linux は KiB、macOS は byte
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def _scenario_child(name: str, ws: Workspace, backend_urls: List[str], conn) -> None:
+    """
+    spawn した子プロセスの中で 1 シナリオだけ実行し、結果を conn に送る。
+    """
+    from src.steam_report_grader.utils.telemetry import reset_run_metrics
+
+    # パイプラインの INFO ログで計測が埋もれないよう、ルートにハンドラを先に付けておく
+    logging.getLogger().addHandler(logging.NullHandler())
+    os.chdir(ws.root)
+    install_mock_backends(backend_urls)
+    metrics = reset_run_metrics()
+
+    result: Dict[str, object] = {"scenario": name}
+    start = time.perf_counter()
+    try:
+        SCENARIOS[name][1](ws)
+        result["status"] = "ok"
+    except Exception as e:  # noqa: BLE001
+        result["status"] = f"error: {type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    result["llm_calls"] = sum(b["calls"] for b in metrics.to_dict()["llm"])
+    result["peak_rss_mb"] = _peak_rss_mb()
+    conn.send(result)
+    conn.close()
+
+
+def run_scenario(name: str, ws: Workspace, backend_urls: List[str]) -> Dict[str, object]:
+    ctx = mp.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_scenario_child, args=(name, ws, backend_urls, child_conn))
+    proc.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = {"scenario": name, "status": f"crashed (exit={proc.exitcode})"}
+    proc.join()
+    return result
+
+
+def bench_cohort(
+    n_students: int,
+    scenarios: Sequence[str],
+    backend_urls: List[str],
+    workers: int,
+    seed: int = 0,
+) -> List[Dict[str, object]]:
+    results: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory(prefix="bench_pipelines_") as tmp:
+        cohort = make_docx_cohort(Path(tmp) / "cohort", n_students, seed=seed)
+        ws = Workspace(
+            root=Path(tmp),
+            docx_dir=cohort.docx_dir,
+            rubric_dir=cohort.rubric_dir,
+            ai_ref_dir=cohort.ai_ref_dir,
+            workers=workers,
+        )
+        for name in scenarios:
+            result = run_scenario(name, ws, backend_urls)
+            result["students"] = n_students
+            seconds = result.get("seconds") or 0
+            result["students_per_s"] = round(n_students / seconds, 1) if seconds else None
+            results.append(result)
+            _print_row(result)
+            if result["status"] != "ok":
+                # 前段が落ちたら後段は入力が無いので打ち切る
+                break
+    return results
+
+
+_HEADER = (
+    f"{'students':>8} {'scenario':<13} {'seconds':>9} {'students/s':>11} "
+    f"{'llm_calls':>9} {'peak_rss_mb':>11} {'vs_base':>8}  status"
+)
+
+
+def _print_row(r: Dict[str, object], ratio: Optional[float] = None) -> None:
+    def _fmt(v: object, width: int, spec: str = "") -> str:
+        return f"{'-' if v is None else format(v, spec):>{width}}"
+
+    flag = ""
+    if ratio is not None and ratio > REGRESSION_RATIO:
+        flag = "  REGRESSION"
+    print(
+        f"{r['students']:>8} {r['scenario']:<13} "
+        f"{_fmt(r.get('seconds'), 9, '.2f')} {_fmt(r.get('students_per_s'), 11)} "
+        f"{_fmt(r.get('llm_calls'), 9)} {_fmt(r.get('peak_rss_mb'), 11)} "
+        f"{_fmt(ratio, 8, '.2f')}  {r['status']}{flag}",
+        flush=True,
+    )
+
+
+def compare_with_baseline(
+    results: List[Dict[str, object]],
+    baseline_path: Path,
+) -> None:
+    base = {
+        (r["students"], r["scenario"]): r
+        for r in json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    }
+    print(f"\nCompared with {baseline_path} (ratio = seconds now / seconds before)")
+    print(_HEADER)
+    for r in results:
+        b = base.get((r["students"], r["scenario"]))
+        ratio = None
+        if b and b.get("seconds") and r.get("seconds"):
+            ratio = round(float(r["seconds"]) / float(b["seconds"]), 2)
+        _print_row(r, ratio)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Pipeline throughput benchmark (mock Ollama)")
+    parser.add_argument(
+        "--students",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="コホートの受験者数（複数指定可）",
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        default=DEFAULT_SCENARIOS,
+        choices=list(SCENARIOS),
+        help="測るシナリオ（前提シナリオは自動で足される）",
+    )
+    parser.add_argument(
+        "--latency",
+        default="lognormal:0.005,0.5",
+        help="Ollama もどきのレイテンシ分布（fixed:S / uniform:A,B / lognormal:MEDIAN,SIGMA）",
+    )
+    parser.add_argument("--backends", type=int, default=2, help="立てる Ollama もどきの台数")
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=0,
+        help="Ollama もどき 1 台あたりの同時処理数（0 なら無制限）",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SCORING_MAX_WORKERS,
+        help="score の max_workers",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, default=None, help="結果を JSON で保存する")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="以前の --json と比べて遅くなったシナリオを表示する",
+    )
+    args = parser.parse_args(argv)
+
+    scenarios = resolve_scenarios(args.scenarios)
+    servers = [
+        MockOllamaServer(latency=args.latency, seed=args.seed + i, capacity=args.capacity).start()
+        for i in range(args.backends)
+    ]
+    backend_urls = [s.url for s in servers]
+
+    results: List[Dict[str, object]] = []
+    try:
+        print(f"mock backends: {', '.join(backend_urls)} (latency={args.latency})")
+        print(_HEADER)
+        for n in args.students:
+            results.extend(
+                bench_cohort(n, scenarios, backend_urls, workers=args.workers, seed=args.seed)
+            )
+    finally:
+        for s in servers:
+            s.stop()
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(
+            json.dumps(
+                {
+                    "latency": args.latency,
+                    "backends": args.backends,
+                    "capacity": args.capacity,
+                    "workers": args.workers,
+                    "results": results,
+                },
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"\nWrote {args.json}")
+
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+# benchmarks/mock_ollama.py
+"""
+GPU なしでパイプラインのスループットを測るための、Ollama もどきの HTTP サーバ。
+
+- POST /api/generate : レイテンシ分布に従って待ってから、定型の JSON を返す
+- GET  /api/tags     : モデル一覧（1 件だけ）
+
+ベンチマークからはスレッドで立てて使う:
+
+    with MockOllamaServer(latency="lognormal:0.02,0.5") as server:
+        install_mock_backends([server.url])
+        run_scoring(...)
+
+単体で立てて、ふつうの CLI をこのサーバに向けることもできる
+（config.OLLAMA_BASE_URLS と同じポートで立てる）:
+
+    python -m benchmarks.mock_ollama --port 11434 --port 11435 --latency fixed:0.2
+
+レイテンシ分布の書き方:
+- fixed:S             : 毎回 S 秒
+- uniform:A,B         : A〜B 秒の一様分布
+- lognormal:MEDIAN,SIGMA : 中央値 MEDIAN 秒の対数正規分布（LLM の応答時間はだいたいこの形）
+
+capacity を指定すると、同時に処理するのはその件数までで、残りはサーバ内で待たされる
+（GPU 1 台で捌ける数を超えると待ち行列が伸びる、本物の Ollama の挙動を真似る）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.steam_report_grader.config import DEFAULT_SCORING_MODEL
+
+# プロンプトに含まれる文字列 → 返す response（上から順に見て、最初に当たったもの）
+# どれにも当たらなければ最後の match="" が使われる
+DEFAULT_RESPONSES: List[Dict[str, str]] = [
+    {
+        # translate-reports（JSON ではなく訳文だけを返す）
+        "match": "Japanese translator",
+        "response": "要点は押さえているが、根拠の説明がやや不足している。",
+    },
+    {
+        # score / ai-likeness / ai-cluster / relative-features が読むキーを全部入れておく
+        "match": "",
+        "response": json.dumps(
+            {
+                "score": 3,
+                "subscores": {"understanding": 3, "reasoning": 2},
+                "summary_bullets": ["要点は押さえている", "根拠がやや不足"],
+                "detailed_explanation": "具体例を1つ加えると、主張と根拠のつながりが明確になる。",
+                "evidence": [{"aspect": "understanding", "quote": "STEAM"}],
+                "relative_summary": "STEAM 教育の意義を自分の経験と結びつけて説明している。",
+                "relative_quotes": ["STEAM", "dự án", "học sinh"],
+                "ai_likeness_score": 0.2,
+                "ai_likeness_comment": "定型的な表現は少ない。",
+                "ai_template_likeness": 0.3,
+                "summary": "STEAM 教育の意義を自分の経験と結びつけて説明している。",
+                "comment": "よくある構成だが、具体例は受験者ごとに異なる。",
+                "quotes": ["STEAM", "dự án", "học sinh"],
+            },
+            ensure_ascii=False,
+        ),
+    },
+]
+
+
+class LatencyModel:
+    """
+    "fixed:0.1" / "uniform:0.05,0.2" / "lognormal:0.5,0.4" から 1 回ぶんの待ち時間を引く。
+    """
+
+    def __init__(self, spec: str, seed: Optional[int] = 0) -> None:
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v.strip()] if params else []
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(values) != expected[kind]:
+            raise ValueError(
+                f"Invalid latency spec: {spec!r} "
+                "(use fixed:S / uniform:A,B / lognormal:MEDIAN,SIGMA)"
+            )
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.values[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.values)
+            median, sigma = self.values
+            if median <= 0:
+                return 0.0
+            return self._rng.lognormvariate(0.0, sigma) * median
+
+
+def load_responses(path: Path | str) -> List[Dict[str, str]]:
+    """
+    [{"match": "...", "response": "..."}, ...] 形式の JSON を読む。
+    response が dict ならそのまま JSON 文字列にして返す。
+    """
+    rules = json.loads(Path(path).read_text(encoding="utf-8"))
+    out: List[Dict[str, str]] = []
+    for rule in rules:
+        response = rule["response"]
+        if not isinstance(response, str):
+            response = json.dumps(response, ensure_ascii=False)
+        out.append({"match": str(rule.get("match", "")), "response": response})
+    return out
+
+
+def _pick_response(rules: Sequence[Dict[str, str]], prompt: str) -> str:
+    for rule in rules:
+        if rule["match"] in prompt:
+            return rule["response"]
+    return ""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    # リクエストごとのアクセスログは出さない
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.rstrip("/") != "/api/tags":
+            self._send_json(404, {"error": "not found"})
+            return
+        self._send_json(
+            200,
+            {
+                "models": [
+                    {
+                        "name": self.server.model,
+                        "model": self.server.model,
+                        "modified_at": datetime.now(timezone.utc).isoformat(),
+                        "size": 0,
+                        "details": {"family": "mock"},
+                    }
+                ]
+            },
+        )
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path.rstrip("/") != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        prompt = str(payload.get("prompt", ""))
+        latency = self.server.latency.sample()
+        with self.server.slots:
+            time.sleep(latency)
+        text = _pick_response(self.server.responses, prompt)
+        self.server.count_request()
+
+        # 本物の Ollama と同じく *_duration はナノ秒。待ち時間を prefill 3 : decode 7 に割り振る
+        prompt_tokens = max(len(prompt) // 4, 1)
+        eval_tokens = max(len(text) // 4, 1)
+        total_ns = int(latency * 1e9)
+        self._send_json(
+            200,
+            {
+                "model": payload.get("model", self.server.model),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": text,
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": total_ns,
+                "load_duration": 0,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(total_ns * 0.3),
+                "eval_count": eval_tokens,
+                "eval_duration": int(total_ns * 0.7),
+            },
+        )
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        latency: LatencyModel,
+        responses: Sequence[Dict[str, str]],
+        model: str,
+        capacity: int = 0,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.slots = threading.BoundedSemaphore(capacity) if capacity > 0 else nullcontext()
+        self.latency = latency
+        self.responses = list(responses)
+        self.model = model
+        self.requests = 0
+        self._count_lock = threading.Lock()
+
+    def count_request(self) -> None:
+        with self._count_lock:
+            self.requests += 1
+
+
+class MockOllamaServer:
+    """
+    バックグラウンドのスレッドで動く Ollama もどき。port=0 なら空いているポートを使う。
+    capacity > 0 なら同時処理数をその件数に抑える（0 なら無制限）。
+    """
+
+    def __init__(
+        self,
+        latency: str | LatencyModel = "fixed:0",
+        responses: Optional[Sequence[Dict[str, str]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        model: str = DEFAULT_SCORING_MODEL,
+        seed: Optional[int] = 0,
+        capacity: int = 0,
+    ) -> None:
+        if not isinstance(latency, LatencyModel):
+            latency = LatencyModel(latency, seed=seed)
+        self._server = _Server(
+            (host, port),
+            latency,
+            responses if responses is not None else DEFAULT_RESPONSES,
+            model,
+            capacity=capacity,
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name=f"mock-ollama-{self.url}",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MockOllamaServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def install_mock_backends(base_urls: Sequence[str]) -> None:
+    """
+    get_ollama_client() が返すグローバルプールを、base_urls に向けたものに差し替える。
+    （パイプラインは全部 get_ollama_client() 経由で LLM を呼ぶので、これだけで向き先が変わる）
+    """
+    from src.steam_report_grader.llm import ollama_pool
+
+    ollama_pool._llm_client_pool = ollama_pool.build_llm_pool(base_urls)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--port",
+        type=int,
+        action="append",
+        help="待ち受けるポート（複数指定で GPU 複数台ぶんのバックエンドを立てる。既定: 11434）",
+    )
+    parser.add_argument(
+        "--latency",
+        default="lognormal:0.5,0.4",
+        help="レイテンシ分布（fixed:S / uniform:A,B / lognormal:MEDIAN,SIGMA）",
+    )
+    parser.add_argument(
+        "--responses",
+        type=Path,
+        default=None,
+        help='定型応答の JSON（[{"match": "...", "response": ...}, ...]）',
+    )
+    parser.add_argument("--model", default=DEFAULT_SCORING_MODEL)
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=0,
+        help="1 台あたりの同時処理数（超えたぶんはサーバ内で待たされる。0 なら無制限）",
+    )
+    args = parser.parse_args(argv)
+
+    responses = load_responses(args.responses) if args.responses else None
+    servers = [
+        MockOllamaServer(
+            latency=args.latency,
+            responses=responses,
+            host=args.host,
+            port=port,
+            model=args.model,
+            seed=i,
+            capacity=args.capacity,
+        ).start()
+        for i, port in enumerate(args.port or [11434])
+    ]
+    print("Mock Ollama listening on " + ", ".join(s.url for s in servers))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for s in servers:
+            s.stop()
+
+
+if __name__ == "__main__":
+    main()
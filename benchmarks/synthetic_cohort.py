@@ -0,0 +1,185 @@
+# benchmarks/synthetic_cohort.py
+"""
+ベンチマーク用の合成コホート（受験者の docx・ルーブリック・AI 参照解答）を作る。
+
+    cohort = make_docx_cohort(Path("/tmp/cohort"), n_students=1000)
+    run_preprocess(docx_dir=cohort.docx_dir, ...)
+
+docx は本番と同じベトナム語の書式（'Họ và tên: … Số thứ tự: …' /
+'Câu k: …' / 'Phần trả lời câu hỏi k: …'）で書くので、preprocess からそのまま流せる。
+類似度系が現実に近い分布になるよう、
+- 回答は設問ごとの文プールから文を選んで組み立てる（ある程度は他人と文が重なる）
+- ai_copy_rate の割合で AI 参照解答をほぼ丸写しした回答を混ぜる
+- ring_rate の割合で他の受験者の回答を丸写しした回答を混ぜる
+"""
+from __future__ import annotations
+
+import argparse
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from docx import Document
+
+from src.steam_report_grader.config import QUESTION_COUNT
+from src.steam_report_grader.io.docx_template import DocxTemplate
+
+_WORDS = (
+    "học sinh giáo viên dự án STEAM khoa học công nghệ kỹ thuật nghệ thuật toán học "
+    "thí nghiệm sáng tạo hợp tác nhóm kỹ năng tư duy phản biện giải quyết vấn đề "
+    "thực tế cuộc sống bài học mô hình thiết kế đánh giá kết quả phát triển năng lực "
+    "trải nghiệm hoạt động lớp học trường môi trường cộng đồng năng lượng nước cây "
+    "robot lập trình dữ liệu câu hỏi ý tưởng sản phẩm trình bày thảo luận chia sẻ "
+    "quan sát đo lường phân tích so sánh kết luận cải tiến"
+).split()
+
+_QUESTION_TEXTS = [
+    "Hãy trình bày ý nghĩa của giáo dục STEAM.",
+    "Hãy mô tả một dự án STEAM mà em đã thực hiện.",
+    "Vai trò của giáo viên trong lớp học STEAM là gì?",
+    "Làm thế nào để đánh giá năng lực học sinh trong dự án?",
+    "Hãy đề xuất một hoạt động STEAM cho cộng đồng.",
+]
+
+
+@dataclass
+class SyntheticCohort:
+    root: Path
+    docx_dir: Path
+    rubric_dir: Path
+    ai_ref_dir: Path
+    n_students: int
+    questions: List[str]
+
+
+def _sentence(rng: np.random.Generator) -> str:
+    words = rng.choice(_WORDS, size=int(rng.integers(8, 20)))
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + "."
+
+
+def _build_docx_template() -> DocxTemplate:
+    doc = Document()
+    doc.add_paragraph("Họ và tên: {{name}} Số thứ tự: {{number}}")
+    doc.add_paragraph("{{#questions}}")
+    doc.add_paragraph("Câu {{qnum}}: {{question_text}}")
+    doc.add_paragraph("Phần trả lời câu hỏi {{qnum}}: {{answer}}")
+    doc.add_paragraph("{{/questions}}")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return DocxTemplate.from_bytes(buf.getvalue())
+
+
+def _question_text(q: int) -> str:
+    return _QUESTION_TEXTS[(q - 1) % len(_QUESTION_TEXTS)]
+
+
+def make_docx_cohort(
+    out_dir: Path,
+    n_students: int,
+    n_questions: int = QUESTION_COUNT,
+    seed: int = 0,
+    sentence_pool: int = 300,
+    ai_refs_per_question: int = 3,
+    ai_copy_rate: float = 0.05,
+    ring_rate: float = 0.02,
+) -> SyntheticCohort:
+    """
+    out_dir 以下に docx/ rubric/ ai_reference/ を作って SyntheticCohort を返す。
+    同じ seed なら同じ中身になる。
+    """
+    rng = np.random.default_rng(seed)
+    out_dir = Path(out_dir)
+    docx_dir = out_dir / "docx"
+    rubric_dir = out_dir / "rubric"
+    ai_ref_dir = out_dir / "ai_reference"
+    for d in (docx_dir, rubric_dir, ai_ref_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    questions = [f"Q{q}" for q in range(1, n_questions + 1)]
+    pools: Dict[str, List[str]] = {
+        q: [_sentence(rng) for _ in range(sentence_pool)] for q in questions
+    }
+
+    # ルーブリック（最初の空行までが設問文）と AI 参照解答
+    ai_refs: Dict[str, List[str]] = {}
+    for i, q in enumerate(questions, start=1):
+        (rubric_dir / f"{q}.txt").write_text(
+            f"{_question_text(i)}\n\n"
+            "- 設問の意図を理解しているか（2点）\n"
+            "- 具体例や経験に基づいて説明しているか（2点）\n"
+            "- 論理的に一貫しているか（1点）\n",
+            encoding="utf-8",
+        )
+        q_dir = ai_ref_dir / q
+        q_dir.mkdir(exist_ok=True)
+        ai_refs[q] = []
+        for r in range(1, ai_refs_per_question + 1):
+            text = " ".join(_sentence(rng) for _ in range(8))
+            (q_dir / f"synthetic_ai_v{r}_{q}.md").write_text(text, encoding="utf-8")
+            ai_refs[q].append(text)
+
+    template = _build_docx_template()
+    answers_by_student: List[Dict[str, str]] = []
+    for idx in range(n_students):
+        answers: Dict[str, str] = {}
+        for q in questions:
+            draw = rng.random()
+            if draw < ai_copy_rate:
+                # AI 参照解答の丸写し（末尾に 1 文だけ足す）
+                ref = ai_refs[q][int(rng.integers(len(ai_refs[q])))]
+                answers[q] = ref + " " + _sentence(rng)
+            elif draw < ai_copy_rate + ring_rate and answers_by_student:
+                # 先に書いた受験者の回答をそのまま写す
+                other = answers_by_student[int(rng.integers(len(answers_by_student)))]
+                answers[q] = other[q]
+            else:
+                picks = rng.choice(len(pools[q]), size=int(rng.integers(4, 10)), replace=False)
+                answers[q] = " ".join(pools[q][p] for p in picks)
+        answers_by_student.append(answers)
+
+        template.render(
+            {
+                "name": f"Nguyễn Văn {idx + 1:05d}",
+                "number": idx + 1,
+                "questions": [
+                    {
+                        "qnum": i,
+                        "question_text": _question_text(i),
+                        "answer": answers[q],
+                    }
+                    for i, q in enumerate(questions, start=1)
+                ],
+            },
+            docx_dir / f"student_{idx + 1:05d}.docx",
+        )
+
+    return SyntheticCohort(
+        root=out_dir,
+        docx_dir=docx_dir,
+        rubric_dir=rubric_dir,
+        ai_ref_dir=ai_ref_dir,
+        n_students=n_students,
+        questions=questions,
+    )
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic docx cohort")
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=QUESTION_COUNT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    cohort = make_docx_cohort(args.output, args.students, args.questions, seed=args.seed)
+    print(
+        f"Wrote {cohort.n_students} docx to {cohort.docx_dir} "
+        f"(rubric: {cohort.rubric_dir}, ai_reference: {cohort.ai_ref_dir})"
+    )
+
+
+if __name__ == "__main__":
+    main()
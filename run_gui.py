@@ -22,6 +22,7 @@ PIPELINE_STEPS: list[list[str]] = [
     ["ai-similarity"],
     ["ai-cluster"],
     ["peer-similarity"],
+    ["plagiarism-rings"],
     ["symbolic-features"],
     ["ai-likeness"],
     ["ai-report"],
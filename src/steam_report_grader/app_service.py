@@ -70,10 +70,11 @@ def run_full_pipeline(
         6. ai-similarity     # AI模範解答との類似度
         7. ai-cluster        # AIテンプレ検出クラスタ分析
         8. peer-similarity   # 受験者同士の類似度
-        9. symbolic-features # 記号的特徴抽出
-       10. ai-likeness       # AI疑惑スコア
-       11. ai-report         # 総合レポート（中間）
-       12. final-report      # 最終総合レポート出力
+        9. plagiarism-rings  # 設問をまたいだ盗用リング検出
+       10. symbolic-features # 記号的特徴抽出
+       11. ai-likeness       # AI疑惑スコア
+       12. ai-report         # 総合レポート（中間）
+       13. final-report      # 最終総合レポート出力
 
     戻り値:
         FullPipelineResult (最終レポート出力ディレクトリなど)
@@ -104,16 +105,19 @@ def run_full_pipeline(
     # 8. 受験者同士の類似度
     _run_cli(project_root, ["peer-similarity"])
 
-    # 9. 記号的特徴を抽出
+    # 9. 盗用リング検出（peer-similarity のペア表から）
+    _run_cli(project_root, ["plagiarism-rings"])
+
+    # 10. 記号的特徴を抽出
     _run_cli(project_root, ["symbolic-features"])
 
-    # 10. AI疑惑スコア
+    # 11. AI疑惑スコア
     _run_cli(project_root, ["ai-likeness", "--model", model_name])
 
-    # 11. 総合レポート（中間）
+    # 12. 総合レポート（中間）
     _run_cli(project_root, ["ai-report"])
 
-    # 12. 最終総合レポート
+    # 13. 最終総合レポート
     scores_csv = Path("data/intermediate/features/absolute_scores.csv")
     id_map = Path("data/outputs/excel/steam_exam_id_map.xlsx")
     output_dir = Path("data/outputs/final")
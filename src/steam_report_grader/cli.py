@@ -5,25 +5,14 @@ import os
 os.environ.setdefault("LOKY_MAX_CPU_COUNT", "8")  # ← 自分のPCに合わせて変更
 
 import argparse
+from datetime import datetime
 from pathlib import Path
-import argparse
-from .pipelines.summary_pipeline import run_summary
-from .pipelines.preprocess_pipeline import run_preprocess
-from .pipelines.scoring_pipeline import run_scoring
-from .pipelines.explanations_pipeline import run_explanations
-from .pipelines.ai_similarity_pipeline import run_ai_similarity
-from .pipelines.ai_ref_import_pipeline import run_import_ai_ref
-from .pipelines.ai_ref_import_all_pipeline import run_import_all_ai_ref
-from .pipelines.ai_cluster_pipeline import run_ai_cluster
-from .pipelines.peer_similarity_pipeline import run_peer_similarity
-from .pipelines.symbolic_features_pipeline import run_symbolic_features
-from .pipelines.ai_likeness_pipeline import run_ai_likeness
-from .pipelines.ai_report_pipeline import run_ai_report
-from .pipelines.final_report_pipeline import run_final_report
+
+# パイプライン（pandas / scikit-learn / python-docx / openpyxl などを読み込む）は
+# _dispatch の各コマンドの中で import する。GUI はコマンドごとに CLI を起動し直すので、
+# どのコマンドでも起動時に全部を読み込まないようにしておく（benchmarks/bench_cli_import.py で確認）
 from .utils.audit_logger import log_audit_record
-from .pipelines.translate_reports_pipeline import run_translate_reports
-from .pipelines.relative_features_pipeline import run_relative_features
-from .pipelines.relative_ranking_pipeline import run_relative_ranking
+from .utils.telemetry import get_run_metrics
 
 from .config import (
     DEFAULT_SCORING_MODEL,
@@ -32,6 +21,25 @@ from .config import (
     DEFAULT_TRANSLATION_MODEL,
     LLM_SCORING_TIMEOUT,
     SCORING_MAX_WORKERS,
+    SCORING_INCLUDE_RELATIVE_FEATURES,
+    RELATIVE_FEATURES_MAX_WORKERS,
+    LLM_RELATIVE_FEATURES_MAX_TOKENS,
+    RELATIVE_RANKING_TOP_K,
+    FEATURE_JOBS,
+    FEEDBACK_JOBS,
+    FEEDBACK_DOCX_TEMPLATE,
+    TRANSLATION_MEMORY_PATH,
+    PEER_SIMILARITY_INDEX_PATH,
+    AI_SIMILARITY_INDEX_PATH,
+    RUN_METRICS_PATH,
+    WATCH_POLL_INTERVAL_S,
+    STREAM_QUEUE_MAXSIZE,
+    WATCH_STATE_PATH,
+    PEER_PAIR_TOP_K,
+    PEER_PAIR_MIN_SIMILARITY,
+    PEER_PAIR_FORMAT,
+    RING_MIN_SIMILARITY,
+    RING_MIN_SIZE,
     OLLAMA_DEFAULT_TEMPERATURE,
     OLLAMA_DEFAULT_SEED,
 )
@@ -57,6 +65,11 @@ def main():
         default=Path("data/outputs/excel"),
         help="Excel を出力するディレクトリ",
     )
+    p_pre.add_argument(
+        "--renumber-ids",
+        action="store_true",
+        help="ID 台帳（steam_exam_id_registry.json）を使わず、ファイル名順に S001 から振り直す",
+    )
     p_pre.add_argument(
         "--log-path",
         type=Path,
@@ -117,6 +130,71 @@ def main():
         default=int(LLM_SCORING_TIMEOUT),
         help="Ollamaのタイムアウト秒数（秒、config で変更可能）",
     )
+    p_score.add_argument(
+        "--with-relative-features",
+        action="store_true",
+        default=SCORING_INCLUDE_RELATIVE_FEATURES,
+        help="採点と同じ応答で relative-features 用の要約・引用も出力する",
+    )
+
+    # === preprocess-score ===
+    p_ps = subparsers.add_parser(
+        "preprocess-score",
+        help="preprocess と score を 1 回で流す（docx を読み終えた答案から順に採点する）",
+    )
+    p_ps.add_argument(
+        "--docx-dir",
+        type=Path,
+        default=Path("data/raw/docx"),
+        help="Word ファイルが入っているディレクトリ",
+    )
+    p_ps.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("data/outputs/excel"),
+        help="回答Excel・IDマップを出力するディレクトリ（全部読み終えてから書く）",
+    )
+    p_ps.add_argument(
+        "--rubric-dir",
+        type=Path,
+        default=Path("data/raw/rubric"),
+        help="ルーブリックテキストを置いたディレクトリ",
+    )
+    p_ps.add_argument(
+        "--output-csv",
+        type=Path,
+        default=Path("data/intermediate/features/absolute_scores.csv"),
+        help="採点結果 CSV の出力先",
+    )
+    p_ps.add_argument(
+        "--workers",
+        type=int,
+        default=SCORING_MAX_WORKERS,
+        help="並列で採点するワーカー数",
+    )
+    p_ps.add_argument(
+        "--queue-size",
+        type=int,
+        default=STREAM_QUEUE_MAXSIZE,
+        help="読み終えて採点待ちの答案を何件まで溜めるか",
+    )
+    p_ps.add_argument(
+        "--with-relative-features",
+        action="store_true",
+        default=SCORING_INCLUDE_RELATIVE_FEATURES,
+        help="採点と同じ応答で relative-features 用の要約・引用も出力する",
+    )
+    p_ps.add_argument(
+        "--renumber-ids",
+        action="store_true",
+        help="ID 台帳（steam_exam_id_registry.json）を使わず、ファイル名順に S001 から振り直す",
+    )
+    p_ps.add_argument(
+        "--log-path",
+        type=Path,
+        default=Path("logs/app.log"),
+        help="ログファイルのパス",
+    )
 
 
 
@@ -198,6 +276,23 @@ def main():
         default=Path("data/intermediate/features/ai_similarity.csv"),
         help="類似度特徴量の出力先 CSV",
     )
+    p_ai.add_argument(
+        "--index-path",
+        type=Path,
+        default=Path(AI_SIMILARITY_INDEX_PATH),
+        help="比べ終わった AI参照と集計値の保存先（次回は新しい参照とだけ比べる）",
+    )
+    p_ai.add_argument(
+        "--full-recompute",
+        action="store_true",
+        help="保存済みの集計を使わず、全回答 × 全AI参照で計算し直す",
+    )
+    p_ai.add_argument(
+        "--jobs",
+        type=int,
+        default=FEATURE_JOBS,
+        help="設問ごとに並列で回すプロセス数（1=逐次, 0=CPUコア数）",
+    )
     p_ai.add_argument(
         "--log-path",
         type=Path,
@@ -298,6 +393,12 @@ def main():
         default="ollama",
         help="LLM プロバイダ (例: ollama, openai)",
     )
+    p_aic.add_argument(
+        "--jobs",
+        type=int,
+        default=FEATURE_JOBS,
+        help="設問ごとに並列で回すプロセス数（1=逐次, 0=CPUコア数）",
+    )
 
 
     # === peer-similarity ===
@@ -323,6 +424,43 @@ def main():
         default=Path("data/intermediate/features/peer_similarity_pairs.csv"),
         help="受験者ペアごとの類似度CSV",
     )
+    p_peer.add_argument(
+        "--pair-top-k",
+        type=int,
+        default=PEER_PAIR_TOP_K,
+        help="ペア表に残す、各受験者の類似度上位ペア数（省略時は全ペア）",
+    )
+    p_peer.add_argument(
+        "--pair-min-similarity",
+        type=float,
+        default=PEER_PAIR_MIN_SIMILARITY,
+        help="この類似度以上のペアは top-k に関係なくペア表に残す",
+    )
+    p_peer.add_argument(
+        "--pair-format",
+        type=str,
+        choices=["csv", "compact"],
+        default=PEER_PAIR_FORMAT,
+        help="ペア表の出力形式: csv=従来のCSV, compact=.bin(int32 index + float32) + .meta.json",
+    )
+    p_peer.add_argument(
+        "--index-path",
+        type=Path,
+        default=Path(PEER_SIMILARITY_INDEX_PATH),
+        help="差分更新用の索引（SQLite）。全件計算のたびに書き直す",
+    )
+    p_peer.add_argument(
+        "--incremental",
+        action="store_true",
+        help="索引に無い受験者（遅れて届いたレポート）だけを全員と比べて結果を更新する"
+        "（索引が無い・回答が変わった受験者がいるときは全件計算）",
+    )
+    p_peer.add_argument(
+        "--jobs",
+        type=int,
+        default=FEATURE_JOBS,
+        help="設問ごとに並列で回すプロセス数（1=逐次, 0=CPUコア数）",
+    )
 
     p_peer.add_argument(
         "--log-path",
@@ -330,6 +468,41 @@ def main():
         default=Path("logs/app.log"),
         help="ログファイルのパス",
     )
+    # === plagiarism-rings ===
+    p_rings = subparsers.add_parser(
+        "plagiarism-rings",
+        help="設問をまたいだ高類似度ペアから盗用リング（連結成分）を検出する",
+    )
+    p_rings.add_argument(
+        "--pair-input",
+        type=Path,
+        default=Path("data/intermediate/features/peer_similarity_pairs.csv"),
+        help="peer-similarity のペア表（CSV、または同名のコンパクト形式 .bin）",
+    )
+    p_rings.add_argument(
+        "--output-csv",
+        type=Path,
+        default=Path("data/intermediate/features/plagiarism_rings.csv"),
+        help="リング表（1行=1受験者）の出力先CSV",
+    )
+    p_rings.add_argument(
+        "--min-similarity",
+        type=float,
+        default=RING_MIN_SIMILARITY,
+        help="この類似度以上のペアをつながりとみなす",
+    )
+    p_rings.add_argument(
+        "--min-ring-size",
+        type=int,
+        default=RING_MIN_SIZE,
+        help="この人数以上の連結成分だけをリングとして出力する",
+    )
+    p_rings.add_argument(
+        "--log-path",
+        type=Path,
+        default=Path("logs/app.log"),
+        help="ログファイルのパス",
+    )
     # === symbolic-features ===
     p_symbolic = subparsers.add_parser(
         "symbolic-features",
@@ -347,6 +520,12 @@ def main():
         default=Path("data/intermediate/features/symbolic_features.csv"),
         help="記号的特徴量を出力するCSVファイル",
     )
+    p_symbolic.add_argument(
+        "--jobs",
+        type=int,
+        default=FEATURE_JOBS,
+        help="設問ごとに並列で回すプロセス数（1=逐次, 0=CPUコア数）",
+    )
     p_symbolic.add_argument(
         "--log-path",
         type=Path,
@@ -496,6 +675,36 @@ def main():
         default=Path("data/outputs/final"),
         help="ranking.csv / feedback_*.md を出力するディレクトリ",
     )
+    p_final.add_argument(
+        "--jobs",
+        type=int,
+        default=FEEDBACK_JOBS,
+        help="フィードバック生成のプロセス数（1=逐次, 0 以下=CPU コア数）",
+    )
+    p_final.add_argument(
+        "--feedback-zip",
+        type=Path,
+        default=None,
+        help="指定すると md / docx をすべてこの zip にもまとめる",
+    )
+    p_final.add_argument(
+        "--docx-template",
+        type=Path,
+        default=Path(FEEDBACK_DOCX_TEMPLATE),
+        help="フィードバック docx のテンプレート（なければ組み込みテンプレート）",
+    )
+
+    # === feedback-template ===
+    p_ftpl = subparsers.add_parser(
+        "feedback-template",
+        help="final-report 用の docx テンプレート（編集用の雛形）を書き出す",
+    )
+    p_ftpl.add_argument(
+        "--output",
+        type=Path,
+        default=Path(FEEDBACK_DOCX_TEMPLATE),
+        help="テンプレートの出力先",
+    )
     p_final.add_argument(
         "--log-path",
         type=Path,
@@ -538,6 +747,23 @@ def main():
         action="store_true",
         help="元の Excel を上書きする（デフォルトは *_ja.xlsx を新規作成）",
     )
+    p_trans.add_argument(
+        "--only-suspected",
+        action="store_true",
+        help="ai_likeness_score が AI_SUSPECT_THRESHOLD 以上の行だけ翻訳する",
+    )
+    p_trans.add_argument(
+        "--rows",
+        nargs="+",
+        default=None,
+        help="翻訳する行を指定（例: S001 S014:Q3）。--only-suspected と併用可",
+    )
+    p_trans.add_argument(
+        "--memory-path",
+        type=Path,
+        default=Path(TRANSLATION_MEMORY_PATH),
+        help="翻訳メモリ（SQLite）のパス",
+    )
 
     # 圧縮特徴抽出
     p_rf = subparsers.add_parser("relative-features", help="圧縮特徴量を抽出する（要約と引用）")
@@ -547,6 +773,23 @@ def main():
     p_rf.add_argument("--model", type=str, default="gpt-os")  # 任意に変更
     p_rf.add_argument("--llm-provider", type=str, default="ollama")
     p_rf.add_argument("--log-path", type=Path, default=Path("logs/app.log"))
+    p_rf.add_argument(
+        "--max-workers",
+        type=int,
+        default=RELATIVE_FEATURES_MAX_WORKERS,
+        help="LLM 並列ワーカー数（デフォルトは config.RELATIVE_FEATURES_MAX_WORKERS）",
+    )
+    p_rf.add_argument(
+        "--max-tokens",
+        type=int,
+        default=LLM_RELATIVE_FEATURES_MAX_TOKENS,
+        help="1 回の LLM 呼び出しで生成する最大トークン数",
+    )
+    p_rf.add_argument(
+        "--resume",
+        action="store_true",
+        help="{output}.journal.jsonl に残っている結果を再利用し、未処理分だけ実行する",
+    )
 
     # 相対順位計算
     p_rr = subparsers.add_parser("relative-ranking", help="相対スコアと順位を計算してranking.csvに追加")
@@ -554,20 +797,138 @@ def main():
     p_rr.add_argument("--scores-csv", type=Path, default=Path("data/intermediate/features/absolute_scores.csv"))
     p_rr.add_argument("--ranking-csv", type=Path, default=Path("data/outputs/final/ranking.csv"))
     p_rr.add_argument("--log-path", type=Path, default=Path("logs/app.log"))
+    p_rr.add_argument(
+        "--top-k",
+        type=int,
+        default=RELATIVE_RANKING_TOP_K,
+        help="似ている受験者の上位 K 人を relative_top_peers 列に出す（0 なら出さない）",
+    )
+    p_rr.add_argument(
+        "--verify-dense",
+        action="store_true",
+        help="小さい受験者数のとき、平均コサイン類似度を従来の N×N 行列計算と突き合わせる",
+    )
+
+    # === watch ===
+    p_watch = subparsers.add_parser(
+        "watch",
+        help="提出フォルダを見張り、届いた答案をその場で取り込み・採点・類似度計算する",
+    )
+    p_watch.add_argument(
+        "--docx-dir",
+        type=Path,
+        default=Path("data/raw/docx"),
+        help="Word ファイルが届くディレクトリ",
+    )
+    p_watch.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("data/outputs/excel"),
+        help="回答Excel・IDマップを出力するディレクトリ",
+    )
+    p_watch.add_argument(
+        "--rubric-dir",
+        type=Path,
+        default=Path("data/raw/rubric"),
+    )
+    p_watch.add_argument(
+        "--scores-csv",
+        type=Path,
+        default=Path("data/intermediate/features/absolute_scores.csv"),
+        help="採点結果 CSV（{scores-csv}.journal.jsonl に 1 件ずつ追記する）",
+    )
+    p_watch.add_argument(
+        "--features-dir",
+        type=Path,
+        default=Path("data/intermediate/features"),
+        help="ai_similarity.csv / peer_similarity_*.csv とその索引の出力先",
+    )
+    p_watch.add_argument(
+        "--ai-ref-dir",
+        type=Path,
+        default=Path("data/raw/ai_reference"),
+        help="AI模範解答テキストのベースディレクトリ",
+    )
+    p_watch.add_argument(
+        "--poll-interval",
+        type=float,
+        default=WATCH_POLL_INTERVAL_S,
+        help="フォルダを見に行く間隔（秒）",
+    )
+    p_watch.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        default=None,
+        help="この日時（例: 2025-07-31T23:59）を過ぎたら止まる（省略時は Ctrl+C まで）",
+    )
+    p_watch.add_argument(
+        "--once",
+        action="store_true",
+        help="今ある答案を 1 回処理して終わる（cron などから呼ぶとき）",
+    )
+    p_watch.add_argument(
+        "--no-similarity",
+        action="store_true",
+        help="ai-similarity / peer-similarity の差分更新をしない（採点だけ）",
+    )
+    p_watch.add_argument(
+        "--state-path",
+        type=Path,
+        default=Path(WATCH_STATE_PATH),
+        help="取り込み済み docx の一覧（SQLite）",
+    )
+    p_watch.add_argument(
+        "--workers",
+        type=int,
+        default=SCORING_MAX_WORKERS,
+        help="採点の並列スレッド数",
+    )
+    p_watch.add_argument(
+        "--with-relative-features",
+        action="store_true",
+        default=SCORING_INCLUDE_RELATIVE_FEATURES,
+        help="採点と同じ応答で relative-features 用の要約・引用も出させる",
+    )
+    p_watch.add_argument(
+        "--log-path",
+        type=Path,
+        default=Path("logs/app.log"),
+        help="ログファイルのパス",
+    )
 
     args = parser.parse_args()
 
+    # コマンド全体の経過時間・LLM 呼び出しなどを計測して run_metrics.json に残す
+    metrics = get_run_metrics()
+    try:
+        with metrics.stage(args.command):
+            _dispatch(args)
+    finally:
+        metrics.write_json(RUN_METRICS_PATH, command=args.command)
+        log_audit_record(
+            command=args.command,
+            status="metrics",
+            extra={"run_metrics": metrics.summary_table()},
+        )
+
+
+def _dispatch(args: argparse.Namespace) -> None:
     if args.command == "preprocess":
+        from .pipelines.preprocess_pipeline import run_preprocess
+
         run_preprocess(
             docx_dir=args.docx_dir,
             output_excel_dir=args.output_dir,
             log_path=args.log_path,
+            renumber_ids=args.renumber_ids,
         )
         log_audit_record(
             command="preprocess",
             args=vars(args),
         )        
     elif args.command == "score":
+        from .pipelines.scoring_pipeline import run_scoring
+
         run_scoring(
             responses_excel_path=args.responses,
             rubric_dir=args.rubric_dir,
@@ -577,6 +938,7 @@ def main():
             llm_provider=str(args.llm_provider),
             max_workers=args.workers,
             ollama_timeout=args.ollama_timeout,
+            include_relative_features=args.with_relative_features,
         )
 
         log_audit_record(
@@ -593,7 +955,25 @@ def main():
         )
 
 
+    elif args.command == "preprocess-score":
+        from .pipelines.preprocess_score_pipeline import run_preprocess_and_score
+
+        run_preprocess_and_score(
+            docx_dir=args.docx_dir,
+            output_excel_dir=args.output_dir,
+            rubric_dir=args.rubric_dir,
+            output_path=args.output_csv,
+            log_path=args.log_path,
+            max_workers=args.workers,
+            include_relative_features=args.with_relative_features,
+            renumber_ids=args.renumber_ids,
+            queue_size=args.queue_size,
+        )
+        log_audit_record(command="preprocess-score", args=vars(args))
+
     elif args.command == "summary":
+        from .pipelines.summary_pipeline import run_summary
+
         run_summary(
             absolute_scores_csv=args.scores_csv,
             id_map_excel=args.id_map,
@@ -606,6 +986,8 @@ def main():
         )
 
     elif args.command == "explain": 
+        from .pipelines.explanations_pipeline import run_explanations
+
         run_explanations(
             absolute_scores_csv=args.scores_csv,
             id_map_excel=args.id_map,
@@ -617,17 +999,24 @@ def main():
             args=vars(args),
         )        
     elif args.command == "ai-similarity":
+        from .pipelines.ai_similarity_pipeline import run_ai_similarity
+
         run_ai_similarity(
             responses_excel=args.responses,
             ai_reference_dir=args.ai_ref_dir,
             output_csv=args.output_csv,
             log_path=args.log_path,
+            jobs=args.jobs,
+            index_path=args.index_path,
+            full_recompute=args.full_recompute,
         )
         log_audit_record(
             command="ai-similarity",
             args=vars(args),
         )           
     elif args.command == "import-ai-ref":
+        from .pipelines.ai_ref_import_pipeline import run_import_ai_ref
+
         run_import_ai_ref(
             source_docx=args.source,
             tag=args.tag,
@@ -639,6 +1028,8 @@ def main():
             args=vars(args),
         )            
     elif args.command == "import-all-ai-ref":
+        from .pipelines.ai_ref_import_all_pipeline import run_import_all_ai_ref
+
         run_import_all_ai_ref(
             source_dir=args.source_dir,
             ai_ref_base_dir=args.ai_ref_dir,
@@ -649,6 +1040,8 @@ def main():
             args=vars(args),
         )            
     elif args.command == "ai-cluster":
+        from .pipelines.ai_cluster_pipeline import run_ai_cluster
+
         run_ai_cluster(
             responses_excel=args.responses,
             rubric_dir=args.rubric_dir,
@@ -656,6 +1049,7 @@ def main():
             log_path=args.log_path,
             model_name=str(args.model),
             llm_provider=str(args.llm_provider),
+            jobs=args.jobs,
         )
         log_audit_record(
             command="ai-cluster",
@@ -670,27 +1064,54 @@ def main():
 
        
     elif args.command == "peer-similarity":
+        from .pipelines.peer_similarity_pipeline import run_peer_similarity
+
         run_peer_similarity(
             responses_excel=args.responses,
             per_student_output_csv=args.per_student_output,
             pair_output_csv=args.pair_output,
             log_path=args.log_path,
+            jobs=args.jobs,
+            pair_top_k=args.pair_top_k,
+            pair_min_similarity=args.pair_min_similarity,
+            pair_format=args.pair_format,
+            index_path=args.index_path,
+            incremental=args.incremental,
         )
         log_audit_record(
             command="peer-similarity",
             args=vars(args),
         )            
+    elif args.command == "plagiarism-rings":
+        from .pipelines.plagiarism_rings_pipeline import run_plagiarism_rings
+
+        run_plagiarism_rings(
+            pair_csv=args.pair_input,
+            output_csv=args.output_csv,
+            log_path=args.log_path,
+            min_similarity=args.min_similarity,
+            min_ring_size=args.min_ring_size,
+        )
+        log_audit_record(
+            command="plagiarism-rings",
+            args=vars(args),
+        )
     elif args.command == "symbolic-features":
+        from .pipelines.symbolic_features_pipeline import run_symbolic_features
+
         run_symbolic_features(
             responses_excel=args.responses,
             output_csv=args.output_csv,
             log_path=args.log_path,
+            jobs=args.jobs,
         )
         log_audit_record(
             command="symbolic-features",
             args=vars(args),
         )            
     elif args.command == "ai-likeness":
+        from .pipelines.ai_likeness_pipeline import run_ai_likeness
+
         run_ai_likeness(
             responses_excel=args.responses,
             ai_similarity_csv=args.ai_similarity_csv,
@@ -720,6 +1141,8 @@ def main():
 
 
     elif args.command == "ai-report":
+        from .pipelines.ai_report_pipeline import run_ai_report
+
         run_ai_report(
             responses_excel=args.responses,
             ai_similarity_csv=args.ai_similarity_csv,
@@ -734,25 +1157,41 @@ def main():
             args=vars(args),
         )            
     elif args.command == "final-report":
+        from .pipelines.final_report_pipeline import run_final_report
+
         run_final_report(
             absolute_scores_csv=args.scores_csv,
             id_map_excel=args.id_map,
             ranking_csv_path=args.output_dir / "ranking.csv",
             feedback_dir=args.output_dir / "feedback",
             log_path=args.log_path,
+            jobs=args.jobs,
+            feedback_zip=args.feedback_zip,
+            docx_template=args.docx_template,
         )
         log_audit_record(
             command="final-report",
             args=vars(args),
         )
 
+    elif args.command == "feedback-template":
+        from .pipelines.final_report_pipeline import write_default_feedback_template
+
+        out = write_default_feedback_template(args.output)
+        print(f"Wrote feedback docx template to {out}")
+
     elif args.command == "translate-reports":
+        from .pipelines.translate_reports_pipeline import run_translate_reports
+
         run_translate_reports(
             output_dir=args.output_dir,
             model_name=str(args.model),
             llm_provider=str(args.llm_provider),
             log_path=args.log_path,
             inplace=args.inplace,
+            only_suspected=args.only_suspected,
+            rows=args.rows,
+            memory_path=args.memory_path,
         )
 
         log_audit_record(
@@ -770,6 +1209,8 @@ def main():
 
 
     elif args.command == "relative-features":
+        from .pipelines.relative_features_pipeline import run_relative_features
+
         run_relative_features(
             responses_excel_path=args.responses,
             absolute_scores_csv=args.scores_csv,
@@ -777,6 +1218,9 @@ def main():
             model_name=args.model,
             llm_provider=args.llm_provider,
             log_path=args.log_path,
+            max_workers=args.max_workers,
+            max_tokens=args.max_tokens,
+            resume=args.resume,
         )
         log_audit_record(
             command="relative-features",
@@ -792,13 +1236,38 @@ def main():
         )
 
     elif args.command == "relative-ranking":
+        from .pipelines.relative_ranking_pipeline import run_relative_ranking
+
         run_relative_ranking(
             features_csv=args.features_csv,
             absolute_scores_csv=args.scores_csv,
             ranking_csv=args.ranking_csv,
             log_path=args.log_path,
+            top_k=args.top_k,
+            verify_dense=args.verify_dense,
         )
         log_audit_record(command="relative-ranking", args=vars(args))
 
+    elif args.command == "watch":
+        from .pipelines.watch_pipeline import run_watch
+
+        run_watch(
+            docx_dir=args.docx_dir,
+            output_excel_dir=args.output_dir,
+            rubric_dir=args.rubric_dir,
+            scores_csv=args.scores_csv,
+            features_dir=args.features_dir,
+            ai_reference_dir=args.ai_ref_dir,
+            log_path=args.log_path,
+            poll_interval=args.poll_interval,
+            until=args.until,
+            once=args.once,
+            state_path=args.state_path,
+            max_workers=args.workers,
+            include_relative_features=args.with_relative_features,
+            similarity=not args.no_similarity,
+        )
+        log_audit_record(command="watch", args=vars(args))
+
 if __name__ == "__main__":
     main()
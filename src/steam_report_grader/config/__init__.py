@@ -27,9 +27,32 @@ QUESTION_COUNT: int = 5
 # AI模範解答との類似度で使う文字 n-gram の長さ
 AI_SIMILARITY_NGRAM: int = 3
 
+# ai-similarity の差分更新用の状態（比べ終わった AI参照と、受験者ごとの max / mean / argmax）
+# import-all-ai-ref で参照が増えても、次の ai-similarity は新しい参照とだけ比べる
+AI_SIMILARITY_INDEX_PATH: str = "data/intermediate/features/ai_similarity_index.sqlite"
+
 # 受験者どうしの類似度で使う文字 n-gram の長さ
 PEER_SIMILARITY_NGRAM: int = 3
 
+# peer-similarity のペア表（peer_similarity_pairs）の出力設定
+# 全ペアを出すと受験者数の2乗で膨らむので、大人数のときは枝刈り＋コンパクト形式を使う
+#   PEER_PAIR_TOP_K          : 各受験者について類似度上位 K 人とのペアだけ残す（None なら制限なし）
+#   PEER_PAIR_MIN_SIMILARITY : この類似度以上のペアは必ず残す（None なら使わない）
+#   PEER_PAIR_FORMAT         : "csv"（従来どおり）/ "compact"（int32 index + float32 の .bin）
+PEER_PAIR_TOP_K: int | None = None
+PEER_PAIR_MIN_SIMILARITY: float | None = None
+PEER_PAIR_FORMAT: str = "csv"
+
+# peer-similarity の差分更新用の索引（設問ごとの n-gram 集合と、受験者ごとの max / mean / argmax）
+# 全件計算のたびに書き直し、`peer-similarity --incremental` で遅れて届いたレポートだけを足し込む
+PEER_SIMILARITY_INDEX_PATH: str = "data/intermediate/features/peer_similarity_index.sqlite"
+
+# 設問をまたいだ盗用リング検出（plagiarism-rings パイプライン）
+#   RING_MIN_SIMILARITY : この類似度以上のペアを「つながっている」とみなす
+#   RING_MIN_SIZE       : この人数以上の連結成分だけをリングとして出す
+RING_MIN_SIMILARITY: float = 0.5
+RING_MIN_SIZE: int = 2
+
 
 # -------------------------
 # クラスタリングのルールとパラメータ
@@ -97,6 +120,9 @@ AI_SUSPECT_THRESHOLD: float = 0.7
 LLM_SCORING_TIMEOUT: float = 120.0
 # 採点で 1 回の LLM 呼び出しに許す最大トークン数
 LLM_SCORING_MAX_TOKENS: int = 8192
+# 採点の応答に relative-features 用の要約・引用3つも含めるか
+# True にすると relative-features は absolute_scores.csv から作れるので LLM の 2 パス目が要らない
+SCORING_INCLUDE_RELATIVE_FEATURES: bool = False
 
 # AI Likeness 評価（ai-likeness パイプライン）の LLM 設定
 LLM_LIKENESS_TIMEOUT: float = 120.0
@@ -106,13 +132,88 @@ LLM_LIKENESS_MAX_TOKENS: int = 8192
 LLM_CLUSTER_TIMEOUT: float = 180.0
 LLM_CLUSTER_MAX_TOKENS: int = 8192
 
+# 圧縮特徴抽出（relative-features パイプライン）の LLM 設定
+# 要約1つ＋引用3つの JSON なので採点ほど長くはならない
+LLM_RELATIVE_FEATURES_MAX_TOKENS: int = 1024
+
 # 翻訳パイプライン（translate-reports）の LLM 設定
 LLM_TRANSLATION_TIMEOUT: float = 300.0
 LLM_TRANSLATION_MAX_TOKENS: int = 8192
 
+# 翻訳メモリ（原文ハッシュ → 日本語訳）の SQLite。学期をまたいで使い回す
+TRANSLATION_MEMORY_PATH: str = "data/intermediate/translation_memory.sqlite"
+
+# LLM への同時リクエスト数の適応制御（バックエンド = Ollama 1 台ごと）
+#   枠を使い切っていてレイテンシが平坦なら少しずつ増やし、
+#   直近のレイテンシ（EWMA）が基準の LLM_CONCURRENCY_LATENCY_TOLERANCE 倍を超えたら少し減らし、
+#   タイムアウト・接続エラー・5xx なら LLM_CONCURRENCY_BACKOFF 倍に減らす（AIMD）。
+#   False なら従来どおり、ワーカー数がそのまま同時リクエスト数になる。
+LLM_ADAPTIVE_CONCURRENCY: bool = True
+LLM_CONCURRENCY_INITIAL: int = 2
+LLM_CONCURRENCY_MIN: int = 1
+LLM_CONCURRENCY_MAX: int = 6
+LLM_CONCURRENCY_LATENCY_TOLERANCE: float = 1.5
+LLM_CONCURRENCY_BACKOFF: float = 0.5
+
 # 絶対評価の並列ワーカー数（score パイプライン）
+# 適応制御が有効なときはスレッド数の上限で、実際に投げる数はリミッタが決める
+# （リミッタを LLM_CONCURRENCY_MAX まで使い切りたいときは、--workers を
+#   バックエンド数 × LLM_CONCURRENCY_MAX まで上げる）
 SCORING_MAX_WORKERS: int = 4
 
+# preprocess-score で、読み終えた答案を採点ワーカーに渡すキューの長さ（答案数）
+# 採点が追いつかないと docx の読み取りがここで待つので、メモリに溜まる答案はこの件数まで
+STREAM_QUEUE_MAXSIZE: int = 16
+
+# 圧縮特徴抽出の並列ワーカー数（relative-features パイプライン）
+RELATIVE_FEATURES_MAX_WORKERS: int = SCORING_MAX_WORKERS
+
+# relative-ranking で「似ている受験者の上位 K 人」を ranking.csv に出す人数（0 なら出さない）
+RELATIVE_RANKING_TOP_K: int = 0
+
+# CPU だけで回る特徴量ステージの並列プロセス数
+# （ai-similarity / peer-similarity / symbolic-features / ai-cluster のクラスタリング部分）
+# 設問ごとに 1 プロセスへ振り分ける。1 なら逐次実行、0 以下なら CPU コア数。
+FEATURE_JOBS: int = 1
+
+# final-report で受験者ごとのフィードバック（md / docx）を書くプロセス数
+# 1 なら逐次実行、0 以下なら CPU コア数。
+FEEDBACK_JOBS: int = 1
+
+# final-report の docx フィードバックのテンプレート
+# {{title}} / {{rank}} / {{#questions}}…{{/questions}} などのプレースホルダを Word で編集できる。
+# ファイルがなければ組み込みのテンプレート（feedback-template で書き出せるもの）を使う。
+FEEDBACK_DOCX_TEMPLATE: str = "data/templates/feedback_template.docx"
+
+
+# 実行ごとの計測結果（ステージ時間・LLM レイテンシ・トークン統計など）の出力先
+# コマンドごとに上書きし、要約は audit_log.jsonl にも status="metrics" で追記する
+RUN_METRICS_PATH: str = "data/outputs/run_metrics.json"
+
+# ログ出力（utils/logging_utils.setup_logging）
+#   LOG_QUEUE_MODE            : True ならワーカーのスレッドはキューに入れるだけで、書き込みは専用スレッドが行う
+#   LOG_FILE_FLUSH_RECORDS    : ログファイルはこの行数ごとにまとめて書く（WARNING 以上はすぐ書く）
+#   LOG_FILE_FLUSH_INTERVAL_S : 行数がたまらなくても、この秒数たったら書く
+LOG_QUEUE_MODE: bool = True
+LOG_FILE_FLUSH_RECORDS: int = 200
+LOG_FILE_FLUSH_INTERVAL_S: float = 1.0
+
+# LLM タスクの進捗ログ（utils/progress.ProgressLogger）
+# 1 件ごとではなく、PROGRESS_LOG_EVERY_N 件ごとか PROGRESS_LOG_EVERY_S 秒ごとに INFO に出す
+PROGRESS_LOG_EVERY_N: int = 50
+PROGRESS_LOG_EVERY_S: float = 10.0
+
+# watch サブコマンド（提出フォルダを見張って届いた答案から採点していくデーモン）
+#   WATCH_POLL_INTERVAL_S : フォルダを見に行く間隔（秒）。コピー途中のファイルを避けるため、
+#                           2 回続けて同じサイズ・更新時刻だったファイルだけ読む
+#   WATCH_STATE_PATH      : 取り込み済み docx の一覧（止めて立ち上げ直しても読み直さない）
+WATCH_POLL_INTERVAL_S: float = 30.0
+WATCH_STATE_PATH: str = "data/intermediate/watch_state.sqlite"
+
+# 回答Excel（responses シート）を iter_responses_chunks で読むときの 1 チャンクの行数（受験者数）
+# load_responses_excel / iter_response_rows は openpyxl の read_only で 1 行ずつ読む
+RESPONSES_CHUNK_ROWS: int = 1000
+
 
 # -------------------------
 # LLM / モデル・Ollama 共通設定
@@ -129,7 +230,23 @@ OLLAMA_DEFAULT_BASE_URL: str = "http://127.0.0.1:11434"
 OLLAMA_DEFAULT_MODEL: str = DEFAULT_SCORING_MODEL  # ベースのデフォルトモデル
 OLLAMA_DEFAULT_TIMEOUT: int = 120
 OLLAMA_DEFAULT_MAX_RETRIES: int = 3
-OLLAMA_DEFAULT_RETRY_DELAY: float = 2.0  # seconds
+OLLAMA_DEFAULT_RETRY_DELAY: float = 2.0  # seconds（指数バックオフの基準: 0〜2, 0〜4, 0〜8 秒…）
+
+# LLM 呼び出しのリトライ方針
+#   接続エラー → 待たずに別のバックエンドへ / タイムアウト・5xx → 指数バックオフ + jitter / 4xx → リトライしない
+#   LLM_RETRY_BACKOFF_MAX : バックオフの上限（秒）
+#   LLM_RETRY_BUDGET_*    : 1 回の実行で使えるリトライの総数 = リクエスト数 × RATIO + MIN
+LLM_RETRY_BACKOFF_MAX: float = 30.0
+LLM_RETRY_BUDGET_RATIO: float = 0.2
+LLM_RETRY_BUDGET_MIN: int = 10
+
+# バックエンドごとのサーキットブレーカー
+#   接続エラー・タイムアウト・5xx が LLM_BREAKER_FAILURE_THRESHOLD 回続いたら、
+#   LLM_BREAKER_RESET_S 秒はそのバックエンドに投げない（その後 1 件だけ試して復帰を確認する）
+#   全台 open のときは、いちばん早く試せるようになるまで待つ（1 呼び出しで最長 LLM_ALL_OPEN_MAX_WAIT_S 秒）
+LLM_BREAKER_FAILURE_THRESHOLD: int = 3
+LLM_BREAKER_RESET_S: float = 30.0
+LLM_ALL_OPEN_MAX_WAIT_S: float = 300.0
 OLLAMA_DEFAULT_TEMPERATURE: float = 0.0
 OLLAMA_DEFAULT_TOP_P: float = 1.0
 OLLAMA_DEFAULT_SEED: int | None = 42
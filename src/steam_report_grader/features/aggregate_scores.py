@@ -1,14 +1,79 @@
 # src/steam_report_grader/features/aggregate_scores.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 import pandas as pd
 
+from ..io.raw_response_store import RawResponseStore, raw_response_store_path_for
 
-def load_absolute_scores(path: Path) -> pd.DataFrame:
+# 旧 absolute_scores.csv にあった互換カラム → 中身の元になる正式カラム
+# （今の CSV には書かない。legacy_columns=True で読んだときだけ作る）
+LEGACY_SCORE_COLUMNS: Dict[str, str] = {
+    "reason": "brief",
+    "brief_explanation": "brief",
+    "detailed_explanation": "detailed",
+}
+
+
+def add_legacy_score_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    reason / brief_explanation / detailed_explanation が無ければ brief / detailed から作る。
+    旧 CSV（互換カラムが入っているもの）はそのまま。
+    """
+    for legacy, source in LEGACY_SCORE_COLUMNS.items():
+        if legacy not in df.columns and source in df.columns:
+            df[legacy] = df[source]
+    return df
+
+
+def attach_raw_responses(
+    df: pd.DataFrame,
+    store: RawResponseStore,
+) -> pd.DataFrame:
+    """
+    raw_response_hash 列から raw_response 列（LLM の生応答の本文）を作る。
+    旧 CSV（raw_response 列がそのまま入っているもの）はそのまま。
+    """
+    if "raw_response" in df.columns or "raw_response_hash" not in df.columns:
+        return df
+    texts = store.get_many(df["raw_response_hash"])
+    df["raw_response"] = df["raw_response_hash"].map(texts)
+    return df
+
+
+def load_absolute_scores(
+    path: Path,
+    columns: Optional[Iterable[str]] = None,
+    legacy_columns: bool = False,
+    raw_responses: bool = False,
+) -> pd.DataFrame:
+    """
+    absolute_scores.csv を読む。
+
+    - columns を渡すと、その列（CSV にあるものだけ）しか読まない
+    - legacy_columns=True なら reason / brief_explanation / detailed_explanation を brief / detailed から作る
+    - raw_responses=True なら、CSV の横の生応答ストア（*.raw_responses.sqlite）から raw_response 列を作る
+    """
     path = Path(path)
-    return pd.read_csv(path)
+    if columns is not None:
+        wanted = set(columns)
+        if legacy_columns:
+            wanted |= {LEGACY_SCORE_COLUMNS[c] for c in wanted if c in LEGACY_SCORE_COLUMNS}
+        if raw_responses:
+            wanted |= {"raw_response", "raw_response_hash"}
+        df = pd.read_csv(path, usecols=lambda c: c in wanted)
+    else:
+        df = pd.read_csv(path)
+
+    if legacy_columns:
+        df = add_legacy_score_columns(df)
+    if raw_responses:
+        store_path = raw_response_store_path_for(path)
+        if store_path.exists():
+            with RawResponseStore(store_path) as store:
+                df = attach_raw_responses(df, store)
+    return df
 
 
 def aggregate_per_student(
@@ -10,8 +10,10 @@ import pandas as pd
 
 from .ai_reference import load_ai_references, AIReferenceAnswer
 from ..preprocess.text_cleaning import normalize_text  # 既存の前処理を流用
-from ..io.responses_loader import load_responses_and_questions
-from ..config import AI_SIMILARITY_NGRAM
+from ..io.responses_loader import load_responses_and_questions, melt_responses
+from ..io.ai_similarity_index import AISimilarityIndex, AISimilarityState, text_hash
+from ..utils.parallel import map_per_question
+from ..config import AI_SIMILARITY_NGRAM, FEATURE_JOBS
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,32 @@ class AISimilarity:
     ai_ref_best_id: Optional[str]
 
 
+def _ref_shingles(
+    ai_refs: list[AIReferenceAnswer],
+    n: int,
+) -> list[tuple[str, set[str]]]:
+    """
+    AI参照ごとの n-gram 集合を前計算しておく（回答ごとに作り直さない）。
+    """
+    return [(ref.ref_id, _ngram_shingles(normalize_text(ref.text), n=n)) for ref in ai_refs]
+
+
+def _similarity_to_ref_shingles(
+    ans_shingles: set[str],
+    ref_shingles: list[tuple[str, set[str]]],
+) -> tuple[float, float, str | None]:
+    if not ref_shingles:
+        return 0.0, 0.0, None
+
+    sims = [(ref_id, _jaccard(ans_shingles, sh)) for ref_id, sh in ref_shingles]
+    sims_values = [s for _, s in sims]
+    sim_max = max(sims_values)
+    sim_mean = sum(sims_values) / len(sims_values)
+
+    best_ref_id, _ = max(sims, key=lambda t: t[1])
+    return sim_max, sim_mean, best_ref_id
+
+
 def compute_similarity_to_ai(
     answer_text: str,
     ai_refs: list[AIReferenceAnswer],
@@ -62,40 +90,144 @@ def compute_similarity_to_ai(
     norm_ans = normalize_text(answer_text)
     ans_shingles = _ngram_shingles(norm_ans, n=n)
 
-    sims: list[tuple[AIReferenceAnswer, float]] = []
-    for ref in ai_refs:
-        ref_norm = normalize_text(ref.text)
-        ref_shingles = _ngram_shingles(ref_norm, n=n)
-        sim = _jaccard(ans_shingles, ref_shingles)
-        sims.append((ref, sim))
+    return _similarity_to_ref_shingles(ans_shingles, _ref_shingles(ai_refs, n=n))
 
-    if not sims:
-        return 0.0, 0.0, None
 
-    sims_values = [s for _, s in sims]
-    sim_max = max(sims_values)
-    sim_mean = sum(sims_values) / len(sims_values)
+def _ai_similarity_for_question(
+    question: str,
+    payload: tuple[
+        pd.DataFrame,
+        list[AIReferenceAnswer],
+        int,
+        Optional[tuple[Dict[str, str], Dict[str, AISimilarityState]]],
+    ],
+) -> tuple[pd.DataFrame, Dict[str, str], Dict[str, AISimilarityState]]:
+    """
+    1設問ぶんの AI類似度を計算する（map_per_question から呼ばれるワーカー）。
+    payload = (その設問の student_id/answer だけの DataFrame, AI参照, n, 前回の状態)
+    戻り値の DataFrame の index は payload の DataFrame の index を引き継ぐ。
+
+    前回の状態 (比べ終わった参照 {ref_id: text_hash}, 受験者ごとの集計) があれば、
+    回答が変わっていない受験者は「まだ比べていない参照」とだけ比べて集計に足し込む。
+    比べ終わった参照が消えた・書き換わったときは、その設問を全件計算し直す。
+    戻り値: (結果の DataFrame, 今回の参照 {ref_id: text_hash}, 受験者ごとの集計)
+    """
+    sub, ai_refs, n, prior = payload
+
+    if not ai_refs:
+        logger.warning(
+            "No AI references for %s; returning 0.0 similarity.", question
+        )
+
+    ref_pos = {ref.ref_id: i for i, ref in enumerate(ai_refs)}
+    ref_norm = [normalize_text(ref.text) for ref in ai_refs]
+    ref_hashes = {ref.ref_id: text_hash(t) for ref, t in zip(ai_refs, ref_norm)}
+
+    covered, states = prior if prior is not None else ({}, {})
+    if len(ref_pos) != len(ai_refs):
+        logger.warning(
+            "Duplicate AI reference ids for %s; recomputing without saved state", question
+        )
+        covered, states = {}, {}
+    elif any(ref_hashes.get(ref_id) != h for ref_id, h in covered.items()):
+        logger.info(
+            "AI references for %s were removed or edited; recomputing all answers", question
+        )
+        covered, states = {}, {}
+
+    # 参照の n-gram 集合は、使うものだけ作る（差分更新なら新しい参照だけで済む）
+    shingle_cache: Dict[int, set[str]] = {}
+
+    def ref_shingles(i: int) -> set[str]:
+        sh = shingle_cache.get(i)
+        if sh is None:
+            sh = _ngram_shingles(ref_norm[i], n=n)
+            shingle_cache[i] = sh
+        return sh
 
-    best_ref, _ = max(sims, key=lambda t: t[1])
-    return sim_max, sim_mean, best_ref.ref_id
+    all_refs = list(range(len(ai_refs)))
+    new_refs = [i for i, ref in enumerate(ai_refs) if ref.ref_id not in covered]
+
+    rows: List[Dict] = []
+    new_states: Dict[str, AISimilarityState] = {}
+    n_compared = 0
+    for sid, ans in zip(sub["student_id"], sub["answer"]):
+        sid = str(sid)
+        norm_ans = normalize_text(ans)
+        h = text_hash(norm_ans)
+        state = states.get(sid)
+        if state is None or state.answer_hash != h:
+            state = AISimilarityState(answer_hash=h)
+            targets = all_refs
+        else:
+            targets = new_refs
+
+        if targets:
+            ans_shingles = _ngram_shingles(norm_ans, n=n)
+            for i in targets:
+                ref_id = ai_refs[i].ref_id
+                sim = _jaccard(ans_shingles, ref_shingles(i))
+                state.sim_sum += sim
+                state.n_refs += 1
+                # 同点なら参照の並び順で先のもの（全件計算の max() と同じ）
+                if (
+                    not state.best_ref_id
+                    or sim > state.sim_max
+                    or (sim == state.sim_max and i < ref_pos[state.best_ref_id])
+                ):
+                    state.sim_max = sim
+                    state.best_ref_id = ref_id
+            n_compared += len(targets)
+
+        new_states[sid] = state
+        rows.append(
+            {
+                "student_id": sid,
+                "question": question,
+                "sim_to_ai_max": state.sim_max,
+                "sim_to_ai_mean": state.sim_mean,
+                "ai_ref_best_id": state.best_ref_id,
+            }
+        )
+
+    logger.info(
+        "AI similarity for %s: %d answer(s), %d new reference(s), %d comparison(s)",
+        question,
+        len(rows),
+        len(new_refs),
+        n_compared,
+    )
+    return pd.DataFrame(rows, index=sub.index), ref_hashes, new_states
 
 
 def compute_ai_similarity_for_responses(
     responses_excel_path: Path,
     ai_reference_dir: Path,
+    jobs: int | None = None,
+    index: AISimilarityIndex | None = None,
 ) -> pd.DataFrame:
     """
     steam_exam_responses.xlsx を入力として、
     各 student_id × Q について AI模範解答との類似度を計算し、
     DataFrame を返す。
 
+    設問ごとに独立なので、jobs > 1 なら設問単位でプロセス並列にする
+    （None なら config.FEATURE_JOBS）。
+
+    index を渡すと、前回までに比べ終わった AI参照とは比べ直さず、
+    新しく取り込んだ参照とだけ比べて max / mean / argmax に合流させる。
+    （回答が変わった・新しい受験者は全参照と比べる。結果は全件計算と同じ）
+
     戻り値のカラム:
       - student_id
       - question
-      - ai_ref_sim_max
-      - ai_ref_sim_mean
+      - sim_to_ai_max
+      - sim_to_ai_mean
       - ai_ref_best_id
     """
+    if jobs is None:
+        jobs = FEATURE_JOBS
+
     responses_excel_path = Path(responses_excel_path)
     ai_reference_dir = Path(ai_reference_dir)
 
@@ -105,27 +237,34 @@ def compute_ai_similarity_for_responses(
         ai_reference_dir, questions
     )
 
-    rows = []
-    for _, row in df.iterrows():
-        student_id = str(row["student_id"])
-        for q in questions:
-            ans = str(row.get(q, "") or "").strip()
-            if not ans:
-                continue
-
-            ai_refs = refs_by_q.get(q, [])
-            sim_max, sim_mean, ai_ref_best_id = compute_similarity_to_ai(ans, ai_refs)
-
-            rows.append(
-                {
-                    "student_id": student_id,
-                    "question": q,
-                    "sim_to_ai_max": sim_max,
-                    "sim_to_ai_mean": sim_mean,
-                    "ai_ref_best_id": ai_ref_best_id or "",
-                }
-            )
-
-
-    result_df = pd.DataFrame(rows)
+    if index is not None and not index.matches(ngram=AI_SIMILARITY_NGRAM):
+        logger.info("AI similarity index missing or built with other settings; resetting")
+        index.reset(ngram=AI_SIMILARITY_NGRAM)
+
+    long_df = melt_responses(df, questions)
+    tasks = [
+        (
+            q,
+            (
+                long_df.loc[long_df["question"] == q, ["student_id", "answer"]],
+                refs_by_q.get(q, []),
+                AI_SIMILARITY_NGRAM,
+                index.load_question(q) if index is not None else None,
+            ),
+        )
+        for q in questions
+    ]
+    results = map_per_question(_ai_similarity_for_question, tasks, jobs=jobs)
+
+    if index is not None:
+        for (q, _), (_, covered, states) in zip(tasks, results):
+            index.replace_question(q, covered, states.items())
+
+    frames = [f for f, _, _ in results if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    # 各設問の結果は long_df の index を持っているので、
+    # sort_index で従来どおり「受験者順 → 設問順」に戻す
+    result_df = pd.concat(frames).sort_index().reset_index(drop=True)
     return result_df
@@ -0,0 +1,78 @@
+# src/steam_report_grader/features/cosine_similarity.py
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+# 相互比較の密行列（N×N float64）を作ってよい受験者数の上限（検証用）
+DENSE_VERIFY_MAX_N = 2000
+
+
+def _row_sq_norms(X: sp.csr_matrix) -> np.ndarray:
+    return np.asarray(X.multiply(X).sum(axis=1)).ravel()
+
+
+def mean_cosine_similarity(X: sp.spmatrix) -> np.ndarray:
+    """
+    各行と「自分以外の全行」とのコサイン類似度の平均を O(N·nnz) で求める。
+    X は行ごとに L2 正規化済み（TfidfVectorizer の既定）であること。
+
+    mean_i = (x_i · Σ_j x_j − x_i · x_i) / (N − 1)
+    なので、列和ベクトル 1 本との内積で済み、N×N の行列は作らない。
+    """
+    X = sp.csr_matrix(X)
+    n = X.shape[0]
+    if n <= 1:
+        return np.zeros(n, dtype=float)
+    col_sum = np.asarray(X.sum(axis=0)).ravel()
+    row_dot = X @ col_sum
+    return (row_dot - _row_sq_norms(X)) / (n - 1)
+
+
+def top_k_cosine_similarity(
+    X: sp.spmatrix,
+    k: int,
+    block_rows: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    各行について、自分以外で類似度が高い順に k 行ぶんの (index, 類似度) を返す。
+    block_rows 行ずつ X_block @ X.T を計算するので、メモリは block_rows × N で済む。
+    戻り値はどちらも shape (N, min(k, N-1))。index は類似度の降順。
+    """
+    X = sp.csr_matrix(X)
+    n = X.shape[0]
+    k = min(k, n - 1)
+    indices = np.zeros((n, max(k, 0)), dtype=np.int64)
+    sims = np.zeros((n, max(k, 0)), dtype=float)
+    if k <= 0:
+        return indices, sims
+
+    XT = X.T.tocsc()
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        block = (X[start:stop] @ XT).toarray()
+        # 自分自身は候補から外す
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        part_sims = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind="stable")
+        indices[start:stop] = np.take_along_axis(part, order, axis=1)
+        sims[start:stop] = np.take_along_axis(part_sims, order, axis=1)
+    return indices, sims
+
+
+def dense_mean_cosine_similarity(X: sp.spmatrix) -> np.ndarray:
+    """
+    従来の (X * X.T).toarray() による計算。小さい N での検証専用。
+    """
+    n = X.shape[0]
+    if n > DENSE_VERIFY_MAX_N:
+        raise ValueError(
+            f"Dense cosine verification is limited to {DENSE_VERIFY_MAX_N} rows (got {n})"
+        )
+    if n <= 1:
+        return np.zeros(n, dtype=float)
+    sims = (X * X.T).toarray()
+    return (sims.sum(axis=1) - np.diag(sims)) / (n - 1)
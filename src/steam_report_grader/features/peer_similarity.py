@@ -2,14 +2,19 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
+import heapq
 import logging
+import numpy as np
 import pandas as pd
 
 from ..preprocess.text_cleaning import normalize_text
-from ..io.responses_loader import load_responses_and_questions
-from ..config import PEER_SIMILARITY_NGRAM
+from ..io.responses_loader import load_responses_and_questions, melt_responses
+from ..io.peer_pair_store import PeerPairChunk, PeerPairTable
+from ..io.peer_similarity_index import IndexedStudent, PeerSimilarityIndex, answer_hash
+from ..utils.parallel import map_per_question
+from ..config import PEER_SIMILARITY_NGRAM, FEATURE_JOBS
 
 logger = logging.getLogger(__name__)
 
@@ -41,101 +46,505 @@ class PeerSimilarityRow:
     peer_sim_mean: float
 
 
-def compute_peer_similarity_for_responses(
+def _peer_similarity_for_question(
+    question: str,
+    payload: tuple[pd.DataFrame, int, Optional[int], Optional[float]],
+) -> Tuple[List[Dict], List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    1設問ぶんの受験者同士の類似度を計算する（map_per_question から呼ばれるワーカー）。
+    payload = (その設問の student_id/answer だけの DataFrame, n, top_k, min_similarity)
+
+    top_k / min_similarity がどちらも None なら全ペア (i<j) を返す。
+    どちらかが指定されていれば、
+      - 各受験者について類似度上位 top_k 人とのペア
+      - 類似度が min_similarity 以上のペア
+    の和集合だけを残す（per_student の max / mean は全ペアから計算する）。
+
+    戻り値: (per_student_rows, sids, pair_a, pair_b, pair_sim)
+      pair_a / pair_b は sids 上の index（a < b）
+    """
+    sub, n, top_k, min_similarity = payload
+    q = question
+    keep_all_pairs = top_k is None and min_similarity is None
+
+    per_student_rows: List[Dict] = []
+    pair_a: List[int] = []
+    pair_b: List[int] = []
+    pair_sim: List[float] = []
+    kept: Dict[Tuple[int, int], float] = {}
+
+    logger.info("Computing peer similarity for %s", q)
+
+    # n-gram 集合の事前計算
+    shingles_map: Dict[str, set[str]] = {}
+    for sid, ans in zip(sub["student_id"], sub["answer"]):
+        shingles_map[str(sid)] = _ngram_shingles(normalize_text(ans), n=n)
+
+    sids = list(shingles_map.keys())
+    n_students = len(sids)
+
+    for i in range(n_students):
+        sid_i = sids[i]
+        sh_i = shingles_map[sid_i]
+        sims_to_others: List[Tuple[str, float]] = []
+        row_sims: List[Tuple[int, float]] = []
+
+        for j in range(n_students):
+            sid_j = sids[j]
+            if sid_i == sid_j:
+                continue
+            sh_j = shingles_map[sid_j]
+            sim = _jaccard(sh_i, sh_j)
+            sims_to_others.append((sid_j, sim))
+
+            # ペアは i<j のときだけ記録
+            if keep_all_pairs:
+                if i < j:
+                    pair_a.append(i)
+                    pair_b.append(j)
+                    pair_sim.append(sim)
+                continue
+
+            row_sims.append((j, sim))
+            if min_similarity is not None and i < j and sim >= min_similarity:
+                kept[(i, j)] = sim
+
+        if top_k is not None and top_k > 0:
+            for j, sim in heapq.nlargest(top_k, row_sims, key=lambda t: t[1]):
+                kept[(min(i, j), max(i, j))] = sim
+
+        if not sims_to_others:
+            per_student_rows.append(
+                {
+                    "student_id": sid_i,
+                    "question": q,
+                    "sim_to_others_max": 0.0,
+                    "most_similar_student_id": "",
+                    "sim_to_others_mean": 0.0,
+                }
+            )
+            continue
+
+        sid_best, sim_max = max(sims_to_others, key=lambda t: t[1])
+        sim_mean = sum(s for _, s in sims_to_others) / len(sims_to_others)
+
+        per_student_rows.append(
+            {
+                "student_id": sid_i,
+                "question": q,
+                "sim_to_others_max": sim_max,
+                "most_similar_student_id": sid_best,
+                "sim_to_others_mean": sim_mean,
+            }
+        )
+
+    if not keep_all_pairs:
+        for (a, b) in sorted(kept):
+            pair_a.append(a)
+            pair_b.append(b)
+            pair_sim.append(kept[(a, b)])
+
+    return (
+        per_student_rows,
+        sids,
+        np.asarray(pair_a, dtype=np.int32),
+        np.asarray(pair_b, dtype=np.int32),
+        np.asarray(pair_sim, dtype=np.float64),
+    )
+
+
+def compute_peer_similarity(
     responses_excel_path: Path,
     n: int | None = None,
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    jobs: int | None = None,
+    top_k: int | None = None,
+    min_similarity: float | None = None,
+    index: PeerSimilarityIndex | None = None,
+) -> Tuple[pd.DataFrame, PeerPairTable]:
     """
-    匿名回答Excelから    匿名回答Excelから、受験者同士の類似度特徴量を計算する。
-    n を指定しなければ config.PEER_SIMILARITY_NGRAM を使う。、受験者同士の類似度特徴量を計算する。
+    匿名回答Excelから、受験者同士の類似度特徴量を計算する。
+    ペア表は文字列の dict ではなく、student_id の index（int32）で持つ
+    PeerPairTable として返す。
 
-    戻り値:
-    per_student_df:
-        student_id, question, sim_to_others_max,
-        most_similar_student_id, sim_to_others_mean
-      pair_df:
-        question, student_id_a, student_id_b, similarity
+    - n を指定しなければ config.PEER_SIMILARITY_NGRAM を使う
+    - jobs > 1 なら設問単位でプロセス並列にする（None なら config.FEATURE_JOBS）
+    - top_k / min_similarity を指定すると、ペア表を
+      「各受験者の上位 top_k ペア ∪ 類似度 min_similarity 以上のペア」に枝刈りする
+    - index を渡すと、差分更新（update_peer_similarity）用の索引を作り直す
     """
     if n is None:
         n = PEER_SIMILARITY_NGRAM
+    if jobs is None:
+        jobs = FEATURE_JOBS
 
     responses_excel_path = Path(responses_excel_path)
     df, questions = load_responses_and_questions(responses_excel_path)
-    
+
     logger.info("Loaded responses for peer similarity: %d rows", len(df))
 
+    long_df = melt_responses(df, questions)
+    tasks = [
+        (
+            q,
+            (
+                long_df.loc[long_df["question"] == q, ["student_id", "answer"]],
+                n,
+                top_k,
+                min_similarity,
+            ),
+        )
+        for q in questions
+        if (long_df["question"] == q).any()
+    ]
+    results = map_per_question(_peer_similarity_for_question, tasks, jobs=jobs)
+
+    # 全設問で共通の student index（回答シートの並び順）
+    student_ids = [str(s) for s in df["student_id"]]
+    sid_index = {sid: i for i, sid in enumerate(student_ids)}
+    pair_table = PeerPairTable(
+        student_ids=student_ids,
+        questions=list(questions),
+        top_k=top_k,
+        min_similarity=min_similarity,
+    )
 
     per_student_rows: List[Dict] = []
-    pair_rows: List[Dict] = []
+    for (q, _), (q_per_student, sids, a, b, sim) in zip(tasks, results):
+        per_student_rows.extend(q_per_student)
+        to_global = np.asarray([sid_index[sid] for sid in sids], dtype=np.int32)
+        pair_table.chunks.append(
+            PeerPairChunk(
+                question=q,
+                student_a=to_global[a] if len(a) else a,
+                student_b=to_global[b] if len(b) else b,
+                similarity=sim,
+            )
+        )
 
+    per_student_df = pd.DataFrame(per_student_rows)
+    logger.info(
+        "Peer similarity pairs kept: %d (top_k=%s, min_similarity=%s)",
+        len(pair_table),
+        top_k,
+        min_similarity,
+    )
+    if index is not None:
+        _rebuild_index(index, long_df, questions, per_student_df, pair_table, n)
+    return per_student_df, pair_table
+
+
+def _top_sims_by_student(
+    chunk: PeerPairChunk,
+    student_ids: List[str],
+    top_k: int,
+) -> Dict[str, List[float]]:
+    """
+    枝刈り後のペア表から、各受験者の類似度上位 top_k 個を取り出す。
+    （各受験者の上位 top_k ペアは必ずペア表に残っているので、全ペアを見直さなくてよい）
+    """
+    if len(chunk) == 0:
+        return {}
+    df = pd.DataFrame(
+        {
+            "student": np.concatenate([chunk.student_a, chunk.student_b]),
+            "similarity": np.concatenate([chunk.similarity, chunk.similarity]),
+        }
+    )
+    df = df.sort_values("similarity", ascending=False, kind="stable")
+    top = df.groupby("student", sort=False).head(top_k)
+    return {
+        student_ids[int(i)]: list(g["similarity"])
+        for i, g in top.groupby("student", sort=False)
+    }
+
+
+def _rebuild_index(
+    index: PeerSimilarityIndex,
+    long_df: pd.DataFrame,
+    questions: List[str],
+    per_student_df: pd.DataFrame,
+    pair_table: PeerPairTable,
+    n: int,
+) -> None:
+    """
+    全件計算の結果から差分更新用の索引を作り直す。
+    """
+    index.reset(
+        ngram=n,
+        top_k=pair_table.top_k,
+        min_similarity=pair_table.min_similarity,
+        questions=list(questions),
+    )
+    chunks = {c.question: c for c in pair_table.chunks}
     for q in questions:
-        logger.info("Computing peer similarity for %s", q)
-        sub = df[["student_id", q]].copy()
-        sub = sub.rename(columns={q: "answer"})
-        sub["answer"] = sub["answer"].fillna("").astype(str).str.strip()
-        sub = sub[sub["answer"] != ""]
+        sub = long_df.loc[long_df["question"] == q, ["student_id", "answer"]]
         if sub.empty:
             continue
+        stats = per_student_df[per_student_df["question"] == q].set_index("student_id")
+        top_sims: Dict[str, List[float]] = {}
+        if pair_table.top_k and q in chunks:
+            top_sims = _top_sims_by_student(
+                chunks[q], pair_table.student_ids, pair_table.top_k
+            )
 
-        # n-gram 集合の事前計算
-        shingles_map: Dict[str, set[str]] = {}
-        for _, row in sub.iterrows():
-            sid = str(row["student_id"])
-            ans = normalize_text(row["answer"])
-            shingles_map[sid] = _ngram_shingles(ans, n=n)
+        entries: Dict[str, IndexedStudent] = {}
+        for sid, ans in zip(sub["student_id"], sub["answer"]):
+            sid = str(sid)
+            norm = normalize_text(ans)
+            entries[sid] = IndexedStudent(
+                student_id=sid,
+                position=0,
+                answer_hash=answer_hash(norm),
+                shingles=_ngram_shingles(norm, n=n),
+            )
+        n_others = len(entries) - 1
+        for pos, (sid, e) in enumerate(entries.items()):
+            row = stats.loc[sid]
+            e.position = pos
+            e.n_others = n_others
+            e.sim_max = float(row["sim_to_others_max"])
+            e.most_similar = str(row["most_similar_student_id"])
+            e.sim_sum = float(row["sim_to_others_mean"]) * n_others
+            e.top_sims = top_sims.get(sid, [])
+        index.upsert(q, entries.values())
+    logger.info("Rebuilt peer similarity index at %s", index.path)
 
-        sids = list(shingles_map.keys())
-        n_students = len(sids)
 
-        for i in range(n_students):
-            sid_i = sids[i]
-            sh_i = shingles_map[sid_i]
-            sims_to_others: List[Tuple[str, float]] = []
+def _keeps_pair(
+    sim: float,
+    top_sims: List[float],
+    top_k: int | None,
+    min_similarity: float | None,
+) -> bool:
+    """
+    ある受験者から見て、類似度 sim のペアをペア表に残すか（top_sims は更新しない）。
+    """
+    if top_k is None and min_similarity is None:
+        return True
+    if min_similarity is not None and sim >= min_similarity:
+        return True
+    if top_k is not None and top_k > 0:
+        return len(top_sims) < top_k or sim > top_sims[-1]
+    return False
 
-            for j in range(n_students):
-                sid_j = sids[j]
-                if sid_i == sid_j:
-                    continue
-                sh_j = shingles_map[sid_j]
-                sim = _jaccard(sh_i, sh_j)
-                sims_to_others.append((sid_j, sim))
 
-                # ペアは i<j のときだけ記録
-                if i < j:
-                    pair_rows.append(
-                        {
-                            "question": q,
-                            "student_id_a": sid_i,
-                            "student_id_b": sid_j,
-                            "similarity": sim,
-                        }
-                    )
+def _push_top_sim(top_sims: List[float], sim: float, top_k: int | None) -> None:
+    if not top_k or top_k <= 0:
+        return
+    if len(top_sims) < top_k or sim > top_sims[-1]:
+        top_sims.append(sim)
+        top_sims.sort(reverse=True)
+        del top_sims[top_k:]
+
+
+def update_peer_similarity(
+    responses_excel_path: Path,
+    index: PeerSimilarityIndex,
+    n: int | None = None,
+    top_k: int | None = None,
+    min_similarity: float | None = None,
+) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, List[str]]]:
+    """
+    遅れて届いた受験者だけを既存の受験者と比べて、索引と per_student を差分更新する。
+    新しい受験者 k 人 × 全員 N 人ぶんしか Jaccard を計算しない（全件計算は N^2）。
+
+    戻り値: (per_student_df, new_pair_df, student_ids)
+      per_student_df : 全受験者ぶん（既存の受験者も平均・最大が変わるので全行）
+      new_pair_df    : 新しい受験者を含むペアのうち、ペア表に残すもの
+      student_ids    : 回答シートの並び順の student_id
+
+    次の場合は差分では正しく出せないので None を返す（呼び出し側で全件計算する）:
+      - 索引の n-gram 長・枝刈り条件が今回と違う / 設問の構成が違う
+      - 既存の受験者の回答が変わった・消えた
+    枝刈りありのペア表は、既存の受験者の上位 top_k から押し出されたペアも残る
+    （全件計算の結果の上位集合になる）。
+    """
+    if n is None:
+        n = PEER_SIMILARITY_NGRAM
+
+    if not index.matches(ngram=n, top_k=top_k, min_similarity=min_similarity):
+        logger.info("Peer similarity index settings differ; full recompute needed")
+        return None
 
-            if not sims_to_others:
-                per_student_rows.append(
-                    {
-                        "student_id": sid_i,
-                        "question": q,
-                        "sim_to_others_max": 0.0,          
-                        "most_similar_student_id": "",     
-                        "sim_to_others_mean": 0.0,         
-                    }
+    df, questions = load_responses_and_questions(Path(responses_excel_path))
+    if list(questions) != index.questions():
+        logger.info("Peer similarity index questions differ; full recompute needed")
+        return None
+
+    long_df = melt_responses(df, questions)
+    keep_all = top_k is None and min_similarity is None
+    pair_rows: List[Dict] = []
+    n_new_total = 0
+    n_compared = 0
+
+    for q in questions:
+        sub = long_df.loc[long_df["question"] == q, ["student_id", "answer"]]
+        existing = index.load_question(q)
+
+        current: Dict[str, Tuple[str, str]] = {}
+        for sid, ans in zip(sub["student_id"], sub["answer"]):
+            norm = normalize_text(ans)
+            current[str(sid)] = (norm, answer_hash(norm))
+
+        removed = set(existing) - set(current)
+        changed = [
+            sid
+            for sid, (_, h) in current.items()
+            if sid in existing and existing[sid].answer_hash != h
+        ]
+        if removed or changed:
+            logger.info(
+                "Peer similarity index is stale for %s (removed=%d, changed=%d); "
+                "full recompute needed",
+                q,
+                len(removed),
+                len(changed),
+            )
+            return None
+
+        new_sids = [sid for sid in current if sid not in existing]
+        if not new_sids:
+            continue
+
+        # 回答シートの並び順で position を振り直す（同点のときの argmax を全件計算と揃える）
+        entries: Dict[str, IndexedStudent] = {}
+        for pos, (sid, (norm, h)) in enumerate(current.items()):
+            e = existing.get(sid)
+            if e is None:
+                e = IndexedStudent(
+                    student_id=sid,
+                    position=pos,
+                    answer_hash=h,
+                    shingles=_ngram_shingles(norm, n=n),
                 )
-                continue
+            e.position = pos
+            entries[sid] = e
+        order = list(entries)
 
-            sid_best, sim_max = max(sims_to_others, key=lambda t: t[1])
-            sim_mean = sum(s for _, s in sims_to_others) / len(sims_to_others)
+        logger.info(
+            "Updating peer similarity for %s: %d new x %d students",
+            q,
+            len(new_sids),
+            len(order),
+        )
+        new_set = set(new_sids)
+        done_new: Dict[Tuple[str, str], float] = {}
 
-            per_student_rows.append(
-                {
-                    "student_id": sid_i,
-                    "question": q,
-                    "sim_to_others_max": sim_max,         
-                    "most_similar_student_id": sid_best,  
-                    "sim_to_others_mean": sim_mean,       
+        for sid_new in new_sids:
+            e_new = entries[sid_new]
+            row_sims: List[Tuple[str, float]] = []
+            for sid_j in order:
+                if sid_j == sid_new:
+                    continue
+                if sid_j in new_set:
+                    # 新しい受験者どうしは 1 回だけ計算して、両方の行で使う
+                    key = (min(sid_new, sid_j), max(sid_new, sid_j))
+                    sim = done_new.get(key)
+                    if sim is None:
+                        sim = _jaccard(e_new.shingles, entries[sid_j].shingles)
+                        done_new[key] = sim
+                        n_compared += 1
+                    row_sims.append((sid_j, sim))
+                    continue
+
+                e_j = entries[sid_j]
+                sim = _jaccard(e_new.shingles, e_j.shingles)
+                n_compared += 1
+                row_sims.append((sid_j, sim))
+
+                # 既存の受験者の統計に 1 人ぶん足し込む
+                keep = _keeps_pair(sim, e_j.top_sims, top_k, min_similarity)
+                e_j.sim_sum += sim
+                e_j.n_others += 1
+                if (
+                    not e_j.most_similar
+                    or sim > e_j.sim_max
+                    or (
+                        sim == e_j.sim_max
+                        and e_new.position < entries[e_j.most_similar].position
+                    )
+                ):
+                    e_j.sim_max = sim
+                    e_j.most_similar = sid_new
+                _push_top_sim(e_j.top_sims, sim, top_k)
+                if keep:
+                    pair_rows.append(_pair_row(q, e_new, e_j, sim))
+
+            # 新しい受験者自身の統計（全件計算と同じく、並び順で最初の最大値を argmax にする）
+            e_new.sim_sum = sum(s for _, s in row_sims)
+            e_new.n_others = len(row_sims)
+            if row_sims:
+                e_new.most_similar, e_new.sim_max = max(row_sims, key=lambda t: t[1])
+            e_new.top_sims = []
+            keep_new = set()
+            if top_k is not None and top_k > 0:
+                keep_new = {
+                    sid_j
+                    for sid_j, _ in heapq.nlargest(top_k, row_sims, key=lambda t: t[1])
                 }
-            )
+            for sid_j, sim in row_sims:
+                _push_top_sim(e_new.top_sims, sim, top_k)
+                if (
+                    keep_all
+                    or sid_j in keep_new
+                    or (min_similarity is not None and sim >= min_similarity)
+                ):
+                    # 既存側の判定で残したペア・新しい受験者どうしの重複は最後に除く
+                    pair_rows.append(_pair_row(q, e_new, entries[sid_j], sim))
 
-    per_student_df = pd.DataFrame(per_student_rows)
-    pair_df = pd.DataFrame(pair_rows)
-    return per_student_df, pair_df
+        n_new_total += len(new_sids)
+        index.upsert(q, (entries[sid] for sid in new_sids))
+        index.update_stats(q, (e for sid, e in entries.items() if sid not in new_set))
+
+    new_pair_df = pd.DataFrame(
+        pair_rows,
+        columns=["question", "student_id_a", "student_id_b", "similarity"],
+    ).drop_duplicates(subset=["question", "student_id_a", "student_id_b"])
+    logger.info(
+        "Peer similarity incremental update: %d new answer(s), %d comparison(s), %d new pair(s)",
+        n_new_total,
+        n_compared,
+        len(new_pair_df),
+    )
+    student_ids = [str(s) for s in df["student_id"]]
+    return index.to_frame(), new_pair_df.reset_index(drop=True), student_ids
+
+
+def _pair_row(
+    question: str,
+    e1: IndexedStudent,
+    e2: IndexedStudent,
+    sim: float,
+) -> Dict:
+    # ペアは回答シートで前にいるほうを a にする（全件計算の i < j と同じ向き）
+    a, b = (e1, e2) if e1.position < e2.position else (e2, e1)
+    return {
+        "question": question,
+        "student_id_a": a.student_id,
+        "student_id_b": b.student_id,
+        "similarity": sim,
+    }
+
+
+def compute_peer_similarity_for_responses(
+    responses_excel_path: Path,
+    n: int | None = None,
+    jobs: int | None = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    匿名回答Excelから、受験者同士の類似度特徴量を計算する（全ペア版）。
+    n を指定しなければ config.PEER_SIMILARITY_NGRAM を使う。
+
+    戻り値:
+      per_student_df:
+        student_id, question, sim_to_others_max,
+        most_similar_student_id, sim_to_others_mean
+      pair_df:
+        question, student_id_a, student_id_b, similarity
+    """
+    per_student_df, pair_table = compute_peer_similarity(
+        responses_excel_path,
+        n=n,
+        jobs=jobs,
+    )
+    return per_student_df, pair_table.to_frame()
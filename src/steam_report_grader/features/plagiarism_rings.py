@@ -0,0 +1,172 @@
+# src/steam_report_grader/features/plagiarism_rings.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ..config import RING_MIN_SIMILARITY, RING_MIN_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class UnionFind:
+    """
+    連結成分をまとめるための Union-Find（経路圧縮 + サイズ併合）。
+    辺の数 E に対してほぼ O(E) で動く。
+    """
+
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # 経路圧縮
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+
+@dataclass
+class PlagiarismRing:
+    ring_id: str
+    members: List[str]
+    questions: List[str]
+    edge_count: int
+    max_similarity: float
+    mean_similarity: float
+
+
+def detect_plagiarism_rings(
+    pair_df: pd.DataFrame,
+    min_similarity: float | None = None,
+    min_ring_size: int | None = None,
+) -> List[PlagiarismRing]:
+    """
+    全設問のペア表 (question, student_id_a, student_id_b, similarity) から、
+    類似度 min_similarity 以上のペアを辺とするグラフを作り、
+    Union-Find で連結成分（= 盗用リング候補）をまとめる。
+
+    リングは「辺が張られている設問の数（questions shared）」が多い順 →
+    人数が多い順 → 最大類似度が高い順に並べ、R001, R002, ... を振る。
+    """
+    if min_similarity is None:
+        min_similarity = RING_MIN_SIMILARITY
+    if min_ring_size is None:
+        min_ring_size = RING_MIN_SIZE
+
+    edges = pair_df[pair_df["similarity"] >= min_similarity]
+    if edges.empty:
+        return []
+
+    # student_id → 連番 index（辺に出てくる受験者だけ）
+    codes, uniques = pd.factorize(
+        pd.concat([edges["student_id_a"], edges["student_id_b"]], ignore_index=True)
+    )
+    n_edges = len(edges)
+    a_idx = codes[:n_edges]
+    b_idx = codes[n_edges:]
+
+    uf = UnionFind(len(uniques))
+    for a, b in zip(a_idx.tolist(), b_idx.tolist()):
+        uf.union(a, b)
+
+    roots = np.fromiter((uf.find(i) for i in range(len(uniques))), dtype=np.int64)
+    edge_roots = roots[a_idx]
+
+    # 成分ごとのメンバー / 辺をまとめる
+    members_by_root: Dict[int, List[str]] = {}
+    for i, r in enumerate(roots.tolist()):
+        members_by_root.setdefault(r, []).append(str(uniques[i]))
+
+    edge_df = pd.DataFrame(
+        {
+            "root": edge_roots,
+            "question": edges["question"].astype(str).to_numpy(),
+            "similarity": edges["similarity"].to_numpy(dtype=float),
+        }
+    )
+
+    rings: List[PlagiarismRing] = []
+    for root, g in edge_df.groupby("root", sort=False):
+        members = members_by_root[int(root)]
+        if len(members) < min_ring_size:
+            continue
+        questions = sorted(
+            g["question"].unique().tolist(),
+            key=lambda q: int(q[1:]) if q[1:].isdigit() else 9999,
+        )
+        rings.append(
+            PlagiarismRing(
+                ring_id="",
+                members=sorted(members),
+                questions=questions,
+                edge_count=len(g),
+                max_similarity=float(g["similarity"].max()),
+                mean_similarity=float(g["similarity"].mean()),
+            )
+        )
+
+    rings.sort(
+        key=lambda r: (-len(r.questions), -len(r.members), -r.max_similarity, r.members[0])
+    )
+    for i, ring in enumerate(rings, start=1):
+        ring.ring_id = f"R{i:03d}"
+
+    logger.info(
+        "Detected %d plagiarism rings from %d high-similarity pairs (min_similarity=%.2f)",
+        len(rings),
+        n_edges,
+        min_similarity,
+    )
+    return rings
+
+
+def rings_to_student_frame(rings: List[PlagiarismRing]) -> pd.DataFrame:
+    """
+    リング一覧を 1行 = 1受験者 の表に展開する（final-report で student_id で join する用）。
+    """
+    rows: List[Dict] = []
+    for ring in rings:
+        for sid in ring.members:
+            rows.append(
+                {
+                    "student_id": sid,
+                    "ring_id": ring.ring_id,
+                    "ring_size": len(ring.members),
+                    "ring_questions_shared": len(ring.questions),
+                    "ring_questions": ";".join(ring.questions),
+                    "ring_members": ";".join(ring.members),
+                    "ring_edge_count": ring.edge_count,
+                    "ring_max_similarity": ring.max_similarity,
+                    "ring_mean_similarity": ring.mean_similarity,
+                }
+            )
+
+    columns = [
+        "student_id",
+        "ring_id",
+        "ring_size",
+        "ring_questions_shared",
+        "ring_questions",
+        "ring_members",
+        "ring_edge_count",
+        "ring_max_similarity",
+        "ring_mean_similarity",
+    ]
+    return pd.DataFrame(rows, columns=columns)
@@ -2,6 +2,7 @@
 import re
 from typing import List
 import numpy as np
+import pandas as pd
 from ..config import (
     SYMB_WEIGHT_BOLD,
     SYMB_WEIGHT_HEADING,
@@ -30,9 +31,10 @@ def count_bullets(text: str) -> int:
     return text.count("- ") + text.count("* ")
 
 # 接続詞の頻度（例: さらに、また）
+CONNECTIVES: List[str] = ["また", "さらに", "加えて", "つまり", "例えば", "そのため"]
+
 def count_connectives(text: str) -> int:
-    connectives = ["また", "さらに", "加えて", "つまり", "例えば", "そのため"]
-    return sum(text.count(connective) for connective in connectives)
+    return sum(text.count(connective) for connective in CONNECTIVES)
 
 # 文長の均一性（平均文長 / 文数）
 def calculate_average_sentence_length(text: str) -> float:
@@ -61,4 +63,86 @@ def calculate_symbolic_features(text: str) -> float:
         + (avg_sentence_length / SYMB_SENT_LEN_SCALE) * SYMB_WEIGHT_SENT_LEN
     )
 
-    return min(score, SYMB_MAX_SCORE)
\ No newline at end of file
+    return min(score, SYMB_MAX_SCORE)
+
+
+# -------------------------
+# 列単位（縦持ち DataFrame 全体）でまとめて計算する版
+# -------------------------
+# 1回答ずつ str.count を何度も呼ぶ代わりに、正規表現を事前コンパイルして
+# pandas の .str.count で列ごと一気に数える。
+_BOLD_RE = re.compile(r"\*\*")
+_HEADING_RE = re.compile(r"#")
+_LINE_RE = re.compile(r"---")
+_BULLET_RE = re.compile(r"[-*] ")
+# 接続詞リストは 1 本の alternation にまとめて 1 パスで数える
+# （どの接続詞も他の接続詞と重ならないので、個別に count した合計と一致する）
+_CONNECTIVE_RE = re.compile("|".join(re.escape(c) for c in CONNECTIVES))
+# 文区切り（。！）で区切られた「空白以外を含む」文の数
+_SENTENCE_RE = re.compile(r"[^。！]*[^。！\s][^。！]*")
+# 文区切りと空白で区切られた単語の数（= 各文の len(s.split()) の合計）
+_WORD_RE = re.compile(r"[^\s。！]+")
+
+SYMBOLIC_COMPONENT_COLUMNS: List[str] = [
+    "bold_count",
+    "heading_count",
+    "line_count",
+    "bullet_count",
+    "connective_count",
+    "sentence_count",
+    "avg_sentence_length",
+]
+
+
+def extract_symbolic_features_frame(
+    long_df: pd.DataFrame,
+    text_col: str = "answer",
+) -> pd.DataFrame:
+    """
+    縦持ちの回答 DataFrame（student_id, question, answer）に対して、
+    記号的特徴の各カウントと symbolic_ai_score を列としてまとめて計算する。
+
+    calculate_symbolic_features() と同じスコアになる。
+    戻り値は long_df に以下の列を足したもの:
+      bold_count, heading_count, line_count, bullet_count, connective_count,
+      sentence_count, avg_sentence_length, symbolic_ai_score
+    """
+    out = long_df.copy()
+    text = out[text_col].fillna("").astype(str)
+
+    out["bold_count"] = text.str.count(_BOLD_RE)
+    out["heading_count"] = text.str.count(_HEADING_RE)
+    out["line_count"] = text.str.count(_LINE_RE)
+    out["bullet_count"] = text.str.count(_BULLET_RE)
+    out["connective_count"] = text.str.count(_CONNECTIVE_RE)
+
+    out["sentence_count"] = text.str.count(_SENTENCE_RE)
+    word_count = text.str.count(_WORD_RE)
+    out["avg_sentence_length"] = np.where(
+        out["sentence_count"] > 0,
+        word_count / out["sentence_count"].where(out["sentence_count"] > 0, 1),
+        0.0,
+    )
+
+    score = (
+        out["bold_count"] * SYMB_WEIGHT_BOLD
+        + out["heading_count"] * SYMB_WEIGHT_HEADING
+        + out["line_count"] * SYMB_WEIGHT_LINE
+        + out["bullet_count"] * SYMB_WEIGHT_BULLET
+        + out["connective_count"] * SYMB_WEIGHT_CONNECTIVE
+        + (out["avg_sentence_length"] / SYMB_SENT_LEN_SCALE) * SYMB_WEIGHT_SENT_LEN
+    )
+    out["symbolic_ai_score"] = score.clip(upper=SYMB_MAX_SCORE)
+
+    return out
+
+
+def symbolic_features_for_question(
+    question: str,
+    sub: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    1設問ぶんの縦持ち回答に対して extract_symbolic_features_frame を回す
+    （map_per_question から呼ばれるワーカー）。
+    """
+    return extract_symbolic_features_frame(sub, text_col="answer")
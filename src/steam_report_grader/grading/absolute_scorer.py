@@ -1,6 +1,6 @@
 # src/steam_report_grader/grading/absolute_scorer.py
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Any, List
 import ast
 import logging
@@ -23,11 +23,23 @@ class ScoreResult:
     subscores: Dict[str, float]
     evidence: List[Dict[str, str]]
     raw_response: str
+    # include_relative_features=True で採点したときだけ埋まる
+    relative_summary: str = ""
+    relative_quotes: List[str] = field(default_factory=list)
 
 
 class AbsoluteScorer:
-    def __init__(self, client: LLMClient) -> None:
+    def __init__(
+        self,
+        client: LLMClient,
+        include_relative_features: bool = False,
+    ) -> None:
+        """
+        include_relative_features=True にすると、採点と同じ応答で
+        relative-features 用の要約・引用3つも出させる（別パスの LLM 呼び出しが不要になる）。
+        """
         self.client = client
+        self.include_relative_features = include_relative_features
 
     def score_answer(
         self,
@@ -41,6 +53,7 @@ class AbsoluteScorer:
             rubric_text=question_rubric.rubric_text,
             answer_text=answer_text,
             max_score=question_rubric.max_score,
+            include_relative_features=self.include_relative_features,
         )
 
         llm_text = self.client.generate(
@@ -90,6 +103,18 @@ class AbsoluteScorer:
                 continue
             evidence_list.append({"aspect": aspect, "quote": quote})
 
+        relative_summary = ""
+        relative_quotes: List[str] = []
+        if self.include_relative_features:
+            relative_summary = parsed.get("relative_summary", "") or ""
+            if not isinstance(relative_summary, str):
+                relative_summary = str(relative_summary)
+
+            raw_quotes = parsed.get("relative_quotes", []) or []
+            if not isinstance(raw_quotes, list):
+                raw_quotes = [raw_quotes]
+            relative_quotes = [str(x) for x in raw_quotes if str(x).strip()][:3]
+
         return ScoreResult(
             student_id=student_id,
             question_label=question_rubric.question_label,
@@ -99,6 +124,8 @@ class AbsoluteScorer:
             subscores=subscores,
             evidence=evidence_list,
             raw_response=llm_text,
+            relative_summary=relative_summary,
+            relative_quotes=relative_quotes,
         )
 
     def _safe_parse_json(self, text: str) -> Dict[str, Any]:
@@ -0,0 +1,176 @@
+# src/steam_report_grader/io/ai_similarity_index.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+import hashlib
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+AI_SIMILARITY_INDEX_FORMAT = "ai_similarity_index_v1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    question  TEXT NOT NULL,
+    ref_id    TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    PRIMARY KEY (question, ref_id)
+);
+CREATE TABLE IF NOT EXISTS answers (
+    question    TEXT NOT NULL,
+    student_id  TEXT NOT NULL,
+    answer_hash TEXT NOT NULL,
+    sim_sum     REAL NOT NULL,
+    n_refs      INTEGER NOT NULL,
+    sim_max     REAL NOT NULL,
+    best_ref_id TEXT NOT NULL,
+    PRIMARY KEY (question, student_id)
+);
+"""
+
+
+def text_hash(normalized_text: str) -> str:
+    """
+    正規化済みテキストのキー。回答・AI参照が書き換わったかの判定に使う。
+    """
+    return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class AISimilarityState:
+    """
+    1設問・1受験者ぶんの、これまでに比べた AI参照に対する集計値。
+    平均は参照が増えても足し込めるように sim_sum / n_refs で持つ。
+    """
+    answer_hash: str
+    sim_sum: float = 0.0
+    n_refs: int = 0
+    sim_max: float = 0.0
+    best_ref_id: str = ""
+
+    @property
+    def sim_mean(self) -> float:
+        return self.sim_sum / self.n_refs if self.n_refs else 0.0
+
+
+class AISimilarityIndex:
+    """
+    ai-similarity の差分更新用の状態（SQLite）。
+    設問ごとに「比べ終わった AI参照の ref_id とテキストのハッシュ」と、
+    受験者ごとの max / mean / argmax を持つ。
+
+        index = AISimilarityIndex(path)
+        if index.matches(ngram=3):
+            covered, states = index.load_question("Q1")
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "AISimilarityIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def matches(self, ngram: int) -> bool:
+        rows = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        return (
+            rows.get("format") == json.dumps(AI_SIMILARITY_INDEX_FORMAT)
+            and rows.get("ngram") == json.dumps(ngram)
+        )
+
+    def reset(self, ngram: int) -> None:
+        """
+        中身を消して、n-gram 長を書き直す（全件計算のとき）。
+        """
+        with self._conn:
+            self._conn.execute("DELETE FROM refs")
+            self._conn.execute("DELETE FROM answers")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("format", json.dumps(AI_SIMILARITY_INDEX_FORMAT)),
+                    ("ngram", json.dumps(ngram)),
+                ],
+            )
+
+    def load_question(
+        self,
+        question: str,
+    ) -> Tuple[Dict[str, str], Dict[str, AISimilarityState]]:
+        """
+        (比べ終わった参照 {ref_id: text_hash}, 受験者ごとの状態 {student_id: state}) を返す。
+        """
+        covered = dict(
+            self._conn.execute(
+                "SELECT ref_id, text_hash FROM refs WHERE question = ?",
+                (question,),
+            ).fetchall()
+        )
+        states = {
+            r[0]: AISimilarityState(
+                answer_hash=r[1],
+                sim_sum=r[2],
+                n_refs=r[3],
+                sim_max=r[4],
+                best_ref_id=r[5],
+            )
+            for r in self._conn.execute(
+                "SELECT student_id, answer_hash, sim_sum, n_refs, sim_max, best_ref_id"
+                " FROM answers WHERE question = ?",
+                (question,),
+            )
+        }
+        return covered, states
+
+    def replace_question(
+        self,
+        question: str,
+        covered: Dict[str, str],
+        states: Iterable[Tuple[str, AISimilarityState]],
+    ) -> None:
+        """
+        1設問ぶんの状態をまるごと書き換える（消えた受験者の行も消える）。
+        """
+        with self._conn:
+            self._conn.execute("DELETE FROM refs WHERE question = ?", (question,))
+            self._conn.execute("DELETE FROM answers WHERE question = ?", (question,))
+            self._conn.executemany(
+                "INSERT INTO refs (question, ref_id, text_hash) VALUES (?, ?, ?)",
+                [(question, ref_id, h) for ref_id, h in covered.items()],
+            )
+            self._conn.executemany(
+                "INSERT INTO answers (question, student_id, answer_hash, sim_sum,"
+                " n_refs, sim_max, best_ref_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        question,
+                        sid,
+                        s.answer_hash,
+                        s.sim_sum,
+                        s.n_refs,
+                        s.sim_max,
+                        s.best_ref_id,
+                    )
+                    for sid, s in states
+                ],
+            )
+
+
+__all__ = ["AISimilarityIndex", "AISimilarityState", "text_hash"]
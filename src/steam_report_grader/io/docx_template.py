@@ -0,0 +1,190 @@
+# src/steam_report_grader/io/docx_template.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Tuple
+from xml.sax.saxutils import escape
+import io
+import numbers
+import re
+import zipfile
+
+DOCUMENT_PART = "word/document.xml"
+
+# Word は入力の途中で run を分けることがあるので、{{ ... }} の間に挟まったタグは許す
+_SPLIT_PLACEHOLDER_RE = re.compile(
+    r"\{(?:<[^>]+>)*\{((?:[^{}<]|<[^>]+>)+?)\}(?:<[^>]+>)*\}"
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([\w.]+)\s*\}\}")
+# 段落（<w:p>…</w:p>）単位で区切る。<w:pPr> などに引っかからないよう後ろを限定する
+_PARAGRAPH_RE = re.compile(r"<w:p(?:\s[^>]*)?>.*?</w:p>|<w:p(?:\s[^>]*)?/>", re.DOTALL)
+_SECTION_RE = re.compile(r"^\{\{\s*([#/])\s*([\w.]+)\s*\}\}$")
+
+
+def _normalize_placeholders(xml: str) -> str:
+    """
+    run をまたいで分割された {{name}} を 1 つの run の中にまとめる。
+    """
+    def _join(m: re.Match) -> str:
+        return "{{" + _TAG_RE.sub("", m.group(1)) + "}}"
+
+    return _SPLIT_PLACEHOLDER_RE.sub(_join, xml)
+
+
+def _xml_text(value: Any) -> str:
+    """
+    差し込む値を document.xml 用にエスケープする。改行は <w:br/> にする。
+    """
+    text = escape("" if value is None else str(value))
+    return text.replace("\n", '</w:t><w:br/><w:t xml:space="preserve">')
+
+
+def _lookup(stack: List[Mapping[str, Any]], name: str) -> Any:
+    # 内側（設問ごとの値）→ 外側（受験者全体の値）の順に探す
+    for ctx in reversed(stack):
+        if name in ctx:
+            return ctx[name]
+    return None
+
+
+def _has_value(value: Any) -> bool:
+    """
+    {{#name}} セクションを 1 回出すかどうか。
+    None と空の文字列・リスト・辞書は「値なし」、数値は 0 でも「値あり」（相対順位 0 位など）。
+    """
+    if value is None:
+        return False
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return True
+    return bool(value)
+
+
+def _split_paragraphs(xml: str) -> List[Tuple[str, str]]:
+    """
+    body の XML を [(kind, xml)] に分ける。
+    kind は "#name" / "/name"（セクション開始・終了だけの段落）か "" （それ以外）。
+    """
+    parts: List[Tuple[str, str]] = []
+    pos = 0
+    for m in _PARAGRAPH_RE.finditer(xml):
+        if m.start() > pos:
+            parts.append(("", xml[pos:m.start()]))
+        para = m.group(0)
+        marker = _SECTION_RE.match(_TAG_RE.sub("", para).strip())
+        if marker:
+            parts.append((marker.group(1) + marker.group(2), para))
+        else:
+            parts.append(("", para))
+        pos = m.end()
+    if pos < len(xml):
+        parts.append(("", xml[pos:]))
+    return parts
+
+
+def _render_parts(
+    parts: List[Tuple[str, str]],
+    stack: List[Mapping[str, Any]],
+) -> str:
+    out: List[str] = []
+    i = 0
+    while i < len(parts):
+        kind, chunk = parts[i]
+        if not kind.startswith("#"):
+            out.append(
+                _PLACEHOLDER_RE.sub(
+                    lambda m: _xml_text(_lookup(stack, m.group(1))), chunk
+                )
+            )
+            i += 1
+            continue
+
+        # {{#name}} 〜 {{/name}} の段落をまとめて処理する（入れ子可）
+        name = kind[1:]
+        depth = 1
+        j = i + 1
+        while j < len(parts):
+            if parts[j][0] == "#" + name:
+                depth += 1
+            elif parts[j][0] == "/" + name:
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+        if j >= len(parts):
+            raise ValueError(f"Unclosed section in docx template: {{{{#{name}}}}}")
+
+        inner = parts[i + 1 : j]
+        value = _lookup(stack, name)
+        if isinstance(value, list):
+            # リストなら要素ごとにくり返す
+            for item in value:
+                out.append(_render_parts(inner, stack + [item]))
+        elif _has_value(value):
+            # 値があるときだけ 1 回出す（None や空文字なら段落ごと消える）
+            out.append(_render_parts(inner, stack))
+        i = j + 1
+    return "".join(out)
+
+
+class DocxTemplate:
+    """
+    .docx をテンプレートとして 1 回だけ読み込み、受験者ごとに
+    word/document.xml のプレースホルダだけを埋めて書き出す。
+
+    テンプレートの書き方（Word 上でそのまま入力すればよい）:
+    - {{name}}                         : 値を差し込む
+    - {{#name}} / {{/name}} だけの段落  : name がリストならくり返し、
+                                         値があれば（数値は 0 でも）1 回だけ出し、
+                                         None や空なら消す
+
+        template = DocxTemplate.from_path("data/templates/feedback_template.docx")
+        template.render({"title": "S001", "questions": [...]}, out_path)
+    """
+
+    def __init__(self, parts: Dict[str, bytes], infos: List[zipfile.ZipInfo]) -> None:
+        self.parts = parts
+        self.infos = infos
+        xml = parts[DOCUMENT_PART].decode("utf-8")
+        xml = _normalize_placeholders(xml)
+        self._parts_cache = _split_paragraphs(xml)
+
+        # document.xml 以外（スタイル・テーマなど）は受験者によらず同じなので、
+        # 圧縮済みの zip を 1 回だけ作っておき、毎回そこに document.xml を追記する
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for info in infos:
+                if info.filename != DOCUMENT_PART:
+                    zf.writestr(info.filename, parts[info.filename])
+        self._static_zip = buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DocxTemplate":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            infos = zf.infolist()
+            parts = {info.filename: zf.read(info.filename) for info in infos}
+        if DOCUMENT_PART not in parts:
+            raise ValueError("docx template has no word/document.xml")
+        return cls(parts, infos)
+
+    @classmethod
+    def from_path(cls, path: Path | str) -> "DocxTemplate":
+        return cls.from_bytes(Path(path).read_bytes())
+
+    def render_document_xml(self, context: Mapping[str, Any]) -> str:
+        return _render_parts(self._parts_cache, [context])
+
+    def render(self, context: Mapping[str, Any], out_path: Path | str) -> None:
+        """
+        context を差し込んだ .docx を out_path に書く。
+        document.xml 以外のパーツはテンプレートを圧縮済みのまま使う。
+        """
+        document_xml = self.render_document_xml(context).encode("utf-8")
+
+        buf = io.BytesIO(self._static_zip)
+        with zipfile.ZipFile(buf, "a", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(DOCUMENT_PART, document_xml)
+
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_bytes(buf.getvalue())
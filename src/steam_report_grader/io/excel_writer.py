@@ -1,12 +1,120 @@
 # src/steam_report_grader/io/excel_writer.py
 from pathlib import Path
-from typing import List
+from typing import Iterable, List, Tuple, Union
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
 from openpyxl.utils import get_column_letter
 from typing import Optional
-import pandas as pd
 from ..preprocess.anonymizer import StudentRecord
 
+# 列幅を決めるときに見る行数（全行を見ると回答本文の列で遅くなるので間引く）
+WIDTH_SAMPLE_ROWS = 2000
+# 列幅の上限（文字数）と、文字数→Excel 幅の係数
+WIDTH_MAX_CHARS = 80
+WIDTH_PER_CHAR = 0.8
+WIDTH_MIN = 15
+# 1 回に書き出す行数（この単位で NaN → 空欄 の変換をする）
+WRITE_CHUNK_ROWS = 5000
+
+SheetSpec = Tuple[str, pd.DataFrame]
+
+
+def _sample_rows(df: pd.DataFrame, n: int = WIDTH_SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    先頭から末尾まで等間隔に n 行取り出す（乱数は使わないので毎回同じ幅になる）。
+    """
+    if len(df) <= n:
+        return df
+    idx = np.linspace(0, len(df) - 1, n).astype(int)
+    return df.iloc[idx]
+
+
+def compute_column_widths(df: pd.DataFrame) -> List[float]:
+    """
+    サンプルした行の文字数から列幅を決める。
+    セルを 1 つずつ見るのではなく、列ごとに .str.len() でまとめて計算する。
+    """
+    sample = _sample_rows(df)
+    header_len = np.array([len(str(c)) for c in df.columns], dtype=float)
+    if sample.empty:
+        max_len = header_len
+    else:
+        lens = sample.astype(str).apply(lambda col: col.str.len())
+        lens = lens.where(sample.notna(), 0)
+        max_len = np.maximum(lens.max(axis=0).to_numpy(dtype=float), header_len)
+
+    max_len = np.minimum(max_len, WIDTH_MAX_CHARS)  # 上限決めておく
+    return np.maximum(WIDTH_MIN, max_len * WIDTH_PER_CHAR).tolist()
+
+
+def _iter_rows(df: pd.DataFrame) -> Iterable[tuple]:
+    # NaN / NA は空欄にする（pandas.to_excel と同じ）。全体を一度にコピーしないよう分割
+    for start in range(0, len(df), WRITE_CHUNK_ROWS):
+        chunk = df.iloc[start : start + WRITE_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_excel_streaming(
+    path: Path,
+    sheets: Iterable[SheetSpec],
+    wrap_text: Union[bool, str] = "auto",
+) -> None:
+    """
+    openpyxl の write-only モードでシートを順番に書き出す。
+    通常モード（pd.ExcelWriter）と違い、ワークブック全体をメモリに持たないので
+    回答本文入りの大きなシートでもメモリが増えない。
+
+    - 列幅は compute_column_widths でサンプルから決める
+    - wrap_text=True なら全セル、"auto" なら幅が上限に達する長文の列だけ折り返す
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    wb = Workbook(write_only=True)
+    header_font = Font(bold=True)
+    wrap = Alignment(wrap_text=True, vertical="top")
+    long_width = WIDTH_MAX_CHARS * WIDTH_PER_CHAR
+
+    for sheet_name, df in sheets:
+        ws = wb.create_sheet(title=sheet_name)
+        widths = compute_column_widths(df)
+        for i, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(i)].width = width
+
+        if wrap_text == "auto":
+            wrap_cols = [w >= long_width for w in widths]
+        else:
+            wrap_cols = [bool(wrap_text)] * len(widths)
+
+        header = []
+        for name in df.columns:
+            cell = WriteOnlyCell(ws, value=str(name))
+            cell.font = header_font
+            header.append(cell)
+        ws.append(header)
+
+        if not any(wrap_cols):
+            for row in _iter_rows(df):
+                ws.append(row)
+            continue
+
+        for row in _iter_rows(df):
+            out = []
+            for value, do_wrap in zip(row, wrap_cols):
+                if do_wrap and value is not None:
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.alignment = wrap
+                    out.append(cell)
+                else:
+                    out.append(value)
+            ws.append(out)
+
+    wb.save(path)
+
 def write_responses_excel(path: Path, records: List[StudentRecord]) -> None:
     """
     匿名化した回答一覧を Excel に書き出す。
@@ -24,22 +132,7 @@ def write_responses_excel(path: Path, records: List[StudentRecord]) -> None:
         rows.append(row)
 
     df = pd.DataFrame(rows)
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="responses")
-
-        ws = writer.sheets["responses"]
-
-        # wrap_text & 列幅
-        for col_cells in ws.columns:
-            col_letter = get_column_letter(col_cells[0].column)
-            max_len = 0
-            for cell in col_cells:
-                if cell.value is None:
-                    continue
-                cell.alignment = cell.alignment.copy(wrap_text=True)
-                text = str(cell.value)
-                max_len = max(max_len, min(len(text), 80))  # 上限決めておく
-            ws.column_dimensions[col_letter].width = max(15, max_len * 0.8)
+    write_excel_streaming(path, [("responses", df)], wrap_text=True)
 
 
 def write_id_map_excel(path: Path, id_map_rows: List[dict]) -> None:
@@ -50,8 +143,7 @@ def write_id_map_excel(path: Path, id_map_rows: List[dict]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
     df = pd.DataFrame(id_map_rows)
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="id_map")
+    write_excel_streaming(path, [("id_map", df)])
 
 def write_scores_summary_excel(
     path: Path,
@@ -65,11 +157,10 @@ def write_scores_summary_excel(
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        summary_with_names_df.to_excel(writer, index=False, sheet_name="scores")
-
-        if raw_scores_df is not None:
-            raw_scores_df.to_excel(writer, index=False, sheet_name="details")
+    sheets: List[SheetSpec] = [("scores", summary_with_names_df)]
+    if raw_scores_df is not None:
+        sheets.append(("details", raw_scores_df))
+    write_excel_streaming(path, sheets)
 
 def write_ai_cluster_report_excel(
     path: Path,
@@ -93,9 +184,10 @@ def write_ai_cluster_report_excel(
         suffixes=("", "_cluster"),
     )
 
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        merged.to_excel(writer, index=False, sheet_name="clusters")
-        cluster_analysis_df.to_excel(writer, index=False, sheet_name="cluster_summary")
+    write_excel_streaming(
+        path,
+        [("clusters", merged), ("cluster_summary", cluster_analysis_df)],
+    )
 
 def write_score_explanations_excel(
     path: Path,
@@ -110,9 +202,7 @@ def write_score_explanations_excel(
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        brief_df.to_excel(writer, index=False, sheet_name="brief")
-        detailed_df.to_excel(writer, index=False, sheet_name="detailed")
+    write_excel_streaming(path, [("brief", brief_df), ("detailed", detailed_df)])
 
 
 def write_ai_likeness_report_excel(
@@ -126,8 +216,7 @@ def write_ai_likeness_report_excel(
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        likeness_df.to_excel(writer, index=False, sheet_name="ai_likeness")
+    write_excel_streaming(path, [("ai_likeness", likeness_df)])
 
 
 def write_ai_suspect_report_excel(
@@ -150,8 +239,9 @@ def write_ai_suspect_report_excel(
             na_position="last",
         )
     else:
-        suspected_df = full_features_df.copy()
+        suspected_df = full_features_df
 
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        suspected_df.to_excel(writer, index=False, sheet_name="suspected")
-        full_features_df.to_excel(writer, index=False, sheet_name="full_features")
+    write_excel_streaming(
+        path,
+        [("suspected", suspected_df), ("full_features", full_features_df)],
+    )
@@ -0,0 +1,385 @@
+# src/steam_report_grader/io/peer_pair_store.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 1ペア = 14 byte の固定長レコード
+# （CSV だと question / student_id の文字列を毎行くり返すので桁違いに大きくなる）
+PAIR_RECORD_DTYPE = np.dtype(
+    [
+        ("question", "<i2"),     # questions の index
+        ("student_a", "<i4"),    # student_ids の index（a < b の向きで保存）
+        ("student_b", "<i4"),
+        ("similarity", "<f4"),
+    ]
+)
+
+PAIR_STORE_FORMAT = "peer_pairs_v1"
+
+
+def pair_store_paths(path: Path | str) -> Tuple[Path, Path]:
+    """
+    コンパクト形式の保存先 (レコード本体 .bin, メタ情報 .meta.json) を返す。
+    path の拡張子は無視する（peer_similarity_pairs.csv → peer_similarity_pairs.bin）。
+    """
+    path = Path(path)
+    return path.with_suffix(".bin"), path.with_suffix(".meta.json")
+
+
+@dataclass
+class PeerPairChunk:
+    """
+    1設問ぶんのペア（student_ids の index で持つ）。
+    similarity は計算時の精度（float64）のまま持ち、保存時に float32 にする。
+    """
+    question: str
+    student_a: np.ndarray
+    student_b: np.ndarray
+    similarity: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.similarity)
+
+
+@dataclass
+class PeerPairTable:
+    """
+    peer-similarity のペア表をメモリ上で持つためのコンテナ。
+    student_ids / questions は全設問で共通の index 表。
+    """
+    student_ids: List[str]
+    questions: List[str]
+    chunks: List[PeerPairChunk] = field(default_factory=list)
+    top_k: Optional[int] = None
+    min_similarity: Optional[float] = None
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self.chunks)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        student_ids: List[str],
+        questions: List[str],
+        top_k: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+    ) -> "PeerPairTable":
+        """
+        (question, student_id_a, student_id_b, similarity) の DataFrame から組み立てる。
+        student_ids に無い受験者を含むペアは捨てる。
+        """
+        table = cls(
+            student_ids=list(student_ids),
+            questions=list(questions),
+            top_k=top_k,
+            min_similarity=min_similarity,
+        )
+        sid_index = pd.Series(np.arange(len(student_ids)), index=list(student_ids))
+        a = df["student_id_a"].astype(str).map(sid_index)
+        b = df["student_id_b"].astype(str).map(sid_index)
+        ok = a.notna() & b.notna()
+        dropped = int((~ok).sum())
+        if dropped:
+            logger.warning("Dropped %d pair(s) with unknown student_id", dropped)
+        df = df[ok]
+        a = a[ok].to_numpy(dtype=np.int32)
+        b = b[ok].to_numpy(dtype=np.int32)
+        q_col = df["question"].astype(str).to_numpy()
+        sim = df["similarity"].to_numpy(dtype=np.float64)
+        for q in questions:
+            mask = q_col == q
+            if not mask.any():
+                continue
+            # 保存形式に合わせて a < b の向きにそろえる
+            qa, qb = a[mask], b[mask]
+            table.chunks.append(
+                PeerPairChunk(
+                    question=q,
+                    student_a=np.minimum(qa, qb),
+                    student_b=np.maximum(qa, qb),
+                    similarity=sim[mask],
+                )
+            )
+        return table
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        従来の peer_similarity_pairs.csv と同じ形
+        (question, student_id_a, student_id_b, similarity) に展開する。
+        """
+        if not self.chunks:
+            return pd.DataFrame(
+                columns=["question", "student_id_a", "student_id_b", "similarity"]
+            )
+        sids = np.array(self.student_ids, dtype=object)
+        frames = [
+            pd.DataFrame(
+                {
+                    "question": c.question,
+                    "student_id_a": sids[c.student_a],
+                    "student_id_b": sids[c.student_b],
+                    "similarity": c.similarity,
+                }
+            )
+            for c in self.chunks
+        ]
+        return pd.concat(frames, ignore_index=True)
+
+
+class PeerPairWriter:
+    """
+    ペア表を設問ごとにコンパクト形式（.bin + .meta.json）へ追記していく writer。
+
+        with PeerPairWriter(path, student_ids, questions) as w:
+            for chunk in chunks:
+                w.write_chunk(chunk)
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        student_ids: List[str],
+        questions: List[str],
+        top_k: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+    ) -> None:
+        self.bin_path, self.meta_path = pair_store_paths(path)
+        self.student_ids = list(student_ids)
+        self.questions = list(questions)
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self._q_index = {q: i for i, q in enumerate(self.questions)}
+        self._offsets: Dict[str, List[int]] = {}
+        self._n_records = 0
+        self._fh = None
+
+    def __enter__(self) -> "PeerPairWriter":
+        self.bin_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.bin_path.open("wb")
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write_chunk(self, chunk: PeerPairChunk) -> None:
+        # 設問内は (a, b) 順に並べておくと、引くときに二分探索できる
+        order = np.lexsort((chunk.student_b, chunk.student_a))
+        rec = np.empty(len(chunk), dtype=PAIR_RECORD_DTYPE)
+        rec["question"] = self._q_index[chunk.question]
+        rec["student_a"] = chunk.student_a[order]
+        rec["student_b"] = chunk.student_b[order]
+        rec["similarity"] = chunk.similarity[order]
+        rec.tofile(self._fh)
+
+        self._offsets[chunk.question] = [self._n_records, len(rec)]
+        self._n_records += len(rec)
+
+    def close(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        self._fh = None
+
+        meta = {
+            "format": PAIR_STORE_FORMAT,
+            "n_records": self._n_records,
+            "student_ids": self.student_ids,
+            "questions": self.questions,
+            "offsets": self._offsets,
+            "top_k": self.top_k,
+            "min_similarity": self.min_similarity,
+        }
+        self.meta_path.write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+        )
+
+
+def write_peer_pairs(path: Path | str, table: PeerPairTable) -> Path:
+    """
+    PeerPairTable をコンパクト形式で保存して、.bin のパスを返す。
+    """
+    with PeerPairWriter(
+        path,
+        student_ids=table.student_ids,
+        questions=table.questions,
+        top_k=table.top_k,
+        min_similarity=table.min_similarity,
+    ) as w:
+        for chunk in table.chunks:
+            w.write_chunk(chunk)
+    return w.bin_path
+
+
+class PeerPairStore:
+    """
+    コンパクト形式のペア表を memmap で開いて引くための読み取り専用クラス。
+
+        store = PeerPairStore.open("data/intermediate/features/peer_similarity_pairs.bin")
+        store.get_similarity("Q1", "S001", "S014")
+    """
+
+    def __init__(self, records: np.ndarray, meta: Dict) -> None:
+        self.records = records
+        self.meta = meta
+        self.student_ids: List[str] = list(meta["student_ids"])
+        self.questions: List[str] = list(meta["questions"])
+        self._sid_index = {sid: i for i, sid in enumerate(self.student_ids)}
+        self._n_students = len(self.student_ids)
+        self._keys: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def open(cls, path: Path | str) -> "PeerPairStore":
+        bin_path, meta_path = pair_store_paths(path)
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("format") != PAIR_STORE_FORMAT:
+            raise ValueError(f"Unknown peer pair store format: {meta.get('format')}")
+
+        if meta["n_records"] > 0:
+            records = np.memmap(bin_path, dtype=PAIR_RECORD_DTYPE, mode="r")
+        else:
+            records = np.empty(0, dtype=PAIR_RECORD_DTYPE)
+        logger.info(
+            "Opened peer pair store %s (records=%d, students=%d)",
+            bin_path,
+            meta["n_records"],
+            len(meta["student_ids"]),
+        )
+        return cls(records, meta)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _question_records(self, question: str) -> np.ndarray:
+        start, count = self.meta["offsets"].get(question, [0, 0])
+        return self.records[start : start + count]
+
+    def _question_keys(self, question: str) -> np.ndarray:
+        keys = self._keys.get(question)
+        if keys is None:
+            rec = self._question_records(question)
+            keys = (
+                rec["student_a"].astype(np.int64) * self._n_students
+                + rec["student_b"].astype(np.int64)
+            )
+            self._keys[question] = keys
+        return keys
+
+    def get_similarity(
+        self,
+        question: str,
+        student_id_a: str,
+        student_id_b: str,
+    ) -> Optional[float]:
+        """
+        (question, a, b) の類似度を返す。保存されていない（枝刈りされた）ペアは None。
+        a / b の順番はどちらでもよい。
+        """
+        ia = self._sid_index.get(str(student_id_a))
+        ib = self._sid_index.get(str(student_id_b))
+        if ia is None or ib is None or ia == ib:
+            return None
+        if ia > ib:
+            ia, ib = ib, ia
+
+        keys = self._question_keys(question)
+        key = ia * self._n_students + ib
+        pos = int(np.searchsorted(keys, key))
+        if pos < len(keys) and keys[pos] == key:
+            return float(self._question_records(question)["similarity"][pos])
+        return None
+
+    def pairs_for_student(
+        self,
+        student_id: str,
+        question: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        ある受験者が含まれるペアを類似度の高い順に返す。
+        """
+        idx = self._sid_index.get(str(student_id))
+        if idx is None or (question is not None and question not in self.questions):
+            return self.to_frame().iloc[0:0]
+
+        rec = self.records
+        mask = (rec["student_a"] == idx) | (rec["student_b"] == idx)
+        if question is not None:
+            mask &= rec["question"] == self.questions.index(question)
+        df = self._records_to_frame(rec[mask])
+        return df.sort_values("similarity", ascending=False).reset_index(drop=True)
+
+    def _records_to_frame(self, rec: np.ndarray) -> pd.DataFrame:
+        sids = np.array(self.student_ids, dtype=object)
+        qs = np.array(self.questions, dtype=object)
+        return pd.DataFrame(
+            {
+                "question": qs[rec["question"]],
+                "student_id_a": sids[rec["student_a"]],
+                "student_id_b": sids[rec["student_b"]],
+                "similarity": rec["similarity"].astype(float),
+            }
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        peer_similarity_pairs.csv と同じ列構成の DataFrame に展開する。
+        """
+        return self._records_to_frame(np.asarray(self.records))
+
+
+def load_peer_pair_frame(
+    path: Path | str,
+    min_similarity: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    peer-similarity のペア表を (question, student_id_a, student_id_b, similarity) で読む。
+    - path が存在する CSV ならそれを読む
+    - なければ同名のコンパクト形式（.bin + .meta.json）を探して読む
+    - 両方あるときは新しい方を読む（古い方が残っているのは想定外なので警告する）
+    min_similarity を渡すと、その値以上のペアだけに絞ってから展開する。
+    """
+    path = Path(path)
+    bin_path, meta_path = pair_store_paths(path)
+
+    use_csv = path.suffix.lower() == ".csv" and path.exists()
+    if use_csv and meta_path.exists():
+        # .meta.json は .bin を書き終えてから書くので、コンパクト形式の時刻はこちらで見る
+        use_csv = path.stat().st_mtime >= meta_path.stat().st_mtime
+        logger.warning(
+            "Both %s and %s exist; reading the newer one (%s)",
+            path,
+            meta_path,
+            path if use_csv else bin_path,
+        )
+
+    if use_csv:
+        df = pd.read_csv(path)
+        if df.empty:
+            return pd.DataFrame(
+                columns=["question", "student_id_a", "student_id_b", "similarity"]
+            )
+        df["question"] = df["question"].astype(str)
+        df["student_id_a"] = df["student_id_a"].astype(str)
+        df["student_id_b"] = df["student_id_b"].astype(str)
+        if min_similarity is not None:
+            df = df[df["similarity"] >= min_similarity].reset_index(drop=True)
+        return df
+
+    if meta_path.exists():
+        store = PeerPairStore.open(bin_path)
+        rec = np.asarray(store.records)
+        if min_similarity is not None:
+            rec = rec[rec["similarity"] >= min_similarity]
+        return store._records_to_frame(rec)
+
+    raise FileNotFoundError(f"Peer similarity pairs not found: {path} / {bin_path}")
@@ -0,0 +1,259 @@
+# src/steam_report_grader/io/peer_similarity_index.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import json
+import logging
+import sqlite3
+import zlib
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PEER_INDEX_FORMAT = "peer_similarity_index_v1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    question     TEXT NOT NULL,
+    student_id   TEXT NOT NULL,
+    position     INTEGER NOT NULL,
+    answer_hash  TEXT NOT NULL,
+    shingles     BLOB NOT NULL,
+    sim_sum      REAL NOT NULL,
+    n_others     INTEGER NOT NULL,
+    sim_max      REAL NOT NULL,
+    most_similar TEXT NOT NULL,
+    top_sims     TEXT NOT NULL,
+    PRIMARY KEY (question, student_id)
+);
+"""
+
+
+def answer_hash(normalized_answer: str) -> str:
+    """
+    正規化済み回答のキー。これが変わった受験者は差分更新できない（全件再計算に回す）。
+    """
+    return hashlib.sha256(normalized_answer.encode("utf-8")).hexdigest()
+
+
+def _pack_shingles(shingles: set[str]) -> bytes:
+    return zlib.compress(
+        json.dumps(sorted(shingles), ensure_ascii=False).encode("utf-8")
+    )
+
+
+def _unpack_shingles(blob: bytes) -> set[str]:
+    return set(json.loads(zlib.decompress(blob).decode("utf-8")))
+
+
+@dataclass
+class IndexedStudent:
+    """
+    1設問・1受験者ぶんの索引エントリ。
+    平均は sim_sum / n_others で出す（人数が増えても足し込むだけで済むように和で持つ）。
+    top_sims は他の受験者との類似度の上位 top_k 個（降順）。ペア表の枝刈り判定に使う。
+    """
+    student_id: str
+    position: int
+    answer_hash: str
+    shingles: set[str]
+    sim_sum: float = 0.0
+    n_others: int = 0
+    sim_max: float = 0.0
+    most_similar: str = ""
+    top_sims: List[float] = field(default_factory=list)
+
+    @property
+    def sim_mean(self) -> float:
+        return self.sim_sum / self.n_others if self.n_others else 0.0
+
+
+class PeerSimilarityIndex:
+    """
+    peer-similarity の差分更新用の索引（SQLite）。
+    設問ごとに、各受験者の n-gram 集合と、現在の max / mean / argmax を持つ。
+
+        index = PeerSimilarityIndex(path)
+        if index.matches(ngram=3, top_k=None, min_similarity=None):
+            students = index.load_question("Q1")
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "PeerSimilarityIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ---- メタ情報 ----
+
+    def meta(self) -> Dict[str, object]:
+        rows = self._conn.execute("SELECT key, value FROM meta").fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def matches(
+        self,
+        ngram: int,
+        top_k: Optional[int],
+        min_similarity: Optional[float],
+    ) -> bool:
+        """
+        この索引が同じ設定（n-gram 長・ペア表の枝刈り条件）で作られたものか。
+        """
+        meta = self.meta()
+        return (
+            meta.get("format") == PEER_INDEX_FORMAT
+            and meta.get("ngram") == ngram
+            and meta.get("top_k") == top_k
+            and meta.get("min_similarity") == min_similarity
+        )
+
+    def questions(self) -> List[str]:
+        return list(self.meta().get("questions", []))
+
+    def reset(
+        self,
+        ngram: int,
+        top_k: Optional[int],
+        min_similarity: Optional[float],
+        questions: List[str],
+    ) -> None:
+        """
+        中身を消して、全件計算の結果を入れ直す準備をする。
+        """
+        with self._conn:
+            self._conn.execute("DELETE FROM students")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("format", json.dumps(PEER_INDEX_FORMAT)),
+                    ("ngram", json.dumps(ngram)),
+                    ("top_k", json.dumps(top_k)),
+                    ("min_similarity", json.dumps(min_similarity)),
+                    ("questions", json.dumps(questions, ensure_ascii=False)),
+                ],
+            )
+
+    # ---- 受験者ごとのエントリ ----
+
+    def load_question(self, question: str) -> Dict[str, IndexedStudent]:
+        """
+        1設問ぶんのエントリを position 順（= 回答シートの並び順）で返す。
+        """
+        rows = self._conn.execute(
+            "SELECT student_id, position, answer_hash, shingles, sim_sum, n_others,"
+            " sim_max, most_similar, top_sims FROM students"
+            " WHERE question = ? ORDER BY position",
+            (question,),
+        ).fetchall()
+        return {
+            r[0]: IndexedStudent(
+                student_id=r[0],
+                position=r[1],
+                answer_hash=r[2],
+                shingles=_unpack_shingles(r[3]),
+                sim_sum=r[4],
+                n_others=r[5],
+                sim_max=r[6],
+                most_similar=r[7],
+                top_sims=json.loads(r[8]),
+            )
+            for r in rows
+        }
+
+    def upsert(self, question: str, students: Iterable[IndexedStudent]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO students (question, student_id, position,"
+                " answer_hash, shingles, sim_sum, n_others, sim_max, most_similar,"
+                " top_sims) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        question,
+                        s.student_id,
+                        s.position,
+                        s.answer_hash,
+                        _pack_shingles(s.shingles),
+                        s.sim_sum,
+                        s.n_others,
+                        s.sim_max,
+                        s.most_similar,
+                        json.dumps(s.top_sims),
+                    )
+                    for s in students
+                ],
+            )
+
+    def update_stats(self, question: str, students: Iterable[IndexedStudent]) -> None:
+        """
+        既存エントリの統計と position だけ書き換える（n-gram 集合は触らない）。
+        """
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE students SET position = ?, sim_sum = ?, n_others = ?,"
+                " sim_max = ?, most_similar = ?, top_sims = ?"
+                " WHERE question = ? AND student_id = ?",
+                [
+                    (
+                        s.position,
+                        s.sim_sum,
+                        s.n_others,
+                        s.sim_max,
+                        s.most_similar,
+                        json.dumps(s.top_sims),
+                        question,
+                        s.student_id,
+                    )
+                    for s in students
+                ],
+            )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        peer_similarity_per_student.csv と同じ列・並び（設問順 → 回答シート順）で返す。
+        """
+        q_order = {q: i for i, q in enumerate(self.questions())}
+        rows = self._conn.execute(
+            "SELECT student_id, question, sim_max, most_similar, sim_sum, n_others,"
+            " position FROM students"
+        ).fetchall()
+        rows.sort(key=lambda r: (q_order.get(r[1], len(q_order)), r[6]))
+        return pd.DataFrame(
+            [
+                {
+                    "student_id": r[0],
+                    "question": r[1],
+                    "sim_to_others_max": r[2],
+                    "most_similar_student_id": r[3],
+                    "sim_to_others_mean": r[4] / r[5] if r[5] else 0.0,
+                }
+                for r in rows
+            ],
+            columns=[
+                "student_id",
+                "question",
+                "sim_to_others_max",
+                "most_similar_student_id",
+                "sim_to_others_mean",
+            ],
+        )
+
+
+__all__ = ["IndexedStudent", "PeerSimilarityIndex", "answer_hash"]
@@ -0,0 +1,122 @@
+# src/steam_report_grader/io/raw_response_store.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import gzip
+import hashlib
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    data     BLOB NOT NULL
+)
+"""
+
+# SQLite の 1 クエリに渡す ? の数の上限より小さくしておく
+_LOOKUP_CHUNK = 500
+
+
+def blob_hash(text: str) -> str:
+    """
+    生応答のキー（本文の sha256）。同じ応答は何回出ても 1 つしか保存しない。
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def raw_response_store_path_for(scores_path: Path | str) -> Path:
+    """
+    absolute_scores.csv → absolute_scores.raw_responses.sqlite
+    """
+    scores_path = Path(scores_path)
+    return scores_path.with_name(scores_path.stem + ".raw_responses.sqlite")
+
+
+class RawResponseStore:
+    """
+    LLM の生応答を gzip で圧縮して SQLite に貯める、内容アドレス（sha256）のストア。
+    absolute_scores.csv には raw_response の本文ではなく raw_response_hash だけを書く。
+
+        with RawResponseStore(path) as store:
+            h = store.put(text)          # 同じ本文なら同じ h（2 回目以降は書かない）
+            text = store.get(h)
+            texts = store.get_many(df["raw_response_hash"])
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.n_put = 0
+        self.n_new = 0
+
+    def __enter__(self) -> "RawResponseStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def put(self, text: Optional[str]) -> str:
+        """
+        本文を保存してハッシュを返す。空（None / ""）なら保存せず "" を返す。
+        書き込みは commit() / close() でまとめて確定する。
+        """
+        if not text:
+            return ""
+        key = blob_hash(text)
+        data = gzip.compress(text.encode("utf-8"), compresslevel=6, mtime=0)
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (hash, size, data) VALUES (?, ?, ?)",
+                (key, len(text), data),
+            )
+            self.n_put += 1
+            self.n_new += cur.rowcount
+        return key
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if not isinstance(key, str) or not key:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM blobs WHERE hash = ?", (key,)
+            ).fetchone()
+        return gzip.decompress(row[0]).decode("utf-8") if row else None
+
+    def get_many(self, keys: Iterable[Optional[str]]) -> Dict[str, str]:
+        """
+        ハッシュ → 本文。見つからないハッシュ・空のハッシュは結果に入らない。
+        """
+        wanted = sorted({k for k in keys if isinstance(k, str) and k})
+        out: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(wanted), _LOOKUP_CHUNK):
+                chunk = wanted[start : start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT hash, data FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, data in rows:
+                    out[key] = gzip.decompress(data).decode("utf-8")
+        return out
+
+
+__all__ = ["RawResponseStore", "blob_hash", "raw_response_store_path_for"]
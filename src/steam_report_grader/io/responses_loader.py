@@ -1,33 +1,86 @@
 # src/steam_report_grader/io/responses_loader.py
 from __future__ import annotations
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import logging
+import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
+
+from ..config import RESPONSES_CHUNK_ROWS
 
 logger = logging.getLogger(__name__)
 
+RESPONSES_SHEET = "responses"
 
-def load_responses_excel(path: Path | str) -> pd.DataFrame:
+
+@contextmanager
+def _open_sheet(path: Path, sheet_name: str = RESPONSES_SHEET):
     """
-    回答 Excel（steam_exam_responses.xlsx）の responses シートを読み込む共通関数。
+    回答 Excel を read_only で開いてシートを返す（抜けるときにブックを閉じる）。
+    read_only のブックはセルを全部メモリに載せず、行を読むたびに XML から取り出す。
     """
-    path = Path(path)
-    df = pd.read_excel(path, sheet_name="responses")
-    logger.info("Loaded responses from %s (rows=%d)", path, len(df))
-    return df
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        # 書き出したツールによっては dimension（A1:G201 など）が当てにならないので、実データで数える
+        ws.reset_dimensions()
+        yield ws
+    finally:
+        wb.close()
 
 
-def detect_question_columns(df: pd.DataFrame, prefix: str = "Q") -> List[str]:
+def _header_names(raw: Sequence[Any]) -> List[Any]:
     """
-    Q1, Q2, ... のような設問列を検出してソートして返す。
+    1 行目を列名にする（pd.read_excel と同じく、空の列名は "Unnamed: i"、重複は "Q1.1" など）。
+    末尾の空の列は落とす。
+    """
+    raw = list(raw)
+    while raw and raw[-1] is None:
+        raw.pop()
+
+    names: List[Any] = []
+    seen: Dict[Any, int] = {}
+    for i, v in enumerate(raw):
+        name = f"Unnamed: {i}" if v is None else v
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def _iter_sheet_rows(ws, n_cols: int) -> Iterator[Tuple[Any, ...]]:
+    """
+    2 行目以降を値のタプルで 1 行ずつ返す（セルのオブジェクトは作らない）。
+    空文字は None にそろえ、全部空の行は飛ばす。
     """
-    questions = [
-        c for c in df.columns
-        if isinstance(c, str) and c.startswith(prefix)
-    ]
+    for values in ws.iter_rows(min_row=2, max_col=n_cols, values_only=True):
+        values = tuple(None if v == "" else v for v in values)
+        if len(values) < n_cols:
+            values += (None,) * (n_cols - len(values))
+        if all(v is None for v in values):
+            continue
+        yield values
+
+
+def _cell_text(v: Any) -> str:
+    """
+    セルの値を回答テキストにする。空欄は ""、1.0 のような整数値の数値は "1"。
+    """
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _sort_question_columns(columns: Sequence[Any], prefix: str = "Q") -> List[str]:
+    questions = [c for c in columns if isinstance(c, str) and c.startswith(prefix)]
 
     def sort_key(col: str) -> int:
         suffix = col[len(prefix):]
@@ -36,8 +89,99 @@ def detect_question_columns(df: pd.DataFrame, prefix: str = "Q") -> List[str]:
         except ValueError:
             return 10**9  # 数値に変換できないものは最後に
 
-    questions = sorted(questions, key=sort_key)
-    return questions
+    return sorted(questions, key=sort_key)
+
+
+def _rows_to_frame(header: List[Any], rows: List[Tuple[Any, ...]], start: int = 0) -> pd.DataFrame:
+    return pd.DataFrame.from_records(
+        rows,
+        columns=header,
+        index=pd.RangeIndex(start, start + len(rows)),
+    )
+
+
+def load_responses_excel(path: Path | str) -> pd.DataFrame:
+    """
+    回答 Excel（steam_exam_responses.xlsx）の responses シートを読み込む共通関数。
+
+    openpyxl の read_only で値だけを 1 行ずつ読み、そのまま DataFrame にする
+    （pd.read_excel のようにセルのオブジェクトと文字列のパースを挟まない）。
+    空欄は NaN。pd.read_excel と違い、回答の "None" や "5" といった文字列は文字列のまま。
+    """
+    path = Path(path)
+    with _open_sheet(path) as ws:
+        header = _header_names(next(ws.iter_rows(max_row=1, values_only=True), ()))
+        rows = list(_iter_sheet_rows(ws, len(header)))
+    df = _rows_to_frame(header, rows)
+    logger.info("Loaded responses from %s (rows=%d)", path, len(df))
+    return df
+
+
+def iter_responses_chunks(
+    path: Path | str,
+    chunksize: int = RESPONSES_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    responses シートを chunksize 行ずつの DataFrame で返す（列と値は load_responses_excel と同じ）。
+    index はチャンクをまたいで通し番号。全員ぶんを一度に持たなくてよい処理向け。
+    """
+    path = Path(path)
+    chunksize = max(1, chunksize)
+    with _open_sheet(path) as ws:
+        header = _header_names(next(ws.iter_rows(max_row=1, values_only=True), ()))
+        buf: List[Tuple[Any, ...]] = []
+        start = 0
+        for values in _iter_sheet_rows(ws, len(header)):
+            buf.append(values)
+            if len(buf) >= chunksize:
+                yield _rows_to_frame(header, buf, start)
+                start += len(buf)
+                buf = []
+        if buf:
+            yield _rows_to_frame(header, buf, start)
+
+
+def read_question_columns(path: Path | str, prefix: str = "Q") -> List[str]:
+    """
+    responses シートの 1 行目だけを読んで、設問列（Q1, Q2, ...）をソートして返す。
+    """
+    with _open_sheet(Path(path)) as ws:
+        header = _header_names(next(ws.iter_rows(max_row=1, values_only=True), ()))
+    return _sort_question_columns(header, prefix=prefix)
+
+
+def iter_response_rows(
+    path: Path | str,
+    questions: Optional[List[str]] = None,
+    prefix: str = "Q",
+) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    responses シートを 1 受験者ずつ (student_id, {設問: 回答テキスト}) で返す。
+    questions を省くと 1 行目の設問列（prefix*）をすべて返す。
+    回答は文字列で、空欄は ""（NaN にはしない）。DataFrame は作らない。
+    """
+    path = Path(path)
+    with _open_sheet(path) as ws:
+        header = _header_names(next(ws.iter_rows(max_row=1, values_only=True), ()))
+        if "student_id" not in header:
+            raise ValueError(f"student_id column not found in {path} (sheet={RESPONSES_SHEET})")
+        if questions is None:
+            questions = _sort_question_columns(header, prefix=prefix)
+        sid_idx = header.index("student_id")
+        q_idx = [(q, header.index(q)) for q in questions if q in header]
+
+        for values in _iter_sheet_rows(ws, len(header)):
+            yield (
+                _cell_text(values[sid_idx]),
+                {q: _cell_text(values[i]) for q, i in q_idx},
+            )
+
+
+def detect_question_columns(df: pd.DataFrame, prefix: str = "Q") -> List[str]:
+    """
+    Q1, Q2, ... のような設問列を検出してソートして返す。
+    """
+    return _sort_question_columns(list(df.columns), prefix=prefix)
 
 
 def load_responses_and_questions(
@@ -51,3 +195,29 @@ def load_responses_and_questions(
     questions = detect_question_columns(df, prefix=prefix)
     logger.info("Detected questions (%s*): %s", prefix, questions)
     return df, questions
+
+
+def melt_responses(
+    df: pd.DataFrame,
+    questions: List[str],
+) -> pd.DataFrame:
+    """
+    横持ちの回答シート（student_id, Q1..Qn）を
+    縦持ち（student_id, question, answer）に変換する。
+
+    - 並び順は「受験者順 → 設問順」（iterrows の二重ループと同じ）
+    - answer は strip 済み、空欄の回答は除外する
+    """
+    n_students = len(df)
+    answers = df[questions].fillna("").astype(str).to_numpy().ravel()
+
+    long_df = pd.DataFrame(
+        {
+            "student_id": np.repeat(df["student_id"].astype(str).to_numpy(), len(questions)),
+            "question": np.tile(np.array(questions, dtype=object), n_students),
+            "answer": answers,
+        }
+    )
+    long_df["answer"] = long_df["answer"].str.strip()
+    long_df = long_df[long_df["answer"] != ""].reset_index(drop=True)
+    return long_df
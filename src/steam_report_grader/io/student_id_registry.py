@@ -0,0 +1,226 @@
+# src/steam_report_grader/io/student_id_registry.py
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+
+import pandas as pd
+
+from ..utils.id_generator import generate_student_id, parse_student_id
+
+logger = logging.getLogger(__name__)
+
+ID_REGISTRY_FORMAT = "student_id_registry_v1"
+
+
+def content_hash(normalized_text: str) -> str:
+    """
+    答案の中身のキー（docx から取り出して正規化したテキストの sha256）。
+    docx のバイト列だと、開いて保存し直しただけで変わってしまうので使わない。
+    """
+    return hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RegistryEntry:
+    student_id: str
+    real_name: str
+    source_file: str
+    content_hash: str
+    first_seen: str
+    last_seen: str
+
+
+class StudentIdRegistry:
+    """
+    答案（本名 + 中身のハッシュ）→ student_id の対応を保存しておく台帳（JSON）。
+    docx が増えても既存の受験者の ID は変わらず、新しい答案にだけ続きの番号を振る。
+    （ID が振り直されないので、採点ジャーナル・差分更新の索引などがそのまま使える）
+
+    ID を決める順番:
+      1. 本名と中身のハッシュが両方一致
+      2. 中身のハッシュが一致（ファイル名を変えただけ・名前の抽出が変わった）
+      3. ファイル名が一致し、ハッシュが未登録（既存の id_map から引き継いだ登録）
+      4. 本名が一致する登録が 1 件だけ（同じ受験者が答案を出し直した）
+      5. どれでもなければ新しい ID（これまでの最大番号 + 1）
+    1 回の実行で同じ登録を 2 つの答案に使うことはない（4 は候補が 1 件のときだけ）。
+    今回見つからなかった受験者の登録も残す（ID を使い回さない）。
+
+        registry = StudentIdRegistry.load(path, id_map_path)
+        ids = registry.assign_all([(name, "s01.docx", content_hash(text)), ...])
+        registry.save()
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        entries: Optional[List[RegistryEntry]] = None,
+        prefix: str = "S",
+    ) -> None:
+        self.path = Path(path)
+        self.prefix = prefix
+        self.entries: List[RegistryEntry] = list(entries or [])
+        self._claimed: set[str] = set()
+        self._now = datetime.now().isoformat(timespec="seconds")
+        self.n_new = 0
+        self._max_number: Optional[int] = None
+
+    @classmethod
+    def load(
+        cls,
+        path: Path | str,
+        id_map_path: Path | str | None = None,
+        prefix: str = "S",
+    ) -> "StudentIdRegistry":
+        """
+        台帳を読む。無ければ id_map_path（steam_exam_id_map.xlsx）から既存の ID を引き継ぐ。
+        """
+        path = Path(path)
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("format") != ID_REGISTRY_FORMAT:
+                raise ValueError(f"Unknown student id registry format: {data.get('format')}")
+            entries = [RegistryEntry(**e) for e in data["entries"]]
+            logger.info("Loaded student id registry %s (entries=%d)", path, len(entries))
+            return cls(path, entries, prefix=data.get("prefix", prefix))
+
+        entries = []
+        if id_map_path is not None and Path(id_map_path).exists():
+            id_df = pd.read_excel(id_map_path, sheet_name="id_map").fillna("")
+            entries = [
+                RegistryEntry(
+                    student_id=str(row["student_id"]),
+                    real_name=str(row.get("real_name", "")),
+                    source_file=str(row.get("source_file", "")),
+                    content_hash="",
+                    first_seen="",
+                    last_seen="",
+                )
+                for _, row in id_df.iterrows()
+            ]
+            logger.info(
+                "Seeded student id registry from %s (entries=%d)", id_map_path, len(entries)
+            )
+        return cls(path, entries, prefix=prefix)
+
+    def _next_id(self) -> str:
+        if self._max_number is None:
+            numbers = [parse_student_id(e.student_id, self.prefix) for e in self.entries]
+            self._max_number = max((n for n in numbers if n is not None), default=0)
+        self._max_number += 1
+        return generate_student_id(self._max_number, self.prefix)
+
+    def _lookup(
+        self,
+        table: Dict[tuple, List[RegistryEntry]],
+        key: tuple,
+        unique: bool,
+    ) -> Optional[RegistryEntry]:
+        hits = [e for e in table.get(key, []) if e.student_id not in self._claimed]
+        if not hits or (unique and len(hits) > 1):
+            return None
+        return hits[0]
+
+    def assign_all(self, submissions: List[Tuple[str | None, str, str]]) -> List[str]:
+        """
+        答案 (本名, ファイル名, 中身のハッシュ) のリストに student_id を割り当てる。
+        強い一致（本名 + ハッシュ）から順に全答案を見ていくので、
+        弱い一致（本名だけ）が別の答案の登録を先に取ってしまうことはない。
+        台帳に無い答案は、リストの順に新しい ID を振って登録する。
+        """
+        names = [(name or "").strip() for name, _, _ in submissions]
+
+        # (登録 → キー, 答案 → キー, 候補が 1 件のときだけ使うか)。キーが None なら使わない
+        levels = [
+            (
+                lambda e: (e.real_name, e.content_hash) if e.real_name else None,
+                lambda name, f, h: (name, h) if name else None,
+                False,
+            ),
+            (
+                lambda e: (e.content_hash,) if e.content_hash else None,
+                lambda name, f, h: (h,),
+                False,
+            ),
+            (
+                lambda e: (e.source_file,) if not e.content_hash else None,
+                lambda name, f, h: (f,),
+                False,
+            ),
+            (
+                lambda e: (e.real_name,) if e.real_name else None,
+                lambda name, f, h: (name,) if name else None,
+                True,
+            ),
+        ]
+        matched: List[Optional[RegistryEntry]] = [None] * len(submissions)
+        for entry_key, submission_key, unique in levels:
+            table: Dict[tuple, List[RegistryEntry]] = {}
+            for e in self.entries:
+                k = entry_key(e)
+                if k is not None:
+                    table.setdefault(k, []).append(e)
+            for i, ((_, source_file, digest), name) in enumerate(zip(submissions, names)):
+                if matched[i] is not None:
+                    continue
+                k = submission_key(name, source_file, digest)
+                entry = self._lookup(table, k, unique) if k is not None else None
+                if entry is not None:
+                    matched[i] = entry
+                    self._claimed.add(entry.student_id)
+
+        ids: List[str] = []
+        for ((_, source_file, digest), name, entry) in zip(submissions, names, matched):
+            if entry is None:
+                entry = RegistryEntry(
+                    student_id=self._next_id(),
+                    real_name=name,
+                    source_file=source_file,
+                    content_hash=digest,
+                    first_seen=self._now,
+                    last_seen=self._now,
+                )
+                self.entries.append(entry)
+                self._claimed.add(entry.student_id)
+                self.n_new += 1
+                logger.info("New student id %s for %s", entry.student_id, source_file)
+            else:
+                if entry.content_hash and entry.content_hash != digest:
+                    logger.info(
+                        "Student %s resubmitted (%s -> %s)",
+                        entry.student_id,
+                        entry.source_file,
+                        source_file,
+                    )
+                entry.real_name = name or entry.real_name
+                entry.source_file = source_file
+                entry.content_hash = digest
+                entry.first_seen = entry.first_seen or self._now
+                entry.last_seen = self._now
+            ids.append(entry.student_id)
+        return ids
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "format": ID_REGISTRY_FORMAT,
+            "prefix": self.prefix,
+            "entries": [asdict(e) for e in self.entries],
+        }
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(self.path)
+        logger.info(
+            "Saved student id registry %s (entries=%d, new=%d)",
+            self.path,
+            len(self.entries),
+            self.n_new,
+        )
+
+
+__all__ = ["RegistryEntry", "StudentIdRegistry", "content_hash"]
@@ -0,0 +1,140 @@
+# src/steam_report_grader/io/translation_memory.py
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+import hashlib
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_hash    TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    source_text    TEXT NOT NULL,
+    target_text    TEXT NOT NULL,
+    created_at     TEXT NOT NULL,
+    hits           INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source_hash, model, prompt_version)
+)
+"""
+
+
+def source_hash(text: str) -> str:
+    """
+    原文のキー。前後の空白だけ落として sha256 を取る。
+    """
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """
+    原文ハッシュ → 日本語訳 を SQLite に貯める翻訳メモリ。
+    同じ原文でもモデルやプロンプトが変われば別の訳として持つ（model / prompt_version 列）。
+
+        tm = TranslationMemory(path, model="gpt-oss:20b", prompt_version="v1")
+        ja = tm.get(text)
+        if ja is None:
+            ja = translate(text)
+            tm.put(text, ja)
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        model: str,
+        prompt_version: str,
+    ) -> None:
+        self.path = Path(path)
+        self.model = model
+        self.prompt_version = prompt_version
+        self.hits = 0
+        self.misses = 0
+        # ヒットのたびに UPDATE + commit するとキャッシュの速さが消えるので、
+        # hits 列への加算は貯めておいて put / close のときにまとめて書く
+        self._pending_hits: Dict[str, int] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "TranslationMemory":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def get(self, text: str) -> Optional[str]:
+        key = source_hash(text)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT target_text FROM translations "
+                "WHERE source_hash = ? AND model = ? AND prompt_version = ?",
+                (key, self.model, self.prompt_version),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+        return row[0]
+
+    def _flush_hits(self) -> None:
+        # 呼び出し側で self._lock を持っていること。commit も呼び出し側でする
+        if not self._pending_hits:
+            return
+        self._conn.executemany(
+            "UPDATE translations SET hits = hits + ? "
+            "WHERE source_hash = ? AND model = ? AND prompt_version = ?",
+            [
+                (n, key, self.model, self.prompt_version)
+                for key, n in self._pending_hits.items()
+            ],
+        )
+        self._pending_hits.clear()
+
+    def put(self, text: str, translated: str) -> None:
+        with self._lock:
+            self._flush_hits()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations "
+                "(source_hash, model, prompt_version, source_text, target_text, created_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (
+                    source_hash(text),
+                    self.model,
+                    self.prompt_version,
+                    text.strip(),
+                    translated,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM translations WHERE model = ? AND prompt_version = ?",
+                (self.model, self.prompt_version),
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._flush_hits()
+                self._conn.commit()
+            logger.info(
+                "Translation memory %s: hits=%d, misses=%d",
+                self.path,
+                self.hits,
+                self.misses,
+            )
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,129 @@
+# src/steam_report_grader/io/watch_state.py
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source_file  TEXT PRIMARY KEY,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    status       TEXT NOT NULL,
+    real_name    TEXT,
+    content_hash TEXT NOT NULL DEFAULT '',
+    answers      TEXT NOT NULL DEFAULT '{}',
+    updated_at   TEXT NOT NULL
+)
+"""
+
+
+class WatchState:
+    """
+    watch デーモンが取り込んだ docx の一覧（SQLite）。
+    ファイルごとに (サイズ, 更新時刻) と、取り出した本名・回答・中身のハッシュを持つ。
+    デーモンを止めて立ち上げ直しても、変わっていないファイルは読み直さない。
+
+        state = WatchState(path)
+        known = state.known()                  # {source_file: (size, mtime_ns)}
+        state.put_ok("s01.docx", size, mtime_ns, submission)
+        submissions = state.submissions()      # extract_submission と同じ形の dict
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "WatchState":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def known(self) -> Dict[str, Tuple[int, int]]:
+        """
+        取り込み済み（失敗したものも含む）のファイル → (size, mtime_ns)。
+        """
+        return {
+            r[0]: (r[1], r[2])
+            for r in self._conn.execute("SELECT source_file, size, mtime_ns FROM files")
+        }
+
+    def put_ok(self, source_file: str, size: int, mtime_ns: int, submission: dict) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (source_file, size, mtime_ns, status,"
+                " real_name, content_hash, answers, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source_file,
+                    size,
+                    mtime_ns,
+                    STATUS_OK,
+                    submission.get("name"),
+                    submission["content_hash"],
+                    json.dumps(submission["answers"], ensure_ascii=False),
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    def put_failed(self, source_file: str, size: int, mtime_ns: int) -> None:
+        """
+        読めなかったファイル。中身が変わる（size / mtime が変わる）までは読み直さない。
+        """
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (source_file, size, mtime_ns, status, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    source_file,
+                    size,
+                    mtime_ns,
+                    STATUS_FAILED,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    def remove(self, source_files: Iterable[str]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM files WHERE source_file = ?",
+                [(f,) for f in source_files],
+            )
+
+    def submissions(self) -> List[dict]:
+        """
+        取り込めたファイルを、ファイル名順に extract_submission と同じ形で返す。
+        """
+        rows = self._conn.execute(
+            "SELECT source_file, real_name, answers, content_hash FROM files"
+            " WHERE status = ? ORDER BY source_file",
+            (STATUS_OK,),
+        ).fetchall()
+        return [
+            {
+                "file": r[0],
+                "name": r[1],
+                "answers": json.loads(r[2]),
+                "content_hash": r[3],
+            }
+            for r in rows
+        ]
+
+
+__all__ = ["WatchState"]
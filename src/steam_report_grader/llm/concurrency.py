@@ -0,0 +1,186 @@
+# src/steam_report_grader/llm/concurrency.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import logging
+import threading
+import time
+
+from .retry_policy import OVERLOAD_ERRORS, classify_error
+from ..utils.telemetry import get_run_metrics
+from ..config import (
+    LLM_CONCURRENCY_INITIAL,
+    LLM_CONCURRENCY_MIN,
+    LLM_CONCURRENCY_MAX,
+    LLM_CONCURRENCY_LATENCY_TOLERANCE,
+    LLM_CONCURRENCY_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+# LLM のレイテンシは負荷が無くても応答の長さでばらつく（だいたい対数正規分布）ので、
+# 1 件ずつ最小値と比べると空いていても「跳ねた」とみなしてしまう。
+# 直近のレイテンシの EWMA（だいたい 20 件ぶんの平均）を、その EWMA の低いところ（基準）と比べる
+_RECENT_ALPHA = 0.05
+# 基準は、直近の EWMA が下回ったときにこの重みで下げる（いちばん低く振れた 1 回に張り付かないように）
+_BASELINE_DOWN = 0.1
+# 上げるのは limit が下限まで下がっても遅いときだけ。混雑ではなく処理自体が重くなった
+# （設問やプロンプトが長くなった）とみなして、この重みで追いつかせる
+# （limit が上がっているときに上げると、混んでいるときのレイテンシに基準が引きずられる）
+_BASELINE_CATCHUP = 0.01
+# 最初のこの件数は単純平均で基準を作るだけで、limit は動かさない
+_WARMUP_SAMPLES = 10
+# レイテンシが上がったとき（タイムアウトほどではない）の縮め幅
+_SPIKE_BACKOFF = 0.9
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """
+    バックエンドが詰まっているとみなす例外か。
+    タイムアウト・接続エラー・5xx は同時数を減らす理由になるが、
+    4xx や応答のパース失敗はリクエスト側の問題なので数えない。
+    """
+    return classify_error(exc) in OVERLOAD_ERRORS
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    1 バックエンド（Ollama 1 台）あたりの同時リクエスト数を AIMD で調整するリミッタ。
+
+    - 枠を使い切っている状態で、直近のレイテンシ（EWMA）が基準値（混んでいないときの値）
+      × tolerance 以内なら 1 リクエストごとに +1/limit（= だいたい 1 往復ぶんで +1）
+    - 直近のレイテンシが基準値 × tolerance を超えたら limit × 0.9
+      （減らしたあと limit 件ぶん返ってくるまでは続けて減らさない）
+    - タイムアウト・接続エラー・5xx なら limit × backoff（既定 0.5）
+
+        limiter = AdaptiveConcurrencyLimiter("http://127.0.0.1:11434")
+        with limiter.slot():
+            requests.post(...)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = LLM_CONCURRENCY_INITIAL,
+        min_limit: int = LLM_CONCURRENCY_MIN,
+        max_limit: int = LLM_CONCURRENCY_MAX,
+        latency_tolerance: float = LLM_CONCURRENCY_LATENCY_TOLERANCE,
+        backoff: float = LLM_CONCURRENCY_BACKOFF,
+    ) -> None:
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(f"Invalid concurrency bounds: min={min_limit}, max={max_limit}")
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._inflight = 0
+        self._n_samples = 0
+        self._recent_s: Optional[float] = None
+        self._baseline_s: Optional[float] = None
+        self._since_decrease = 0
+        self._cond = threading.Condition()
+        get_run_metrics().record_concurrency(self.name, int(self._limit))
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def headroom(self) -> float:
+        """
+        空き枠の割合（0 なら満杯）。プールがどのバックエンドに振るかの判断に使う。
+        """
+        return (self.limit - self._inflight) / self.limit
+
+    def _set_limit(self, new_limit: float, reason: str) -> None:
+        # 呼び出し側で self._cond を持っていること
+        old = self.limit
+        self._limit = min(max(new_limit, float(self.min_limit)), float(self.max_limit))
+        if self.limit != old:
+            logger.info(
+                "[concurrency] %s: limit %d -> %d (%s, inflight=%d, baseline=%.2fs)",
+                self.name,
+                old,
+                self.limit,
+                reason,
+                self._inflight,
+                self._baseline_s or 0.0,
+            )
+            get_run_metrics().record_concurrency(self.name, self.limit)
+            # 枠が増えたら待っているスレッドを起こす
+            self._cond.notify_all()
+
+    def _on_success(self, latency_s: float, saturated: bool) -> None:
+        self._n_samples += 1
+        if self._n_samples <= _WARMUP_SAMPLES:
+            prev = self._recent_s or 0.0
+            self._recent_s = prev + (latency_s - prev) / self._n_samples
+            self._baseline_s = self._recent_s
+            return
+
+        recent = self._recent_s + _RECENT_ALPHA * (latency_s - self._recent_s)
+        baseline = self._baseline_s
+        if recent < baseline:
+            baseline += _BASELINE_DOWN * (recent - baseline)
+        elif self.limit <= self.min_limit:
+            baseline += _BASELINE_CATCHUP * (recent - baseline)
+        self._recent_s = recent
+        self._baseline_s = baseline
+        self._since_decrease += 1
+
+        if recent > baseline * self.latency_tolerance:
+            # 縮めた効果が出るまで（だいたい 1 往復ぶん）は続けて縮めない
+            if self._since_decrease >= self.limit:
+                self._set_limit(
+                    self._limit * _SPIKE_BACKOFF,
+                    f"latency up {recent:.2f}s",
+                )
+                self._since_decrease = 0
+        elif saturated:
+            # 枠を使い切っていないときに増やしても意味がないので、満杯のときだけ増やす
+            self._set_limit(self._limit + 1.0 / self._limit, "latency flat")
+
+    def _on_overload(self, exc: BaseException) -> None:
+        self._set_limit(self._limit * self.backoff, type(exc).__name__)
+        self._since_decrease = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        枠が空くまで待ってから 1 リクエストぶんの枠を取る。抜けるときに結果を見て limit を調整する。
+        """
+        wait_start = time.perf_counter()
+        with self._cond:
+            while self._inflight >= self.limit:
+                self._cond.wait()
+            self._inflight += 1
+            saturated = self._inflight >= self.limit
+        get_run_metrics().record_queue_wait(
+            f"limiter:{self.name}", time.perf_counter() - wait_start
+        )
+
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            with self._cond:
+                self._inflight -= 1
+                if is_overload_error(e):
+                    self._on_overload(e)
+                self._cond.notify()
+            raise
+        else:
+            with self._cond:
+                self._inflight -= 1
+                self._on_success(time.perf_counter() - start, saturated)
+                self._cond.notify()
+
+
+__all__ = ["AdaptiveConcurrencyLimiter", "is_overload_error"]
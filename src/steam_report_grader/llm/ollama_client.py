@@ -1,6 +1,7 @@
 # src/steam_report_grader/llm/ollama_client.py
 from __future__ import annotations
 
+from contextlib import nullcontext
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 import logging
@@ -9,6 +10,9 @@ import time
 import requests
 
 from .base import LLMClient
+from .concurrency import AdaptiveConcurrencyLimiter
+from .retry_policy import CircuitBreaker, call_with_retry
+from ..utils.telemetry import get_run_metrics
 from ..config import (
     OLLAMA_DEFAULT_BASE_URL,
     OLLAMA_DEFAULT_MODEL,
@@ -29,7 +33,7 @@ class OllamaConfig:
     model: str = OLLAMA_DEFAULT_MODEL
     timeout: int = OLLAMA_DEFAULT_TIMEOUT
     max_retries: int = OLLAMA_DEFAULT_MAX_RETRIES
-    retry_delay: float = OLLAMA_DEFAULT_RETRY_DELAY  # seconds
+    retry_delay: float = OLLAMA_DEFAULT_RETRY_DELAY  # seconds（指数バックオフの基準）
     temperature: float = OLLAMA_DEFAULT_TEMPERATURE
     top_p: float = OLLAMA_DEFAULT_TOP_P
     seed: Optional[int] = OLLAMA_DEFAULT_SEED
@@ -39,10 +43,19 @@ class OllamaConfig:
 class OllamaClient(LLMClient):
     """
     Ollama /api/generate を叩くクライアント。
+    limiter を渡すと、同時リクエスト数をそのリミッタの枠内に抑える（枠が空くまで待つ）。
+    breaker を渡すと、このバックエンドが落ちているあいだは投げない（プールと共有する）。
     """
 
-    def __init__(self, config: OllamaConfig) -> None:
+    def __init__(
+        self,
+        config: OllamaConfig,
+        limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
         self.config = config
+        self.limiter = limiter
+        self.breaker = breaker
 
     def _build_payload(
         self,
@@ -75,7 +88,7 @@ class OllamaClient(LLMClient):
 
         return payload
 
-    def generate(
+    def generate_once(
         self,
         prompt: str,
         *,
@@ -84,7 +97,8 @@ class OllamaClient(LLMClient):
         **kwargs: Any,
     ) -> str:
         """
-        LLMClient.generate の実装。
+        /api/generate を 1 回だけ叩く（リトライしない。失敗したら例外をそのまま投げる）。
+        リトライ・フェイルオーバーは generate / RoundRobinLLMClient.generate 側でやる。
         """
         url = f"{self.config.base_url.rstrip('/')}/api/generate"
         payload = self._build_payload(
@@ -93,16 +107,22 @@ class OllamaClient(LLMClient):
             max_tokens=max_tokens,
             **kwargs,
         )
-
-        last_exc: Optional[Exception] = None
-
-        for attempt in range(1, self.config.max_retries + 1):
-            try:
-                logger.debug(
-                    "Calling Ollama /api/generate (attempt %d): %s",
-                    attempt,
-                    payload,
-                )
+        metrics = get_run_metrics()
+        backend = self.config.base_url
+
+        # プロンプト本文は長いので出さない（並列時に DEBUG を有効にしてもログが膨れないように）
+        logger.debug(
+            "Calling Ollama /api/generate (%s): model=%s prompt_chars=%d options=%s",
+            backend,
+            payload["model"],
+            len(prompt),
+            payload["options"],
+        )
+        start = time.perf_counter()
+        try:
+            with self.limiter.slot() if self.limiter else nullcontext():
+                # 枠待ちの時間は含めない（そちらは limiter が queue_wait に記録する）
+                start = time.perf_counter()
                 resp = requests.post(
                     url,
                     json=payload,
@@ -110,33 +130,58 @@ class OllamaClient(LLMClient):
                 )
                 resp.raise_for_status()
 
-                data = resp.json()
-                text = data.get("response", "")
-
-                if not isinstance(text, str):
-                    logger.warning("Unexpected response type from Ollama: %r", data)
-                    text = str(text)
-
-                return text.strip()
-
-            except Exception as e:
-                last_exc = e
-                logger.warning(
-                    "Ollama /api/generate failed (attempt %d/%d): %s",
-                    attempt,
-                    self.config.max_retries,
-                    e,
-                )
-
-                if attempt == self.config.max_retries:
-                    break
-
-                time.sleep(self.config.retry_delay)
+            data = resp.json()
+        except Exception:
+            metrics.record_llm_call(
+                backend,
+                latency_s=time.perf_counter() - start,
+                prompt_chars=len(prompt),
+                ok=False,
+            )
+            raise
+
+        text = data.get("response", "")
+        if not isinstance(text, str):
+            logger.warning("Unexpected response type from Ollama: %r", data)
+            text = str(text)
+
+        metrics.record_llm_call(
+            backend,
+            latency_s=time.perf_counter() - start,
+            prompt_chars=len(prompt),
+            response_chars=len(text),
+            response_json=data,
+        )
+        return text.strip()
 
-        logger.error("Max retries for Ollama /api/generate reached. Giving up.")
-        if last_exc:
-            raise last_exc
-        raise RuntimeError("Ollama /api/generate failed for unknown reasons")
+    def generate(
+        self,
+        prompt: str,
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        LLMClient.generate の実装。
+        このバックエンドだけでリトライする（4xx はリトライしない・5xx / タイムアウトは
+        指数バックオフ + jitter）。複数台へのフェイルオーバーは RoundRobinLLMClient が行う。
+        """
+        return call_with_retry(
+            [self],
+            pick=lambda cands: next(
+                (c for c in cands if c.breaker is None or c.breaker.available()),
+                None,
+            ),
+            call=lambda c: c.generate_once(
+                prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs,
+            ),
+            max_attempts=self.config.max_retries,
+            backoff_base_s=self.config.retry_delay,
+        )
 
 
 __all__ = ["OllamaConfig", "OllamaClient"]
@@ -1,15 +1,21 @@
 # src/steam_report_grader/llm/ollama_pool.py
 
 from __future__ import annotations
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence
 
+from .concurrency import AdaptiveConcurrencyLimiter
 from .ollama_client import OllamaClient, OllamaConfig
+from .retry_policy import CircuitBreaker, call_with_retry
 from ..config import (
     OLLAMA_BASE_URLS,
     OLLAMA_DEFAULT_MODEL,
+    OLLAMA_DEFAULT_MAX_RETRIES,
+    OLLAMA_DEFAULT_RETRY_DELAY,
+    LLM_ADAPTIVE_CONCURRENCY,
 )
 
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -18,31 +24,110 @@ class RoundRobinLLMClient:
     """
     複数の OllamaClient をラップして、
     呼び出しのたびに順番に使う（データ並列用）
+
+    各クライアントに同時数のリミッタが付いているときは、
+    空き枠の割合がいちばん大きいバックエンドに振る（同率なら順番どおり）。
+    サーキットブレーカーが open のバックエンドには振らない。
+    失敗時のリトライ・フェイルオーバーは retry_policy.call_with_retry に従う。
     """
     def __init__(self, clients: List[OllamaClient]):
         if not clients:
             raise ValueError("RoundRobinLLMClient requires at least one client")
         self.clients = clients
         self.index = 0
+        self._lock = threading.Lock()
 
-    def _next(self) -> OllamaClient:
-        client = self.clients[self.index]
-        self.index = (self.index + 1) % len(self.clients)
+    def _pick(self, candidates: Sequence[OllamaClient]) -> Optional[OllamaClient]:
+        """
+        candidates のうち、サーキットが閉じているものから 1 つ選ぶ（無ければ None）。
+        """
+        with self._lock:
+            n = len(self.clients)
+            order = [
+                c
+                for c in (self.clients[(self.index + i) % n] for i in range(n))
+                if c in candidates and (c.breaker is None or c.breaker.available())
+            ]
+            if not order:
+                return None
+            client = order[0]
+            if client.limiter is not None:
+                client = max(
+                    order,
+                    key=lambda c: c.limiter.headroom() if c.limiter else 0.0,
+                )
+            self.index = (self.clients.index(client) + 1) % n
         logger.debug("Dispatching request to backend %s", client.config.base_url)
         return client
 
+    def _next(self) -> OllamaClient:
+        return self._pick(self.clients) or self.clients[0]
+
+    def concurrency_limits(self) -> Dict[str, int]:
+        """
+        バックエンドごとの現在の同時リクエスト数の上限（リミッタが無ければ空）。
+        """
+        return {
+            c.config.base_url: c.limiter.limit
+            for c in self.clients
+            if c.limiter is not None
+        }
+
     # AbsoluteScorer などから見える interface は元の OllamaClient と同じにする
-    def generate(self, *args, **kwargs):
-        return self._next().generate(*args, **kwargs)
+    def generate(self, prompt: str, **kwargs: Any) -> str:
+        return call_with_retry(
+            self.clients,
+            pick=self._pick,
+            call=lambda c: c.generate_once(prompt, **kwargs),
+            max_attempts=OLLAMA_DEFAULT_MAX_RETRIES,
+            backoff_base_s=OLLAMA_DEFAULT_RETRY_DELAY,
+        )
 
-    def chat(self, *args, **kwargs):
-        return self._next().chat(*args, **kwargs)
+    def chat(self, *args: Any, **kwargs: Any) -> Any:
+        # generate と同じリトライ・フェイルオーバー・サーキットブレーカーを通す
+        return call_with_retry(
+            self.clients,
+            pick=self._pick,
+            call=lambda c: c.chat(*args, **kwargs),
+            max_attempts=OLLAMA_DEFAULT_MAX_RETRIES,
+            backoff_base_s=OLLAMA_DEFAULT_RETRY_DELAY,
+        )
 
 
 # グローバルなプール（scoring_pipeline などから使う）
 _llm_client_pool: RoundRobinLLMClient | None = None
 
 
+def build_llm_pool(
+    base_urls: Sequence[str],
+    model: str = OLLAMA_DEFAULT_MODEL,
+    adaptive: bool = LLM_ADAPTIVE_CONCURRENCY,
+) -> RoundRobinLLMClient:
+    """
+    base_urls のサーバを束ねたプールを作る。
+    各バックエンドにサーキットブレーカーを、adaptive ならリミッタも付ける。
+    """
+    clients: List[OllamaClient] = []
+    for base_url in base_urls:
+        cfg = OllamaConfig(
+            model=model,
+            base_url=base_url,
+        )
+        limiter = AdaptiveConcurrencyLimiter(base_url) if adaptive else None
+        logger.info(
+            "Register Ollama backend: %s (model=%s, concurrency=%s)",
+            base_url,
+            cfg.model,
+            f"adaptive {limiter.min_limit}-{limiter.max_limit} (start {limiter.limit})"
+            if limiter
+            else "unlimited",
+        )
+        clients.append(
+            OllamaClient(cfg, limiter=limiter, breaker=CircuitBreaker(base_url))
+        )
+    return RoundRobinLLMClient(clients)
+
+
 def get_ollama_client() -> RoundRobinLLMClient:
     """
     スコアリングなどで使う LLM クライアント。
@@ -50,15 +135,6 @@ def get_ollama_client() -> RoundRobinLLMClient:
     """
     global _llm_client_pool
     if _llm_client_pool is None:
-        clients: List[OllamaClient] = []
-        for base_url in OLLAMA_BASE_URLS:
-            cfg = OllamaConfig(
-                model=OLLAMA_DEFAULT_MODEL,
-                base_url=base_url,
-            )
-            logger.info("Register Ollama backend: %s (model=%s)", base_url, cfg.model)
-            clients.append(OllamaClient(cfg))
-
-        _llm_client_pool = RoundRobinLLMClient(clients)
+        _llm_client_pool = build_llm_pool(OLLAMA_BASE_URLS)
 
     return _llm_client_pool
@@ -8,11 +8,28 @@ def build_scoring_prompt(
     rubric_text: str,
     answer_text: str,
     max_score: int = 5,
+    include_relative_features: bool = False,
 ) -> str:
     """
     絶対評価用プロンプト。
     出力は JSON 固定にして後処理しやすくする。
+
+    include_relative_features=True のときは、relative-features 用の
+    要約（relative_summary）と引用3つ（relative_quotes）も同じ応答で出させる。
     """
+    if include_relative_features:
+        relative_instruction = """
+7. Also extract the fields used for relative ranking:
+   - relative_summary: A one-sentence summary of the student's answer in Japanese.
+   - relative_quotes: Exactly 3 important short quotes taken verbatim from the student's answer.
+"""
+        relative_format = """,
+          "relative_summary": "回答の要約",
+          "relative_quotes": ["引用1", "引用2", "引用3"]"""
+    else:
+        relative_instruction = ""
+        relative_format = ""
+
     prompt = f"""
           You are an expert in STEAM education and in educational assessment.
           Based on the following question and rubric, rigorously evaluate the student's answer.
@@ -43,7 +60,7 @@ Instructions:
 6. The output must be in the "form of a Python dict literal" and include the keys below.
    - Key names may use either double quotes or single quotes.
    - Do not use double quotes (") inside string values; use single quotes (') instead.
-
+{relative_instruction}
 Output format:
         {{
           "score": 数値,
@@ -61,7 +78,7 @@ Output format:
               "aspect": "観点名",
               "quote": "受験者の回答からの短い引用"
             }}
-          ]
+          ]{relative_format}
         }}
         """
     return dedent(prompt).strip()
@@ -0,0 +1,338 @@
+# src/steam_report_grader/llm/retry_policy.py
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, Sequence, TypeVar
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from ..utils.telemetry import get_run_metrics
+from ..config import (
+    LLM_RETRY_BACKOFF_MAX,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_RETRY_BUDGET_MIN,
+    LLM_BREAKER_FAILURE_THRESHOLD,
+    LLM_BREAKER_RESET_S,
+    LLM_ALL_OPEN_MAX_WAIT_S,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# half_open の 1 件が返ってくるのを待つときに、様子を見に行く間隔（秒）
+_PROBE_POLL_S = 0.5
+
+# エラーの分類
+ERROR_CONNECTION = "connection"  # つながらない → すぐ別のバックエンドへ（待たない）
+ERROR_TIMEOUT = "timeout"        # 応答が来ない → 待ってからリトライ
+ERROR_SERVER = "server"          # 5xx → 待ってからリトライ
+ERROR_CLIENT = "client"          # 4xx → リクエストが悪いのでリトライしない
+ERROR_OTHER = "other"            # 応答の JSON が壊れているなど → 待ってからリトライ
+
+# バックエンドが落ちている・詰まっているとみなす分類（サーキットブレーカー・同時数制御で数える）
+OVERLOAD_ERRORS = frozenset({ERROR_CONNECTION, ERROR_TIMEOUT, ERROR_SERVER})
+
+
+def classify_error(exc: BaseException) -> str:
+    # ConnectTimeout は Timeout でもあるが、つながっていないので connection 扱い
+    if isinstance(exc, requests.ConnectionError):
+        return ERROR_CONNECTION
+    if isinstance(exc, requests.Timeout):
+        return ERROR_TIMEOUT
+    if isinstance(exc, requests.HTTPError):
+        resp = exc.response
+        if resp is not None and 400 <= resp.status_code < 500:
+            return ERROR_CLIENT
+        return ERROR_SERVER
+    return ERROR_OTHER
+
+
+def backoff_delay(attempt: int, base_s: float, max_s: float = LLM_RETRY_BACKOFF_MAX) -> float:
+    """
+    attempt 回目の失敗のあとに待つ秒数（指数バックオフ + full jitter）。
+    0〜min(max_s, base_s * 2^(attempt-1)) の一様乱数にして、同時に落ちたリクエストが
+    いっせいにリトライしてバックエンドを再び詰まらせないようにする。
+    """
+    return random.uniform(0.0, min(max_s, base_s * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """
+    1 回の実行（= 1 プロセス）全体で使えるリトライ回数の予算。
+    リクエスト数 × ratio + min_retries 回までしかリトライしない。
+    バックエンドが全滅しているときに、全タスクがそれぞれリトライし尽くすのを防ぐ。
+    """
+
+    def __init__(
+        self,
+        ratio: float = LLM_RETRY_BUDGET_RATIO,
+        min_retries: int = LLM_RETRY_BUDGET_MIN,
+    ) -> None:
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self._exhausted_logged = False
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.retries < self.min_retries + self.ratio * self.requests:
+                self.retries += 1
+                return True
+            if not self._exhausted_logged:
+                self._exhausted_logged = True
+                logger.warning(
+                    "Retry budget exhausted (retries=%d, requests=%d); "
+                    "failing further LLM errors without retry",
+                    self.retries,
+                    self.requests,
+                )
+            return False
+
+
+class CircuitBreaker:
+    """
+    1 バックエンドぶんのサーキットブレーカー。
+    - closed   : ふつうに流す。接続エラー・タイムアウト・5xx が failure_threshold 回続いたら open
+    - open     : reset_s 秒は流さない（プールは他のバックエンドに振る）
+    - half_open: reset_s 経過後、1 リクエストだけ試す。成功なら closed、失敗ならまた open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_s: float = LLM_BREAKER_RESET_S,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """
+        いまこのバックエンドに振ってよいか（状態は変えない）。プールの振り分けに使う。
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_s
+            return not self._probe_in_flight
+
+    def retry_after(self) -> float:
+        """
+        あと何秒でこのバックエンドに振れるようになるか（いま振れるなら 0）。
+        half_open で 1 件試している最中なら、その結果を見に行く間隔を返す。
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.OPEN:
+                return max(0.0, self.reset_s - (time.monotonic() - self._opened_at))
+            return min(_PROBE_POLL_S, self.reset_s) if self._probe_in_flight else 0.0
+
+    def allow_request(self) -> bool:
+        """
+        実際に投げる直前に呼ぶ。open から reset_s 経っていれば half_open にして 1 件だけ通す。
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_s:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self, kind: str) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            if kind not in OVERLOAD_ERRORS:
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self.state != self.OPEN:
+                    self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        # 呼び出し側で self._lock を持っていること
+        log = logger.warning if state == self.OPEN else logger.info
+        log(
+            "[circuit] %s: %s -> %s (consecutive failures=%d)",
+            self.name,
+            self.state,
+            state,
+            self._failures,
+        )
+        self.state = state
+        get_run_metrics().record_circuit(self.name, state)
+
+
+class NoBackendAvailableError(RuntimeError):
+    """
+    すべてのバックエンドのサーキットブレーカーが open のとき。
+    """
+
+
+# プロセス全体で 1 つ（CLI は 1 コマンド = 1 プロセス）
+_retry_budget: RetryBudget | None = None
+_retry_budget_lock = threading.Lock()
+
+
+def get_retry_budget() -> RetryBudget:
+    global _retry_budget
+    with _retry_budget_lock:
+        if _retry_budget is None:
+            _retry_budget = RetryBudget()
+        return _retry_budget
+
+
+def _retry_after(clients: Sequence[Any]) -> float:
+    """
+    clients のどれかに振れるようになるまでの秒数（いちばん早いもの）。
+    """
+    waits = [c.breaker.retry_after() for c in clients if c.breaker is not None]
+    return min(waits) if waits else 0.0
+
+
+def call_with_retry(
+    clients: Sequence[Any],
+    pick: Callable[[Sequence[Any]], Optional[Any]],
+    call: Callable[[Any], T],
+    max_attempts: int,
+    backoff_base_s: float,
+    max_wait_s: float = LLM_ALL_OPEN_MAX_WAIT_S,
+) -> T:
+    """
+    clients（OllamaClient 相当: .breaker / .config.base_url を持つ）のどれかに call を投げ、
+    エラーの種類に応じてリトライする。
+
+    - 接続エラー      : 待たずに別のバックエンドへ（フェイルオーバー）
+    - タイムアウト・5xx・その他 : 指数バックオフ + jitter で待ってからリトライ（別のバックエンドを優先）
+    - 4xx            : リトライしない
+    - リトライはプロセス全体の RetryBudget から払う。尽きたらその場で諦める
+    - 全バックエンドのサーキットが open なら、いちばん早く half_open になるまで待ってから投げる
+      （最長 max_wait_s 秒。待つだけでリクエストは投げないので、attempt も予算も減らさない）
+
+    pick(candidates) は candidates からサーキットが閉じているものを 1 つ選ぶ（無ければ None）。
+    """
+    budget = get_retry_budget()
+    metrics = get_run_metrics()
+    budget.record_request()
+
+    last_exc: Optional[BaseException] = None
+    failed: list = []
+    wait_deadline: Optional[float] = None
+    attempt = 0
+
+    while attempt < max_attempts:
+        # 直前に失敗したバックエンド以外を優先し、それしか無ければそれを使う
+        candidates = [c for c in clients if c not in failed] or list(clients)
+        client = pick(candidates)
+        if client is None and len(candidates) < len(clients):
+            client = pick(clients)
+        if client is None:
+            now = time.monotonic()
+            if wait_deadline is None:
+                wait_deadline = now + max_wait_s
+            if now >= wait_deadline:
+                logger.error(
+                    "All LLM backends stayed unavailable (circuit open) for %.0fs; giving up",
+                    max_wait_s,
+                )
+                if last_exc is not None:
+                    raise last_exc
+                raise NoBackendAvailableError(
+                    "All LLM backends are unavailable (circuit open): "
+                    + ", ".join(c.config.base_url for c in clients)
+                )
+            wait_s = min(_retry_after(clients), wait_deadline - now)
+            logger.debug("All LLM backends are open; waiting %.2fs", wait_s)
+            # 同時に待っていたタスクがいっせいに投げないよう、少しずらす
+            time.sleep(max(wait_s, 0.0) + random.uniform(0.0, 0.05))
+            failed = []
+            continue
+
+        breaker = client.breaker
+        if breaker is not None and not breaker.allow_request():
+            # pick のあとに別スレッドが half_open の 1 枠を取った
+            failed.append(client)
+            continue
+
+        attempt += 1
+        try:
+            result = call(client)
+        except Exception as e:
+            last_exc = e
+            kind = classify_error(e)
+            if breaker is not None:
+                breaker.record_failure(kind)
+            logger.warning(
+                "LLM call to %s failed (attempt %d/%d, %s): %s",
+                client.config.base_url,
+                attempt,
+                max_attempts,
+                kind,
+                e,
+            )
+
+            if kind == ERROR_CLIENT or attempt == max_attempts:
+                break
+            if not budget.try_spend():
+                break
+
+            metrics.record_retry(client.config.base_url, kind)
+            failed = [client]
+            if kind != ERROR_CONNECTION:
+                time.sleep(backoff_delay(attempt, backoff_base_s))
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    logger.error("Giving up LLM call after %d attempt(s).", attempt)
+    if last_exc is not None:
+        raise last_exc
+    raise NoBackendAvailableError("LLM call failed for unknown reasons")
+
+
+__all__ = [
+    "CircuitBreaker",
+    "NoBackendAvailableError",
+    "RetryBudget",
+    "backoff_delay",
+    "call_with_retry",
+    "classify_error",
+    "get_retry_budget",
+    "OVERLOAD_ERRORS",
+]
@@ -7,11 +7,13 @@ from typing import List, Dict
 import pandas as pd
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..features.text_clustering import cluster_answers_for_question
 from ..features.ai_cluster_eval import analyze_clusters_with_llm
 from ..io.excel_writer import write_ai_cluster_report_excel
 from ..io.responses_loader import load_responses_and_questions
-from ..config import DEFAULT_CLUSTER_MODEL
+from ..utils.parallel import map_per_question
+from ..config import DEFAULT_CLUSTER_MODEL, FEATURE_JOBS
 logger = logging.getLogger(__name__)
 
 
@@ -22,6 +24,7 @@ def run_ai_cluster(
     log_path: Path,
     model_name: str = DEFAULT_CLUSTER_MODEL,
     llm_provider: str = "ollama",
+    jobs: int = FEATURE_JOBS,
 ) -> None:
 
     """   
@@ -29,21 +32,30 @@ def run_ai_cluster(
     各クラスタの「AIテンプレ度」を評価してレポートを出力する。
     """
     setup_logging(log_path)
-    logger.info("Start AI cluster pipeline")
+    logger.info("Start AI cluster pipeline (jobs=%s)", jobs)
 
     responses_excel = Path(responses_excel)
     output_excel = Path(output_excel)
     rubric_dir = Path(rubric_dir) if rubric_dir is not None else None
 
-    df, questions = load_responses_and_questions(responses_excel)
+    with get_run_metrics().stage("ai-cluster:load"):
+        df, questions = load_responses_and_questions(responses_excel)
 
     cluster_rows: List[Dict] = []
 
-    for q in questions:
-        sub = df[["student_id", q]].copy()
-        sub = sub.rename(columns={q: "answer"})
+    # クラスタリング（CPU のみ）は設問ごとに独立なので、jobs > 1 ならプロセス並列
+    tasks = [
+        (q, df[["student_id", q]].rename(columns={q: "answer"}))
+        for q in questions
+    ]
+    with get_run_metrics().stage("ai-cluster:compute"):
+        per_question_results = map_per_question(
+            cluster_answers_for_question,
+            tasks,
+            jobs=jobs,
+        )
 
-        results = cluster_answers_for_question(q, sub)
+    for results in per_question_results:
         for r in results:
             cluster_rows.append(
                 {
@@ -60,13 +72,14 @@ def run_ai_cluster(
     cluster_df = pd.DataFrame(cluster_rows)
 
     # クラスターごとの要約 & AIテンプレ度評価
-    analyses = analyze_clusters_with_llm(
-        responses_df=df,
-        cluster_df=cluster_df,
-        rubric_dir=str(rubric_dir) if rubric_dir else None,
-        model_name=model_name,
-        llm_provider=llm_provider,
-    )
+    with get_run_metrics().stage("ai-cluster:llm"):
+        analyses = analyze_clusters_with_llm(
+            responses_df=df,
+            cluster_df=cluster_df,
+            rubric_dir=str(rubric_dir) if rubric_dir else None,
+            model_name=model_name,
+            llm_provider=llm_provider,
+        )
 
     if not analyses:
         logger.warning("No cluster analyses generated.")
@@ -87,11 +100,12 @@ def run_ai_cluster(
 
     cluster_analysis_df = pd.DataFrame(analysis_rows)
 
-    write_ai_cluster_report_excel(
-        path=output_excel,
-        per_student_clusters_df=cluster_df,
-        cluster_analysis_df=cluster_analysis_df,
-    )
+    with get_run_metrics().stage("ai-cluster:write"):
+        write_ai_cluster_report_excel(
+            path=output_excel,
+            per_student_clusters_df=cluster_df,
+            cluster_analysis_df=cluster_analysis_df,
+        )
 
     logger.info("Wrote AI cluster report to %s", output_excel)
 
@@ -99,14 +113,15 @@ def run_ai_cluster(
     features_dir = Path("data/intermediate/features")
     features_dir.mkdir(parents=True, exist_ok=True)
 
-    cluster_df.to_csv(
-        features_dir / "ai_clusters_per_student.csv",
-        index=False,
-        encoding="utf-8-sig",
-    )
-
-    cluster_analysis_df.to_csv(
-        features_dir / "ai_clusters_summary.csv",
-        index=False,
-        encoding="utf-8-sig",
-    )
+    with get_run_metrics().stage("ai-cluster:write"):
+        cluster_df.to_csv(
+            features_dir / "ai_clusters_per_student.csv",
+            index=False,
+            encoding="utf-8-sig",
+        )
+
+        cluster_analysis_df.to_csv(
+            features_dir / "ai_clusters_summary.csv",
+            index=False,
+            encoding="utf-8-sig",
+        )
@@ -4,6 +4,7 @@ from pathlib import Path
 import logging
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..features.ai_likeness_evaluator import AILikenessEvaluator
 from ..llm.ollama_pool import get_ollama_client
 
@@ -47,10 +48,11 @@ def run_ai_likeness(
     likeness_csv = Path(likeness_csv) if likeness_csv else Path("data/intermediate/features/ai_likeness.csv")
 
     # データの読み込み
-    ai_similarity_df = pd.read_csv(ai_similarity_csv)
-    peer_similarity_df = pd.read_csv(peer_similarity_csv)
-    symbolic_features_df = pd.read_csv(symbolic_features_csv)
-    responses_df = load_responses_excel(responses_excel)
+    with get_run_metrics().stage("ai-likeness:load"):
+        ai_similarity_df = pd.read_csv(ai_similarity_csv)
+        peer_similarity_df = pd.read_csv(peer_similarity_csv)
+        symbolic_features_df = pd.read_csv(symbolic_features_csv)
+        responses_df = load_responses_excel(responses_excel)
 
 
     # 型合わせ（student_id を str に寄せる）
@@ -131,10 +133,12 @@ def run_ai_likeness(
 
     # 中間CSVとして保存（ai-report が読む用）
     likeness_csv.parent.mkdir(parents=True, exist_ok=True)
-    results_df.to_csv(likeness_csv, index=False, encoding="utf-8-sig")
+    with get_run_metrics().stage("ai-likeness:write"):
+        results_df.to_csv(likeness_csv, index=False, encoding="utf-8-sig")
     logger.info("Wrote AI likeness features to %s", likeness_csv)
 
     # 結果をExcelに保存
-    write_ai_likeness_report_excel(output_excel, results_df)
+    with get_run_metrics().stage("ai-likeness:write"):
+        write_ai_likeness_report_excel(output_excel, results_df)
     logger.info("Wrote AI likeness report to %s", output_excel)
 
@@ -6,6 +6,7 @@ import logging
 import pandas as pd
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..features.feature_aggregator import load_full_features
 from ..io.excel_writer import write_ai_suspect_report_excel
 
@@ -27,18 +28,20 @@ def run_ai_report(
     setup_logging(log_path)
     logger.info("Start AI report pipeline")
 
-    full_df = load_full_features(
-        responses_excel=responses_excel,
-        ai_similarity_csv=ai_similarity_csv,
-        peer_similarity_csv=peer_similarity_csv,
-        symbolic_features_csv=symbolic_features_csv,
-        ai_likeness_csv=ai_likeness_csv,
-    )
-
-    write_ai_suspect_report_excel(
-        path=output_excel,
-        full_features_df=full_df,
-    )
+    with get_run_metrics().stage("ai-report:load"):
+        full_df = load_full_features(
+            responses_excel=responses_excel,
+            ai_similarity_csv=ai_similarity_csv,
+            peer_similarity_csv=peer_similarity_csv,
+            symbolic_features_csv=symbolic_features_csv,
+            ai_likeness_csv=ai_likeness_csv,
+        )
+
+    with get_run_metrics().stage("ai-report:write"):
+        write_ai_suspect_report_excel(
+            path=output_excel,
+            full_features_df=full_df,
+        )
 
     logger.info(
         "Wrote AI suspect report to %s (rows=%d)",
@@ -4,7 +4,10 @@ from pathlib import Path
 import logging
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..features.ai_similarity import compute_ai_similarity_for_responses
+from ..io.ai_similarity_index import AISimilarityIndex
+from ..config import FEATURE_JOBS, AI_SIMILARITY_INDEX_PATH, AI_SIMILARITY_NGRAM
 
 logger = logging.getLogger(__name__)
 
@@ -14,21 +17,44 @@ def run_ai_similarity(
     ai_reference_dir: Path,
     output_csv: Path,
     log_path: Path,
+    jobs: int = FEATURE_JOBS,
+    index_path: Path | str | None = AI_SIMILARITY_INDEX_PATH,
+    full_recompute: bool = False,
 ) -> None:
     """
     匿名回答Excel ＋ AI模範解答 をもとに、
     各 student_id × question の AI類似度を CSV で出力する。
+
+    index_path に前回までの集計（比べ終わった参照と max / mean / argmax）を保存し、
+    次回は新しく取り込んだ AI参照とだけ比べる（None なら毎回全件計算・保存しない）。
+    full_recompute=True なら保存済みの集計を捨てて全件計算し直す。
     """
     setup_logging(log_path)
-    logger.info("Start AI similarity pipeline")
-
-    df = compute_ai_similarity_for_responses(
-        responses_excel_path=responses_excel,
-        ai_reference_dir=ai_reference_dir,
+    logger.info(
+        "Start AI similarity pipeline (jobs=%s, index=%s, full_recompute=%s)",
+        jobs,
+        index_path,
+        full_recompute,
     )
 
+    index = AISimilarityIndex(index_path) if index_path is not None else None
+    try:
+        if index is not None and full_recompute:
+            index.reset(ngram=AI_SIMILARITY_NGRAM)
+        with get_run_metrics().stage("ai-similarity:compute"):
+            df = compute_ai_similarity_for_responses(
+                responses_excel_path=responses_excel,
+                ai_reference_dir=ai_reference_dir,
+                jobs=jobs,
+                index=index,
+            )
+    finally:
+        if index is not None:
+            index.close()
+
     output_csv = Path(output_csv)
     output_csv.parent.mkdir(parents=True, exist_ok=True)
 
-    df.to_csv(output_csv, index=False, encoding="utf-8-sig")
+    with get_run_metrics().stage("ai-similarity:write"):
+        df.to_csv(output_csv, index=False, encoding="utf-8-sig")
     logger.info("Wrote AI similarity features to %s (rows=%d)", output_csv, len(df))
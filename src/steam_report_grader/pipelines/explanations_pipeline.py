@@ -7,7 +7,9 @@ import json  # ← 追加
 import pandas as pd
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..io.excel_writer import write_score_explanations_excel
+from ..features.aggregate_scores import load_absolute_scores
 
 logger = logging.getLogger(__name__)
 
@@ -97,8 +99,9 @@ def run_explanations(
     logger.info("Start explanations pipeline")
 
     # スコアCSV & IDマップ読み込み
-    scores_df = pd.read_csv(absolute_scores_csv)
-    id_df = pd.read_excel(id_map_excel, sheet_name="id_map")
+    with get_run_metrics().stage("explain:load"):
+        scores_df = load_absolute_scores(absolute_scores_csv)
+        id_df = pd.read_excel(id_map_excel, sheet_name="id_map")
 
     # 列名ゆれをここで吸収
     scores_df = _normalize_explanation_columns(scores_df)
@@ -147,10 +150,11 @@ def run_explanations(
     detailed_df = merged[detailed_cols]
 
     # Excel 出力
-    write_score_explanations_excel(
-        output_excel,
-        brief_df=brief_df,
-        detailed_df=detailed_df,
-    )
+    with get_run_metrics().stage("explain:write"):
+        write_score_explanations_excel(
+            output_excel,
+            brief_df=brief_df,
+            detailed_df=detailed_df,
+        )
 
     logger.info("Wrote explanations excel to %s", output_excel)
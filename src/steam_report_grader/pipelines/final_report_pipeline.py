@@ -1,15 +1,26 @@
 # src/steam_report_grader/pipelines/final_report_pipeline.py
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+import io
 import logging
-from typing import List
+import zipfile
+from typing import Dict, List, Tuple
 from docx import Document
 
 import pandas as pd
 
-from ..utils.logging_utils import setup_logging
-from ..config import AI_SUSPECT_THRESHOLD
+from ..utils.logging_utils import setup_logging, worker_logging
+from ..utils.telemetry import get_run_metrics
+from ..utils.parallel import resolve_jobs
+from ..io.docx_template import DocxTemplate
+from ..io.excel_writer import write_excel_streaming
+from ..features.aggregate_scores import load_absolute_scores
+from ..config import AI_SUSPECT_THRESHOLD, FEEDBACK_JOBS, FEEDBACK_DOCX_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +36,8 @@ def _build_final_results(
     absolute_scores_csv = Path(absolute_scores_csv)
     id_map_excel = Path(id_map_excel)
 
-    scores_df = pd.read_csv(absolute_scores_csv)
+    # 横持ちの点数表に要るのはこの 3 列だけ（講評などの長文は読まない）
+    scores_df = load_absolute_scores(absolute_scores_csv, columns=["student_id", "question", "score"])
     id_df = pd.read_excel(id_map_excel, sheet_name="id_map")
 
     if scores_df.empty:
@@ -89,13 +101,27 @@ def _build_final_results(
 
     return final_df
 
+def _index_scores_by_student(scores_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    scores_df を student_id → その受験者の全設問行 の dict にする。
+    受験者ごとに boolean mask で抜き出すと全体で O(受験者数^2) になるので、
+    groupby で 1 回だけ分割しておく。
+    """
+    key = scores_df["student_id"].astype(str)
+    return {
+        sid: group
+        for sid, group in scores_df.groupby(key, sort=False)
+    }
+
+
 def _generate_feedback_markdown_for_student(
-    scores_df: pd.DataFrame,
+    student_scores: pd.DataFrame,
     final_row: pd.Series,
     questions_order: List[str],
 ) -> str:
     """
     ある受験者 1 人分の feedback_xxx.md の本文を組み立てる。
+    student_scores はその受験者の全設問行（_index_scores_by_student の値）。
     """
     sid = final_row["student_id"]
     name = final_row.get("real_name", "") or "受験者"
@@ -103,18 +129,12 @@ def _generate_feedback_markdown_for_student(
     rank = final_row.get("rank", "")
     num_students = final_row.get("_num_students", None)
 
-    # この受験者の全設問行を抜き出す
-    s_rows = scores_df[scores_df["student_id"] == sid].copy()
-
     # 設問順を保証
-    def _order_idx(q: str) -> int:
-        try:
-            return questions_order.index(q)
-        except ValueError:
-            return 9999
-
-    s_rows["__q_order"] = s_rows["question"].apply(_order_idx)
-    s_rows = s_rows.sort_values("__q_order")
+    q_order = {q: i for i, q in enumerate(questions_order)}
+    s_rows = student_scores.assign(
+        __q_order=student_scores["question"].map(q_order).fillna(9999)
+    )
+    s_rows = s_rows.sort_values("__q_order", kind="stable")
 
     lines: List[str] = []
 
@@ -158,17 +178,79 @@ def _generate_feedback_markdown_for_student(
 
     return "\n".join(lines)
 
+@dataclass
+class _FeedbackPayload:
+    """
+    フィードバック 1 人ぶんをワーカープロセスに渡すための入れ物。
+    scores_df 全体ではなく、その受験者の行（student_scores）だけを持たせる。
+    """
+    final_row: pd.Series
+    student_scores: pd.DataFrame
+    questions_order: List[str]
+    num_students: int
+    md_path: Path
+    docx_path: Path
+    template_path: str | None = None
+
+
+def _render_student_feedback(payload: _FeedbackPayload) -> Tuple[str, Path, Path]:
+    """
+    1 人ぶんの feedback_{sid}.md / .docx を書き出す（プロセスプールのワーカー）。
+    (student_id, md_path, docx_path) を返す。
+    """
+    row = payload.final_row
+    sid = row["student_id"]
+    name = row.get("real_name", "") or "受験者"
+    total = float(row.get("total_score", 0))
+    rank = int(row.get("rank", 0))
+
+    row_with_meta = row.copy()
+    row_with_meta["_num_students"] = payload.num_students
+
+    md_text = _generate_feedback_markdown_for_student(
+        student_scores=payload.student_scores,
+        final_row=row_with_meta,
+        questions_order=payload.questions_order,
+    )
+
+    # --- Markdown 出力（feedback/md/） ---
+    payload.md_path.write_text(md_text, encoding="utf-8")
+
+    # --- docx 出力（feedback/docx/） ---
+    per_student_df = payload.student_scores.sort_values("question")
+    mean = float(per_student_df["score"].mean())
+
+    _write_feedback_docx(
+        student_id=str(sid),
+        real_name=name if name != "受験者" else "",
+        rank=rank,
+        n_students=payload.num_students,
+        total=total,
+        mean=mean,
+        per_student_df=per_student_df,
+        out_path=payload.docx_path,
+        template_path=payload.template_path,
+    )
+    return str(sid), payload.md_path, payload.docx_path
+
+
 def run_final_report(
     absolute_scores_csv: Path,
     id_map_excel: Path,
     ranking_csv_path: Path,
     feedback_dir: Path,
     log_path: Path,
+    jobs: int = FEEDBACK_JOBS,
+    feedback_zip: Path | None = None,
+    docx_template: Path | None = FEEDBACK_DOCX_TEMPLATE,
 ) -> None:
     """
     - absolute_scores.csv + id_map.xlsx から final_results を構築
     - ranking.csv を出力
     - 各受験者ごとに feedback_{student_id}.md を生成
+      （jobs > 1 なら受験者単位でプロセス並列。0 以下は CPU コア数）
+    - feedback_zip を指定すると、md / docx を 1 つの zip にも 1 人ずつ追記する
+    - docx は docx_template（なければ組み込みテンプレート）に差し込んで作る
 
     ※ 現時点では絶対評価のみで順位付け（相対評価は未統合）
     """
@@ -194,18 +276,21 @@ def run_final_report(
 
 
     # final_results を構築
-    final_df = _build_final_results(
-        absolute_scores_csv=absolute_scores_csv,
-        id_map_excel=id_map_excel,
-    )
+    with get_run_metrics().stage("final-report:load"):
+        final_df = _build_final_results(
+            absolute_scores_csv=absolute_scores_csv,
+            id_map_excel=id_map_excel,
+        )
 
     # ranking.csv として保存
-    final_df.to_csv(ranking_csv_path, index=False, encoding="utf-8-sig")
+    with get_run_metrics().stage("final-report:write"):
+        final_df.to_csv(ranking_csv_path, index=False, encoding="utf-8-sig")
     logger.info("Wrote ranking.csv to %s", ranking_csv_path)
 
     # feedback_xxx.md 生成のため、元の scores も読む
-    scores_df = pd.read_csv(absolute_scores_csv)
-    id_df = pd.read_excel(id_map_excel, sheet_name="id_map")
+    with get_run_metrics().stage("final-report:load"):
+        scores_df = load_absolute_scores(absolute_scores_csv)
+        id_df = pd.read_excel(id_map_excel, sheet_name="id_map")
     # --- AI類似度 (ai_likeness.csv) を読み込む ---
     ai_likeness_path = Path("data/intermediate/features/ai_likeness.csv")
     ai_likeness_df: pd.DataFrame | None = None
@@ -256,24 +341,54 @@ def run_final_report(
             ["ai_likeness_mean", "ai_likeness_max", "ai_suspect_flag"],
         )
 
+    # --- 盗用リング (plagiarism_rings.csv) があればマージ ---
+    rings_path = Path("data/intermediate/features/plagiarism_rings.csv")
+    if rings_path.exists():
+        try:
+            rings_df = pd.read_csv(rings_path)
+        except Exception as e:
+            logger.warning("Failed to load plagiarism_rings.csv: %s", e)
+            rings_df = None
+
+        if rings_df is not None and not rings_df.empty:
+            ring_cols = [
+                c for c in [
+                    "student_id",
+                    "ring_id",
+                    "ring_size",
+                    "ring_questions_shared",
+                    "ring_members",
+                ]
+                if c in rings_df.columns
+            ]
+            rings_df = rings_df[ring_cols].drop_duplicates("student_id")
+            rings_df["student_id"] = rings_df["student_id"].astype(str)
+            final_df["student_id"] = final_df["student_id"].astype(str)
+
+            final_df = final_df.merge(rings_df, on="student_id", how="left")
+            logger.info(
+                "Merged plagiarism rings into final_df (students in rings=%d)",
+                len(rings_df),
+            )
+    else:
+        logger.info(
+            "Plagiarism rings file %s not found. Skipping ring features.",
+            rings_path,
+        )
+
 
     final_excel_path = ranking_csv_path.parent / "final_report.xlsx"
-    _write_final_excel(
-        final_df=final_df,
-        scores_df=scores_df,
-        id_df=id_df,
-        ai_likeness_df=ai_likeness_df,
-        excel_path=final_excel_path,
-    )
+    with get_run_metrics().stage("final-report:write"):
+        _write_final_excel(
+            final_df=final_df,
+            scores_df=scores_df,
+            id_df=id_df,
+            ai_likeness_df=ai_likeness_df,
+            excel_path=final_excel_path,
+        )
     logger.info("Wrote final_report.xlsx to %s", final_excel_path)
 
 
-    # 設問ラベルの順序（Q1, Q2, ...）を決める
-    questions = sorted(
-        scores_df["question"].unique().tolist(),
-        key=lambda q: int(str(q).lstrip("Q")) if str(q).startswith("Q") else 9999,
-    )
-
     # 設問ラベルの順序（Q1, Q2, ...）を決める
     questions = sorted(
         scores_df["question"].unique().tolist(),
@@ -286,48 +401,147 @@ def run_final_report(
         num_students,
     )
 
-    for _, row in final_df.iterrows():
-        sid = row["student_id"]
-        name = row.get("real_name", "") or "受験者"
-        total = float(row.get("total_score", 0))
-        rank = int(row.get("rank", 0))
+    # 受験者ごとの設問行は最初に 1 回だけ分割しておく
+    scores_by_student = _index_scores_by_student(scores_df)
+    empty_scores = scores_df.iloc[0:0]
 
-        row_with_meta = row.copy()
-        row_with_meta["_num_students"] = num_students
+    # docx テンプレートはここで 1 回読んでおく（ワーカーはパスから各自 1 回だけ読む）
+    template_path = str(docx_template) if docx_template is not None else None
+    _get_feedback_template(template_path)
 
-        md_text = _generate_feedback_markdown_for_student(
-            scores_df=scores_df,
-            final_row=row_with_meta,
+    # 受験者 1 人ぶんの仕事（その人の行だけ）を作る
+    payloads = (
+        _FeedbackPayload(
+            final_row=row,
+            student_scores=scores_by_student.get(str(row["student_id"]), empty_scores),
             questions_order=questions,
+            num_students=num_students,
+            md_path=feedback_md_dir / f"feedback_{row['student_id']}.md",
+            docx_path=feedback_docx_dir / f"feedback_{row['student_id']}.docx",
+            template_path=template_path,
         )
+        for _, row in final_df.iterrows()
+    )
 
-        # --- Markdown 出力（feedback/md/） ---
-        md_path = feedback_md_dir / f"feedback_{sid}.md"
-        md_path.write_text(md_text, encoding="utf-8")
-        logger.info("Wrote feedback markdown for %s to %s", sid, md_path)
+    n_jobs = min(resolve_jobs(jobs), max(num_students, 1))
+    if feedback_zip is not None:
+        feedback_zip = Path(feedback_zip)
+        feedback_zip.parent.mkdir(parents=True, exist_ok=True)
+
+    with ExitStack() as stack:
+        # 受験者ごとの md / docx の生成と zip への追記（ワーカーの起動も含む）
+        stack.enter_context(get_run_metrics().stage("final-report:feedback"))
+        if n_jobs > 1:
+            logger.info("Rendering feedback on %d processes", n_jobs)
+            # ワーカーのログも親のログファイルに書く（stack は逆順に閉じるのでプールが先に止まる）
+            init, initargs = stack.enter_context(worker_logging())
+            executor = stack.enter_context(
+                ProcessPoolExecutor(max_workers=n_jobs, initializer=init, initargs=initargs)
+            )
+            # 1 人ずつ投げるとプロセス間通信の方が重いのでまとめて渡す
+            chunksize = max(1, num_students // (n_jobs * 8))
+            rendered = executor.map(
+                _render_student_feedback, payloads, chunksize=chunksize
+            )
+        else:
+            rendered = map(_render_student_feedback, payloads)
+
+        zf = None
+        if feedback_zip is not None:
+            zf = stack.enter_context(zipfile.ZipFile(feedback_zip, "w"))
+
+        # 終わった順（= final_df の順）にログを出し、zip にも 1 人ずつ追記する
+        for sid, md_path, docx_path in rendered:
+            logger.info("Wrote feedback markdown for %s to %s", sid, md_path)
+            logger.info("Wrote feedback docx for %s to %s", sid, docx_path)
+            if zf is not None:
+                zf.write(
+                    md_path,
+                    arcname=f"md/{md_path.name}",
+                    compress_type=zipfile.ZIP_DEFLATED,
+                )
+                # docx はもともと zip なので再圧縮しない
+                zf.write(
+                    docx_path,
+                    arcname=f"docx/{docx_path.name}",
+                    compress_type=zipfile.ZIP_STORED,
+                )
+
+    if feedback_zip is not None:
+        logger.info("Wrote feedback bundle to %s", feedback_zip)
 
-        # --- docx 出力（feedback/docx/） ---
-        per_student_df = (
-            scores_df[scores_df["student_id"] == sid]
-            .sort_values("question")
-        )
-        mean = float(per_student_df["score"].mean())
-
-        docx_path = feedback_docx_dir / f"feedback_{sid}.docx"
-        _write_feedback_docx(
-            student_id=str(sid),
-            real_name=name if name != "受験者" else "",
-            rank=rank,
-            n_students=num_students,
-            total=total,
-            mean=mean,
-            per_student_df=per_student_df,
-            out_path=docx_path,
+    logger.info("Final report pipeline completed.")
+
+def build_default_feedback_template() -> bytes:
+    """
+    デフォルトのフィードバック用 docx テンプレートを python-docx で作って bytes で返す。
+    レイアウトを変えたいときは write_default_feedback_template() で書き出して Word で編集する。
+    """
+    doc = Document()
+
+    doc.add_heading("{{title}}", level=1)
+
+    p = doc.add_paragraph()
+    p.add_run("順位: {{rank}} / {{n_students}}\n")
+    p.add_run("合計得点: {{total}}\n")
+    p.add_run("平均得点: {{mean}}")
+
+    doc.add_paragraph("{{#relative_rank}}")
+    doc.add_paragraph("相対順位: {{relative_rank}}")
+    doc.add_paragraph("{{/relative_rank}}")
+
+    # 設問ごとの講評（questions の要素ぶんくり返す）
+    doc.add_paragraph("{{#questions}}")
+    doc.add_heading("{{question}} （{{score}} 点）", level=2)
+
+    doc.add_paragraph("{{#brief}}")
+    doc.add_heading("講評（簡易）", level=3)
+    doc.add_paragraph("{{brief}}")
+    doc.add_paragraph("{{/brief}}")
+
+    doc.add_paragraph("{{#detailed}}")
+    doc.add_heading("講評（詳細）", level=3)
+    doc.add_paragraph("{{detailed}}")
+    doc.add_paragraph("{{/detailed}}")
+    doc.add_paragraph("{{/questions}}")
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def write_default_feedback_template(out_path: Path) -> Path:
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(build_default_feedback_template())
+    return out_path
+
+
+@lru_cache(maxsize=None)
+def _get_feedback_template(template_path: str | None) -> DocxTemplate:
+    """
+    テンプレートはプロセスごとに 1 回だけ読む（プロセスプールの各ワーカーでもキャッシュされる）。
+    template_path が None か存在しなければデフォルトテンプレートを使う。
+    """
+    if template_path and Path(template_path).exists():
+        logger.info("Using feedback docx template %s", template_path)
+        return DocxTemplate.from_path(template_path)
+    if template_path:
+        logger.info(
+            "Feedback docx template %s not found. Using built-in template.",
+            template_path,
         )
-        logger.info("Wrote feedback docx for %s to %s", sid, docx_path)
+    return DocxTemplate.from_bytes(build_default_feedback_template())
 
 
-    logger.info("Final report pipeline completed.")
+def _feedback_text(srow: pd.Series, cols: List[str]) -> str:
+    # 最初に見つかった「値のある」列を使う（空文字・NaN は講評なし扱い）
+    for c in cols:
+        value = srow.get(c)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
 
 def _write_feedback_docx(
     student_id: str,
@@ -338,58 +552,44 @@ def _write_feedback_docx(
     mean: float,
     per_student_df: pd.DataFrame,
     out_path: Path,
+    template_path: Path | str | None = FEEDBACK_DOCX_TEMPLATE,
 ) -> None:
     """
     feedback_{student_id}.docx を書き出す。
-    md と同じ情報を Word 形式で整形。
+    md と同じ情報をテンプレート（template_path）に差し込んで Word 形式にする。
     """
-    doc = Document()
-
-    # タイトル
-    title = f"{real_name} ({student_id})" if real_name else student_id
-    doc.add_heading(title, level=1)
-
-    # 基本情報
-    p = doc.add_paragraph()
-    p.add_run(f"順位: {rank} / {n_students}\n")
-    p.add_run(f"合計得点: {total:.2f}\n")
-    p.add_run(f"平均得点: {mean:.2f}")
-
-    relative_rank = per_student_df["relative_rank"].iloc[0] if "relative_rank" in per_student_df.columns else None
-    if relative_rank is not None:
-        p.add_run(f"相対順位: {int(relative_rank)}\n")
-
-    # 設問ごとの講評
-    for _, srow in per_student_df.iterrows():
-        q = srow["question"]
-        score = srow["score"]
-
-        brief = (
-            srow.get("brief")
-            or srow.get("brief_explanation")
-            or srow.get("reason")
-            or ""
-        )
-        detailed = (
-            srow.get("detailed")
-            or srow.get("detailed_explanation")
-            or ""
-        )
-
-
-
-        doc.add_heading(f"{q} （{score} 点）", level=2)
-
-        if isinstance(brief, str) and brief.strip():
-            doc.add_heading("講評（簡易）", level=3)
-            doc.add_paragraph(brief.strip())
+    template = _get_feedback_template(
+        str(template_path) if template_path is not None else None
+    )
 
-        if isinstance(detailed, str) and detailed.strip():
-            doc.add_heading("講評（詳細）", level=3)
-            doc.add_paragraph(detailed.strip())
+    relative_rank = None
+    if "relative_rank" in per_student_df.columns and not per_student_df.empty:
+        rr = per_student_df["relative_rank"].iloc[0]
+        if pd.notna(rr):
+            relative_rank = int(rr)
+
+    questions = [
+        {
+            "question": srow["question"],
+            "score": srow["score"],
+            "brief": _feedback_text(srow, ["brief", "brief_explanation", "reason"]),
+            "detailed": _feedback_text(srow, ["detailed", "detailed_explanation"]),
+        }
+        for _, srow in per_student_df.iterrows()
+    ]
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    doc.save(out_path)
+    context = {
+        "title": f"{real_name} ({student_id})" if real_name else student_id,
+        "student_id": student_id,
+        "real_name": real_name,
+        "rank": rank,
+        "n_students": n_students,
+        "total": f"{total:.2f}",
+        "mean": f"{mean:.2f}",
+        "relative_rank": relative_rank,
+        "questions": questions,
+    }
+    template.render(context, out_path)
 
 def _write_final_excel(
     final_df: pd.DataFrame,
@@ -407,7 +607,7 @@ def _write_final_excel(
     excel_path.parent.mkdir(parents=True, exist_ok=True)
 
     # 1. ranking シート用: final_df をそのまま
-    ranking_df = final_df.copy()
+    ranking_df = final_df
 
     # 2. by_student_question シート用: scores_df + id_map を縦持ちで
     spq = scores_df.merge(id_df, on="student_id", how="left")
@@ -457,7 +657,8 @@ def _write_final_excel(
             cols.append(c)
     spq = spq[cols]
 
-    with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-        ranking_df.to_excel(writer, index=False, sheet_name="ranking")
-        spq.to_excel(writer, index=False, sheet_name="by_student_question")
+    write_excel_streaming(
+        excel_path,
+        [("ranking", ranking_df), ("by_student_question", spq)],
+    )
 
@@ -3,41 +3,237 @@ from __future__ import annotations
 from pathlib import Path
 import logging
 
+import pandas as pd
+
 from ..utils.logging_utils import setup_logging
-from ..features.peer_similarity import compute_peer_similarity_for_responses
+from ..utils.telemetry import get_run_metrics
+from ..features.peer_similarity import compute_peer_similarity, update_peer_similarity
+from ..io.peer_pair_store import (
+    PeerPairStore,
+    PeerPairTable,
+    pair_store_paths,
+    write_peer_pairs,
+)
+from ..io.peer_similarity_index import PeerSimilarityIndex
+from ..config import (
+    FEATURE_JOBS,
+    PEER_PAIR_TOP_K,
+    PEER_PAIR_MIN_SIMILARITY,
+    PEER_PAIR_FORMAT,
+    PEER_SIMILARITY_INDEX_PATH,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _remove_stale_pairs(pair_output_csv: Path, pair_format: str) -> None:
+    """
+    いま書いたのと別の形式のペア表が残っていたら消す。
+    （compact で書いたのに古い CSV が残っていると、plagiarism-rings がそちらを読んでしまう）
+    """
+    if pair_format == "compact":
+        stale = [pair_output_csv]
+    else:
+        stale = list(pair_store_paths(pair_output_csv))
+    for path in stale:
+        if path.exists():
+            path.unlink()
+            logger.info("Removed stale peer pair table %s", path)
+
+
+def _append_pairs(
+    pair_output_csv: Path,
+    new_pair_df: pd.DataFrame,
+    student_ids: list[str],
+    pair_format: str,
+) -> bool:
+    """
+    差分更新で増えたペアを既存のペア表に足す。既存のペア表が無ければ False。
+    CSV は追記するだけ。コンパクト形式は student_id の index が変わるので書き直す。
+    """
+    if pair_format == "compact":
+        _, meta_path = pair_store_paths(pair_output_csv)
+        if not meta_path.exists():
+            return False
+        store = PeerPairStore.open(pair_output_csv)
+        merged = pd.concat([store.to_frame(), new_pair_df], ignore_index=True)
+        table = PeerPairTable.from_frame(
+            merged,
+            student_ids=student_ids,
+            questions=store.questions,
+            top_k=store.meta.get("top_k"),
+            min_similarity=store.meta.get("min_similarity"),
+        )
+        # memmap を閉じてから同じ .bin に書く
+        del store
+        bin_path = write_peer_pairs(pair_output_csv, table)
+        _remove_stale_pairs(pair_output_csv, pair_format)
+        logger.info(
+            "Updated peer similarity (pairs, compact) at %s (+%d, rows=%d)",
+            bin_path,
+            len(new_pair_df),
+            len(table),
+        )
+        return True
+
+    if not pair_output_csv.exists():
+        return False
+    new_pair_df.to_csv(
+        pair_output_csv, mode="a", header=False, index=False, encoding="utf-8"
+    )
+    _remove_stale_pairs(pair_output_csv, pair_format)
+    logger.info(
+        "Appended peer similarity (pairs) to %s (+%d rows)",
+        pair_output_csv,
+        len(new_pair_df),
+    )
+    return True
+
+
 def run_peer_similarity(
     responses_excel: Path,
     per_student_output_csv: Path,
     pair_output_csv: Path,
     log_path: Path,
+    jobs: int = FEATURE_JOBS,
+    pair_top_k: int | None = PEER_PAIR_TOP_K,
+    pair_min_similarity: float | None = PEER_PAIR_MIN_SIMILARITY,
+    pair_format: str = PEER_PAIR_FORMAT,
+    index_path: Path | str | None = PEER_SIMILARITY_INDEX_PATH,
+    incremental: bool = False,
 ) -> None:
     """
     匿名回答Excelから受験者同士の類似度を計算し、2つのCSVを出力する。
+
+    pair_format="compact" のときは、ペア表を CSV ではなく
+    pair_output_csv と同名の .bin（int32 index + float32）と .meta.json で出力する。
+    pair_top_k / pair_min_similarity を指定するとペア表を枝刈りする
+    （per_student の特徴量は常に全ペアから計算する）。
+
+    全件計算のたびに index_path に差分更新用の索引を書く（None なら書かない）。
+    incremental=True なら、索引に無い受験者（遅れて届いたレポート）だけを全員と比べて
+    per_student を更新し、増えたペアをペア表に足す。索引が無い・古い場合は全件計算する。
     """
     setup_logging(log_path)
-    logger.info("Start peer similarity pipeline")
+    logger.info(
+        "Start peer similarity pipeline (jobs=%s, pair_top_k=%s, pair_min_similarity=%s, "
+        "pair_format=%s, incremental=%s)",
+        jobs,
+        pair_top_k,
+        pair_min_similarity,
+        pair_format,
+        incremental,
+    )
 
-    per_student_df, pair_df = compute_peer_similarity_for_responses(responses_excel)
+    if pair_format not in ("csv", "compact"):
+        raise ValueError(f"Unknown pair_format: {pair_format}")
 
     per_student_output_csv = Path(per_student_output_csv)
     pair_output_csv = Path(pair_output_csv)
     per_student_output_csv.parent.mkdir(parents=True, exist_ok=True)
     pair_output_csv.parent.mkdir(parents=True, exist_ok=True)
 
-    per_student_df.to_csv(per_student_output_csv, index=False, encoding="utf-8-sig")
+    if incremental and index_path is None:
+        raise ValueError("incremental=True requires index_path")
+
+    has_index = index_path is not None and Path(index_path).exists()
+    index = PeerSimilarityIndex(index_path) if index_path is not None else None
+    try:
+        if incremental and has_index:
+            if _run_incremental(
+                index,
+                responses_excel,
+                per_student_output_csv,
+                pair_output_csv,
+                pair_top_k,
+                pair_min_similarity,
+                pair_format,
+            ):
+                return
+            logger.info("Falling back to full peer similarity recompute")
+        elif incremental:
+            logger.info("No peer similarity index at %s; running full recompute", index_path)
+
+        with get_run_metrics().stage("peer-similarity:compute"):
+            per_student_df, pair_table = compute_peer_similarity(
+                responses_excel,
+                jobs=jobs,
+                top_k=pair_top_k,
+                min_similarity=pair_min_similarity,
+                index=index,
+            )
+    finally:
+        if index is not None:
+            index.close()
+
+    with get_run_metrics().stage("peer-similarity:write"):
+        per_student_df.to_csv(per_student_output_csv, index=False, encoding="utf-8-sig")
     logger.info(
         "Wrote peer similarity (per student) to %s (rows=%d)",
         per_student_output_csv,
         len(per_student_df),
     )
 
-    pair_df.to_csv(pair_output_csv, index=False, encoding="utf-8-sig")
+    if pair_format == "compact":
+        with get_run_metrics().stage("peer-similarity:write"):
+            bin_path = write_peer_pairs(pair_output_csv, pair_table)
+        _remove_stale_pairs(pair_output_csv, pair_format)
+        logger.info(
+            "Wrote peer similarity (pairs, compact) to %s (rows=%d)",
+            bin_path,
+            len(pair_table),
+        )
+        return
+
+    with get_run_metrics().stage("peer-similarity:write"):
+        pair_df = pair_table.to_frame()
+        pair_df.to_csv(pair_output_csv, index=False, encoding="utf-8-sig")
+    _remove_stale_pairs(pair_output_csv, pair_format)
     logger.info(
         "Wrote peer similarity (pairs) to %s (rows=%d)",
         pair_output_csv,
         len(pair_df),
     )
+
+
+def _run_incremental(
+    index: PeerSimilarityIndex,
+    responses_excel: Path,
+    per_student_output_csv: Path,
+    pair_output_csv: Path,
+    pair_top_k: int | None,
+    pair_min_similarity: float | None,
+    pair_format: str,
+) -> bool:
+    """
+    差分更新を試みる。全件計算が必要なら何も書かずに False を返す。
+    """
+    has_pairs = (
+        pair_store_paths(pair_output_csv)[1].exists()
+        if pair_format == "compact"
+        else pair_output_csv.exists()
+    )
+    if not has_pairs:
+        logger.info("No existing peer pair table at %s", pair_output_csv)
+        return False
+
+    with get_run_metrics().stage("peer-similarity:compute"):
+        result = update_peer_similarity(
+            responses_excel,
+            index,
+            top_k=pair_top_k,
+            min_similarity=pair_min_similarity,
+        )
+    if result is None:
+        return False
+
+    per_student_df, new_pair_df, student_ids = result
+    with get_run_metrics().stage("peer-similarity:write"):
+        _append_pairs(pair_output_csv, new_pair_df, student_ids, pair_format)
+        per_student_df.to_csv(per_student_output_csv, index=False, encoding="utf-8-sig")
+    logger.info(
+        "Updated peer similarity (per student) at %s (rows=%d)",
+        per_student_output_csv,
+        len(per_student_df),
+    )
+    return True
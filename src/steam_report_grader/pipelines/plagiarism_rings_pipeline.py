@@ -0,0 +1,55 @@
+# src/steam_report_grader/pipelines/plagiarism_rings_pipeline.py
+from __future__ import annotations
+from pathlib import Path
+import logging
+
+from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
+from ..io.peer_pair_store import load_peer_pair_frame
+from ..features.plagiarism_rings import detect_plagiarism_rings, rings_to_student_frame
+from ..config import RING_MIN_SIMILARITY, RING_MIN_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def run_plagiarism_rings(
+    pair_csv: Path,
+    output_csv: Path,
+    log_path: Path,
+    min_similarity: float = RING_MIN_SIMILARITY,
+    min_ring_size: int = RING_MIN_SIZE,
+) -> None:
+    """
+    peer-similarity のペア表（CSV / コンパクト形式どちらでも可）から、
+    設問をまたいだ高類似度グラフの連結成分を盗用リング候補として抽出し、
+    1行 = 1受験者 のリング表 CSV を出力する。
+    """
+    setup_logging(log_path)
+    logger.info(
+        "Start plagiarism rings pipeline (min_similarity=%.2f, min_ring_size=%d)",
+        min_similarity,
+        min_ring_size,
+    )
+
+    with get_run_metrics().stage("plagiarism-rings:load"):
+        pair_df = load_peer_pair_frame(pair_csv, min_similarity=min_similarity)
+    logger.info("Loaded %d high-similarity pairs from %s", len(pair_df), pair_csv)
+
+    with get_run_metrics().stage("plagiarism-rings:compute"):
+        rings = detect_plagiarism_rings(
+            pair_df,
+            min_similarity=min_similarity,
+            min_ring_size=min_ring_size,
+        )
+        ring_df = rings_to_student_frame(rings)
+
+    output_csv = Path(output_csv)
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    with get_run_metrics().stage("plagiarism-rings:write"):
+        ring_df.to_csv(output_csv, index=False, encoding="utf-8-sig")
+    logger.info(
+        "Wrote plagiarism rings to %s (rings=%d, rows=%d)",
+        output_csv,
+        len(rings),
+        len(ring_df),
+    )
@@ -4,18 +4,83 @@ import logging
 from typing import List
 
 from ..utils.logging_utils import setup_logging
-from ..utils.id_generator import generate_student_id
+from ..utils.telemetry import get_run_metrics
 from ..io.docx_reader import extract_text_from_docx, extract_name
 from ..preprocess.text_cleaning import normalize_text
 from ..preprocess.question_parser import extract_answers
 from ..preprocess.anonymizer import build_anonymous_records
 from ..io.excel_writer import write_responses_excel, write_id_map_excel
+from ..io.student_id_registry import StudentIdRegistry, content_hash
+from ..utils.id_generator import parse_student_id
+
+ID_REGISTRY_FILENAME = "steam_exam_id_registry.json"
+
+logger = logging.getLogger(__name__)
+
+
+def extract_submission(path: Path) -> dict:
+    """
+    docx 1 ファイルから {file, name, answers, content_hash} を取り出す（失敗したら例外）。
+    """
+    raw_text = extract_text_from_docx(path)
+    norm_text = normalize_text(raw_text)
+    return {
+        "file": path.name,
+        "name": extract_name(norm_text),
+        "answers": extract_answers(norm_text),
+        "content_hash": content_hash(norm_text),
+    }
+
+
+def write_preprocess_outputs(
+    per_file_answers: List[dict],
+    output_excel_dir: Path,
+    renumber_ids: bool = False,
+) -> List[dict]:
+    """
+    extract_submission の結果に ID 台帳で student_id を振り、
+    回答Excel・IDマップ・ID 台帳を書く。student_id を付けて ID 順に並べたリストを返す。
+    """
+    output_excel_dir = Path(output_excel_dir)
+    responses_path = output_excel_dir / "steam_exam_responses.xlsx"
+    id_map_path = output_excel_dir / "steam_exam_id_map.xlsx"
+    registry_path = output_excel_dir / ID_REGISTRY_FILENAME
+
+    if renumber_ids:
+        logger.info("Renumbering student ids from S001 (ignoring %s)", registry_path)
+        registry = StudentIdRegistry(registry_path)
+    else:
+        registry = StudentIdRegistry.load(registry_path, id_map_path=id_map_path)
+    per_file_answers = [dict(item) for item in per_file_answers]
+    student_ids = registry.assign_all(
+        [(item["name"], item["file"], item["content_hash"]) for item in per_file_answers]
+    )
+    for item, student_id in zip(per_file_answers, student_ids):
+        item["student_id"] = student_id
+    # 回答Excel は ID 順（新しい答案は末尾に付く）
+    per_file_answers.sort(key=lambda item: parse_student_id(item["student_id"]) or 0)
+
+    records, id_map_rows = build_anonymous_records(per_file_answers)
+
+    write_responses_excel(responses_path, records)
+    write_id_map_excel(id_map_path, id_map_rows)
+    registry.save()
+
+    logger.info("Wrote responses to %s", responses_path)
+    logger.info("Wrote id map to %s", id_map_path)
+    logger.info(
+        "Assigned student ids: %d submission(s), %d new id(s)",
+        len(per_file_answers),
+        registry.n_new,
+    )
+    return per_file_answers
 
 
 def run_preprocess(
     docx_dir: Path,
     output_excel_dir: Path,
     log_path: Path,
+    renumber_ids: bool = False,
 ) -> None:
     """
     docx_dir 以下の .docx をすべて読み込み、
@@ -25,9 +90,13 @@ def run_preprocess(
     - 匿名化 Excel 出力
     - 対応表 Excel 出力
     まで行う。
+
+    student_id は output_excel_dir の steam_exam_id_registry.json（本名 + 答案の中身のハッシュ → ID）
+    で決めるので、docx が増えても既存の受験者の ID は変わらない（新しい答案にだけ続きの番号を振る）。
+    台帳が無ければ既存の steam_exam_id_map.xlsx から ID を引き継ぐ。
+    renumber_ids=True なら台帳を捨てて、ファイル名順に S001 から振り直す。
     """
     setup_logging(log_path)
-    logger = logging.getLogger(__name__)
 
     docx_dir = Path(docx_dir)
     output_excel_dir = Path(output_excel_dir)
@@ -40,34 +109,13 @@ def run_preprocess(
     logger.info("Found %d .docx files in %s", len(files), docx_dir)
 
     per_file_answers: List[dict] = []
-    for idx, path in enumerate(files, start=1):
-        logger.info("Processing file %d/%d: %s", idx, len(files), path.name)
-        try:
-            raw_text = extract_text_from_docx(path)
-            norm_text = normalize_text(raw_text)
-            name = extract_name(norm_text)
-            answers = extract_answers(norm_text)
-
-            student_id = generate_student_id(idx)
-            per_file_answers.append(
-                {
-                    "student_id": student_id,
-                    "file": path.name,
-                    "name": name,
-                    "answers": answers,
-                }
-            )
-        except Exception as e:
-            logger.exception("Failed to process %s: %s", path, e)
-
-    records, id_map_rows = build_anonymous_records(per_file_answers)
+    with get_run_metrics().stage("preprocess:load"):
+        for idx, path in enumerate(files, start=1):
+            logger.info("Processing file %d/%d: %s", idx, len(files), path.name)
+            try:
+                per_file_answers.append(extract_submission(path))
+            except Exception as e:
+                logger.exception("Failed to process %s: %s", path, e)
 
-    # 出力パス
-    responses_path = output_excel_dir / "steam_exam_responses.xlsx"
-    id_map_path = output_excel_dir / "steam_exam_id_map.xlsx"
-
-    write_responses_excel(responses_path, records)
-    write_id_map_excel(id_map_path, id_map_rows)
-
-    logger.info("Wrote responses to %s", responses_path)
-    logger.info("Wrote id map to %s", id_map_path)
+    with get_run_metrics().stage("preprocess:write"):
+        write_preprocess_outputs(per_file_answers, output_excel_dir, renumber_ids=renumber_ids)
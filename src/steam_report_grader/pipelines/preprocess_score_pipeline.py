@@ -0,0 +1,200 @@
+# src/steam_report_grader/pipelines/preprocess_score_pipeline.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
+from ..utils.llm_task_pool import ScoringTask, run_llm_task_stream
+from ..grading.rubric import load_all_rubrics
+from ..grading.absolute_scorer import AbsoluteScorer, ScoreResult
+from ..llm.ollama_pool import get_ollama_client
+from ..io.raw_response_store import RawResponseStore, raw_response_store_path_for
+from .preprocess_pipeline import extract_submission, write_preprocess_outputs
+from .scoring_pipeline import tasks_for_answers, score_result_to_row
+from ..config import (
+    QUESTION_COUNT,
+    SCORING_MAX_WORKERS,
+    SCORING_INCLUDE_RELATIVE_FEATURES,
+    STREAM_QUEUE_MAXSIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# キューの終わりの印
+_DONE = object()
+
+
+class _SubmissionProducer(threading.Thread):
+    """
+    docx をファイル名順に読み、読めた答案から順にキューへ入れるスレッド。
+    キューがいっぱい（採点が追いついていない）なら空くまで待つ。
+    読めた答案は submissions にも残す（最後に回答Excel を書くため）。
+    """
+
+    def __init__(self, files: List[Path], out: "queue.Queue[object]") -> None:
+        super().__init__(name="preprocess-producer", daemon=True)
+        self.files = files
+        self.out = out
+        self.submissions: List[dict] = []
+        self.error: Optional[BaseException] = None
+        self.parse_s = 0.0
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _put(self, item: object) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                self.out.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self) -> None:
+        try:
+            for idx, path in enumerate(self.files, start=1):
+                if self._stop_event.is_set():
+                    return
+                logger.info("Processing file %d/%d: %s", idx, len(self.files), path.name)
+                start = time.perf_counter()
+                try:
+                    submission = extract_submission(path)
+                except Exception as e:
+                    logger.exception("Failed to process %s: %s", path, e)
+                    continue
+                finally:
+                    self.parse_s += time.perf_counter() - start
+                self.submissions.append(submission)
+                if not self._put(submission):
+                    return
+        except BaseException as e:  # noqa: BLE001
+            self.error = e
+        finally:
+            self._put(_DONE)
+
+
+def _drain_tasks(
+    q: "queue.Queue[object]",
+    questions: List[str],
+    rubrics: Dict[str, object],
+) -> Iterator[ScoringTask]:
+    """
+    キューから答案を取り出しながら採点タスクにする。
+    student_id は最後に ID 台帳で決めるので、ここでは仮にファイル名を入れておく。
+    """
+    while True:
+        item = q.get()
+        if item is _DONE:
+            return
+        yield from tasks_for_answers(item["file"], item["answers"], questions, rubrics)
+
+
+def run_preprocess_and_score(
+    docx_dir: Path,
+    output_excel_dir: Path,
+    rubric_dir: Path,
+    output_path: Path,
+    log_path: Path,
+    max_workers: int = SCORING_MAX_WORKERS,
+    include_relative_features: bool = SCORING_INCLUDE_RELATIVE_FEATURES,
+    renumber_ids: bool = False,
+    queue_size: int = STREAM_QUEUE_MAXSIZE,
+) -> None:
+    """
+    preprocess と score を 1 回で流す。
+    docx を 1 つ読み終えるごとに、その答案を上限 queue_size 件のキュー経由で採点ワーカーに渡すので、
+    docx の読み取り（CPU）と LLM の採点（GPU）が重なる。
+
+    回答Excel・IDマップ・ID 台帳は、全部読み終えてから preprocess と同じ形で書く
+    （student_id も preprocess と同じく ID 台帳で決まる）。
+    採点中は仮にファイル名で持っておき、CSV を書く前に student_id に置き換える。
+    出力は preprocess → score を順に流したときと同じファイル。
+    """
+    setup_logging(log_path)
+
+    docx_dir = Path(docx_dir)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    files = sorted(docx_dir.glob("*.docx"))
+    if not files:
+        logger.warning("No .docx files found in %s", docx_dir)
+        return
+    logger.info(
+        "Start preprocess+score (files=%d, workers=%d, queue_size=%d)",
+        len(files),
+        max_workers,
+        queue_size,
+    )
+
+    questions = [f"Q{q}" for q in range(1, QUESTION_COUNT + 1)]
+    with get_run_metrics().stage("preprocess-score:load"):
+        rubrics = load_all_rubrics(Path(rubric_dir), questions)
+    scorer = AbsoluteScorer(
+        get_ollama_client(),
+        include_relative_features=include_relative_features,
+    )
+
+    q: "queue.Queue[object]" = queue.Queue(maxsize=max(1, queue_size))
+    producer = _SubmissionProducer(files, q)
+    producer.start()
+
+    results: Dict[Tuple[str, str], ScoreResult] = {}
+    try:
+        for task, res in run_llm_task_stream(
+            _drain_tasks(q, questions, rubrics),
+            lambda task: scorer.score_answer(task.student_id, task.rubric, task.answer_text),
+            max_workers=max_workers,
+            tag="score",
+        ):
+            results[(task.student_id, task.question_label)] = res
+    finally:
+        producer.stop()
+        producer.join()
+
+    if producer.error is not None:
+        raise producer.error
+    logger.info(
+        "Parsed %d/%d file(s) in %.1fs while scoring",
+        len(producer.submissions),
+        len(files),
+        producer.parse_s,
+    )
+    if not producer.submissions:
+        logger.warning("No readable submissions in %s", docx_dir)
+        return
+
+    with get_run_metrics().stage("preprocess-score:write"):
+        submissions = write_preprocess_outputs(
+            producer.submissions, output_excel_dir, renumber_ids=renumber_ids
+        )
+
+    # 仮のファイル名 → student_id。回答Excel と同じ受験者順 → 設問順で並べる
+    rows = []
+    with RawResponseStore(raw_response_store_path_for(output_path)) as raw_store:
+        for item in submissions:
+            for q_label in questions:
+                res = results.get((item["file"], q_label))
+                if res is None:
+                    continue
+                res.student_id = item["student_id"]
+                rows.append(score_result_to_row(res, include_relative_features, raw_store))
+
+    if not rows:
+        logger.warning("No scores generated. Check logs.")
+        return
+
+    out_df = pd.DataFrame(rows)
+    with get_run_metrics().stage("preprocess-score:write"):
+        out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
+    logger.info("Wrote scores to %s (rows=%d)", output_path, len(out_df))
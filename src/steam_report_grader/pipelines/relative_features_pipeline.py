@@ -1,10 +1,18 @@
 import pandas as pd
 import logging
 from pathlib import Path
+from typing import Any, Dict, List
 
 from ..llm.ollama_pool import get_ollama_client
 from ..utils.logging_utils import setup_logging
+from ..utils.journal import TaskJournal
+from ..utils.llm_task_pool import ScoringTask, run_llm_tasks
+from ..utils.telemetry import get_run_metrics
 from ..io.responses_loader import load_responses_excel, detect_question_columns
+from ..config import (
+    LLM_RELATIVE_FEATURES_MAX_TOKENS,
+    RELATIVE_FEATURES_MAX_WORKERS,
+)
 import ast
 
 def safe_parse_json(text: str) -> dict:
@@ -14,6 +22,92 @@ def safe_parse_json(text: str) -> dict:
         return {}
 
 
+def journal_path_for(output_path: Path) -> Path:
+    """
+    relative_features.csv → relative_features.journal.jsonl
+    """
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + ".journal.jsonl")
+
+
+def _build_prompt(answer: str) -> str:
+    return f"""
+            以下の学生の回答について、要約と3つの重要な引用をJSON形式で出力してください。
+
+            回答: {answer}
+
+            出力形式:
+            {{
+              'summary': '要約文 (日本語)',
+              'quotes': ['引用1', '引用2', '引用3']
+            }}
+            """
+
+
+# ジャーナルの status。STATUS_OK 以外は --resume でやり直す
+STATUS_OK = "ok"
+STATUS_PARSE_ERROR = "parse_error"
+
+
+def _journal_record_done(rec: Dict[str, Any]) -> bool:
+    """
+    ジャーナルの 1 件が「済み」か。status が無い古いジャーナルは、要約が空なら失敗扱い。
+    """
+    status = rec.get("status")
+    if status is None:
+        return bool(str(rec.get("summary", "") or "").strip())
+    return status == STATUS_OK
+
+
+def _extract_one_task(client, task: ScoringTask, max_tokens: int | None) -> Dict[str, str]:
+    """
+    1つの (受験者, 設問, 回答) から要約と引用3つを取り出す。
+    LLM の出力を読めなかった（要約が取れなかった）ときは status=parse_error にする。
+    """
+    llm_text = client.generate(
+        _build_prompt(task.answer_text),
+        temperature=0.0,
+        max_tokens=max_tokens,
+    )
+    clean_text = llm_text.strip().replace("```json", "").replace("```", "").strip()
+    data = safe_parse_json(clean_text)
+    if not isinstance(data, dict):
+        data = {}
+
+    summary = str(data.get("summary", "") or "")
+    quotes = data.get("quotes", []) or []
+    if not isinstance(quotes, (list, tuple)):
+        quotes = [quotes]
+    quotes = [str(q) for q in quotes] + [""] * 3
+    q1, q2, q3 = (quotes + ["", "", ""])[:3]
+    status = STATUS_OK if summary.strip() else STATUS_PARSE_ERROR
+    return {"summary": summary, "quote1": q1, "quote2": q2, "quote3": q3, "status": status}
+
+
+def _relative_fields_from_scores(df_scores: pd.DataFrame) -> Dict[tuple, Dict[str, str]]:
+    """
+    absolute_scores.csv に採点時の relative_summary / relative_quote1〜3 があれば
+    (student_id, question) → record の dict にして返す。要約が空の行は含めない。
+    """
+    if "relative_summary" not in df_scores.columns:
+        return {}
+
+    cols = ["relative_summary", "relative_quote1", "relative_quote2", "relative_quote3"]
+    sub = df_scores.reindex(columns=["student_id", "question"] + cols)
+    sub[cols] = sub[cols].fillna("").astype(str)
+    sub = sub[sub["relative_summary"].str.strip() != ""]
+
+    return {
+        (str(sid), str(q)): {
+            "summary": summary,
+            "quote1": q1,
+            "quote2": q2,
+            "quote3": q3,
+        }
+        for sid, q, summary, q1, q2, q3 in sub.itertuples(index=False, name=None)
+    }
+
+
 def run_relative_features(
     responses_excel_path: Path,
     absolute_scores_csv: Path,
@@ -21,75 +115,158 @@ def run_relative_features(
     model_name: str,
     llm_provider: str,
     log_path: Path,
+    max_workers: int = RELATIVE_FEATURES_MAX_WORKERS,
+    max_tokens: int | None = LLM_RELATIVE_FEATURES_MAX_TOKENS,
+    resume: bool = False,
 ):
+    """
+    各 (受験者, 設問) の回答から要約と引用3つを LLM で抽出して CSV にする。
+
+    - score と同じタスク単位（ScoringTask）で、2GPU プールに max_workers 本並列で投げる
+    - 1 件終わるごとに {output}.journal.jsonl へ追記する
+    - resume=True ならジャーナルに残っている (受験者, 設問) は飛ばして続きからやる
+    - absolute_scores.csv に relative_summary 列がある（score --with-relative-features）なら
+      そこから埋まる行は LLM を呼ばずにそのまま使う
+    """
     setup_logging(log_path)
     logger = logging.getLogger(__name__)
     logger.info("Start relative features pipeline")
 
-    df_resp = load_responses_excel(responses_excel_path)
-    questions = detect_question_columns(df_resp, prefix="Q")
-    df_scores = pd.read_csv(absolute_scores_csv)
+    output_path = Path(output_path)
+    with get_run_metrics().stage("relative-features:load"):
+        df_resp = load_responses_excel(responses_excel_path)
+        questions = detect_question_columns(df_resp, prefix="Q")
+        df_scores = pd.read_csv(absolute_scores_csv)
     max_scores = df_scores.groupby("question")["score"].max().to_dict()
 
+    # (student_id, question) → score の索引を 1 回だけ作る
+    # （ループ内で毎回 boolean mask を取ると受験者数×設問数の2乗になる）
+    score_index = (
+        df_scores.assign(
+            student_id=df_scores["student_id"].astype(str),
+            question=df_scores["question"].astype(str),
+        )
+        .drop_duplicates(["student_id", "question"], keep="first")
+        .set_index(["student_id", "question"])["score"]
+        .to_dict()
+    )
+
+    # 採点時に一緒に出させた要約・引用（あれば）
+    from_scores = _relative_fields_from_scores(df_scores)
+    if from_scores:
+        logger.info(
+            "Found relative-features fields in %s for %d answers",
+            absolute_scores_csv,
+            len(from_scores),
+        )
+
     # 2GPU対応の Ollama クライアントを取得（model_name は今は使わず共通設定）
     client = get_ollama_client()
     logger.info(
-        "Using relative-features LLM via 2-GPU pool (requested model_name=%s)",
+        "Using relative-features LLM via 2-GPU pool "
+        "(requested model_name=%s, max_workers=%s, max_tokens=%s)",
         model_name,
+        max_workers,
+        max_tokens,
     )
-    records = []
-
-    # 進捗管理用のざっくり総数（スキップ分は含まれるので目安）
-    total = len(df_resp) * len(questions)
-    done = 0
 
+    # --- まずタスクを全部作る（採点済みの回答だけ） ---
+    tasks: List[ScoringTask] = []
     for _, row in df_resp.iterrows():
         sid = str(row["student_id"])
         for q in questions:
             ans = str(row.get(q, "") or "").strip()
             if not ans:
                 continue
-            score_row = df_scores[(df_scores.student_id == sid) & (df_scores.question == q)]
-            if score_row.empty:
+            if (sid, q) not in score_index:
                 continue
-            score = float(score_row.iloc[0]["score"])
-            max_sc = max_scores.get(q, 0)
-            normalized = (score / max_sc) if max_sc > 0 else 0.0
+            tasks.append(ScoringTask(student_id=sid, question_label=q, answer_text=ans))
 
-            prompt = f"""
-            以下の学生の回答について、要約と3つの重要な引用をJSON形式で出力してください。
+    # --- ジャーナル（途中結果）の扱い ---
+    journal = TaskJournal(journal_path_for(output_path))
+    if resume:
+        # 出力を読めなかった分（status=parse_error）は済みにせず、もう一度 LLM に投げる
+        journaled = journal.load()
+        done = {k: rec for k, rec in journaled.items() if _journal_record_done(rec)}
+        if len(done) < len(journaled):
+            logger.info(
+                "Retrying %d journaled record(s) whose LLM output could not be parsed",
+                len(journaled) - len(done),
+            )
+    else:
+        journal.reset()
+        done = {}
 
-            回答: {ans}
+    for key, rec in from_scores.items():
+        done.setdefault(key, rec)
 
-            出力形式:
-            {{
-              'summary': '要約文 (日本語)',
-              'quotes': ['引用1', '引用2', '引用3']
-            }}
-            """
-            llm_text = client.generate(prompt, temperature=0.0)
-            clean_text = llm_text.strip().replace("```json", "").replace("```", "").strip()
-            data = safe_parse_json(clean_text)
-
-            summary = data.get("summary", "")
-            quotes = data.get("quotes", []) or []
-            quotes = [str(q) for q in quotes] + [""] * 3
-            q1, q2, q3 = (quotes + ["", "", ""])[:3]
-
-            records.append({
-                "student_id": sid,
-                "question": q,
-                "normalized_score": normalized,
-                "summary": summary,
-                "quote1": q1,
-                "quote2": q2,
-                "quote3": q3,
-            })
+    pending = [t for t in tasks if (t.student_id, t.question_label) not in done]
+    # ジャーナル / absolute_scores.csv で済んだ分はキャッシュヒットとして数える
+    get_run_metrics().record_cache("relative_features", hit=True, n=len(tasks) - len(pending))
+    get_run_metrics().record_cache("relative_features", hit=False, n=len(pending))
+    logger.info(
+        "relative-features tasks: total=%d, already done=%d, pending=%d",
+        len(tasks),
+        len(tasks) - len(pending),
+        len(pending),
+    )
+
+    with journal:
+        for task, extracted in run_llm_tasks(
+            pending,
+            lambda task: _extract_one_task(client, task, max_tokens),
+            max_workers=max_workers,
+            tag="relative-features",
+        ):
+            record: Dict[str, Any] = {
+                "student_id": task.student_id,
+                "question": task.question_label,
+                **extracted,
+            }
+            journal.append(record)
+            done[journal.key_of(record)] = record
+
+    # --- タスク順（受験者→設問）に並べ直して CSV に ---
+    records = []
+    for task in tasks:
+        rec = done.get((task.student_id, task.question_label))
+        if rec is None:
+            continue
+        score = float(score_index[(task.student_id, task.question_label)])
+        max_sc = max_scores.get(task.question_label, 0)
+        normalized = (score / max_sc) if max_sc > 0 else 0.0
+        records.append({
+            "student_id": task.student_id,
+            "question": task.question_label,
+            "normalized_score": normalized,
+            "summary": rec.get("summary", ""),
+            "quote1": rec.get("quote1", ""),
+            "quote2": rec.get("quote2", ""),
+            "quote3": rec.get("quote3", ""),
+        })
+
+    missing = len(tasks) - len(records)
+    if missing:
+        logger.warning(
+            "%d relative-features tasks failed; rerun with --resume to retry them.",
+            missing,
+        )
+    parse_errors = sum(
+        1 for task in tasks
+        if done.get((task.student_id, task.question_label), {}).get("status") == STATUS_PARSE_ERROR
+    )
+    if parse_errors:
+        logger.warning(
+            "%d relative-features outputs could not be parsed (written with an empty summary); "
+            "rerun with --resume to retry them.",
+            parse_errors,
+        )
 
     if records:
         out_df = pd.DataFrame(records)
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
+        with get_run_metrics().stage("relative-features:write"):
+            out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
         logger.info("Wrote relative features to %s (%d rows)", output_path, len(out_df))
     else:
         logger.warning("No features generated; check inputs.")
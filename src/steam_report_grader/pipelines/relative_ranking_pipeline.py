@@ -1,9 +1,18 @@
+import numpy as np
 import pandas as pd
 import logging
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
+from ..features.cosine_similarity import (
+    DENSE_VERIFY_MAX_N,
+    dense_mean_cosine_similarity,
+    mean_cosine_similarity,
+    top_k_cosine_similarity,
+)
+from ..config import RELATIVE_RANKING_TOP_K
 
 
 def run_relative_ranking(
@@ -11,13 +20,23 @@ def run_relative_ranking(
     absolute_scores_csv: Path,
     ranking_csv: Path,
     log_path: Path,
+    top_k: int = RELATIVE_RANKING_TOP_K,
+    verify_dense: bool = False,
 ):
+    """
+    圧縮特徴（要約＋引用）の TF-IDF コサイン類似度から相対スコアを出し、ranking.csv に追加する。
+
+    - 「他の全受験者との類似度の平均」は列和ベクトルとの内積で O(N·nnz) で求める（N×N は作らない）
+    - top_k > 0 なら、似ている受験者の上位 k 人も relative_top_peers 列に出す
+    - verify_dense=True なら、小さい N（DENSE_VERIFY_MAX_N 以下）で従来の密行列計算と突き合わせる
+    """
     setup_logging(log_path)
     logger = logging.getLogger(__name__)
     logger.info("Start relative ranking pipeline")
 
     # 圧縮特徴データ読み込み
-    df_feat = pd.read_csv(features_csv)
+    with get_run_metrics().stage("relative-ranking:load"):
+        df_feat = pd.read_csv(features_csv)
 
     # summary + quote を1つのテキストに統合
     df_feat["text"] = df_feat["summary"].fillna("") + " " + df_feat["quote1"].fillna("") + " " \
@@ -30,16 +49,25 @@ def run_relative_ranking(
     students = list(student_texts.keys())
     corpus = [student_texts[sid] for sid in students]
 
-    # TF-IDFベクトル化
+    # TF-IDFベクトル化（行は L2 正規化済みなので内積 = コサイン類似度）
     tfidf = TfidfVectorizer().fit_transform(corpus)
-    sims = (tfidf * tfidf.T).toarray()  # コサイン類似度行列
 
     # 類似度平均を計算（自己類似度を除く）
-    mean_cosine = {}
-    for i, sid in enumerate(students):
-        sim_sum = sims[i].sum() - sims[i][i]
-        count = len(students) - 1
-        mean_cosine[sid] = (sim_sum / count) if count > 0 else 0.0
+    mean_sims = mean_cosine_similarity(tfidf)
+    mean_cosine = dict(zip(students, mean_sims))
+
+    if verify_dense:
+        if len(students) > DENSE_VERIFY_MAX_N:
+            logger.warning(
+                "Skip dense verification: %d students > %d",
+                len(students),
+                DENSE_VERIFY_MAX_N,
+            )
+        else:
+            diff = float(np.max(np.abs(dense_mean_cosine_similarity(tfidf) - mean_sims), initial=0.0))
+            logger.info("Dense verification of mean cosine: max abs diff = %.3g", diff)
+            if diff > 1e-9:
+                raise RuntimeError(f"Mean cosine mismatch against dense computation: {diff}")
 
     # 相対スコア計算
     records = []
@@ -52,8 +80,17 @@ def run_relative_ranking(
     df_rel = pd.DataFrame(records, columns=["student_id", "relative_score"])
     df_rel["relative_rank"] = df_rel["relative_score"].rank(method="dense", ascending=False).astype(int)
 
+    if top_k > 0:
+        top_idx, top_sims = top_k_cosine_similarity(tfidf, top_k)
+        df_rel["relative_top_peers"] = [
+            ";".join(f"{students[j]}:{s:.3f}" for j, s in zip(idx_row, sim_row))
+            for idx_row, sim_row in zip(top_idx, top_sims)
+        ]
+        logger.info("Computed top-%d similar peers for %d students", top_k, len(students))
+
     # 既存のranking.csvとマージ
-    df_rank = pd.read_csv(ranking_csv)
-    df_rank = df_rank.merge(df_rel, on="student_id", how="left")
-    df_rank.to_csv(ranking_csv, index=False, encoding="utf-8-sig")
+    with get_run_metrics().stage("relative-ranking:write"):
+        df_rank = pd.read_csv(ranking_csv)
+        df_rank = df_rank.merge(df_rel, on="student_id", how="left")
+        df_rank.to_csv(ranking_csv, index=False, encoding="utf-8-sig")
     logger.info("Merged relative scores into %s", ranking_csv)
@@ -3,39 +3,33 @@ from __future__ import annotations
 
 from pathlib import Path
 import logging
-from typing import List, Dict, Any
-from dataclasses import dataclass
+from typing import Iterator, List, Dict, Any, Optional
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..grading.rubric import load_all_rubrics
 from ..grading.absolute_scorer import AbsoluteScorer, ScoreResult
-from ..io.responses_loader import load_responses_and_questions
+from ..io.responses_loader import read_question_columns, iter_response_rows
+from ..io.raw_response_store import RawResponseStore, raw_response_store_path_for
 from ..config import (
     DEFAULT_SCORING_MODEL,
     LLM_SCORING_TIMEOUT,
     SCORING_MAX_WORKERS,
+    SCORING_INCLUDE_RELATIVE_FEATURES,
     OLLAMA_DEFAULT_MODEL,
     OLLAMA_DEFAULT_TEMPERATURE,
     OLLAMA_DEFAULT_SEED,
 )
 
 from ..llm.ollama_pool import get_ollama_client
+from ..utils.llm_task_pool import ScoringTask, run_llm_tasks
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class ScoringTask:
-    student_id: str
-    question_label: str
-    answer_text: str
-    rubric: Any
-
-
 def _score_one_task(scorer: AbsoluteScorer, task: ScoringTask) -> ScoreResult:
     """
     1つの (受験者, 設問, 回答) を採点して ScoreResult を返すヘルパー。
@@ -43,6 +37,109 @@ def _score_one_task(scorer: AbsoluteScorer, task: ScoringTask) -> ScoreResult:
     return scorer.score_answer(task.student_id, task.rubric, task.answer_text)
 
 
+def tasks_for_answers(
+    student_id: str,
+    answers: Dict[str, Any],
+    questions: List[str],
+    rubrics: Dict[str, Any],
+) -> List[ScoringTask]:
+    """
+    1 受験者ぶんの回答（設問 → 回答）から、空欄以外の設問の採点タスクを作る。
+    """
+    tasks: List[ScoringTask] = []
+    for q_label in questions:
+        answer = str(answers.get(q_label, "") or "").strip()
+        if not answer:
+            # 空欄は普通にスキップ。warning にするか info にするかは好み
+            logger.debug("Empty answer: %s %s", student_id, q_label)
+            continue
+
+        rubric = rubrics[q_label]
+        tasks.append(
+            ScoringTask(
+                student_id=student_id,
+                question_label=q_label,
+                answer_text=answer,
+                rubric=rubric,
+            )
+        )
+    return tasks
+
+
+def iter_scoring_tasks(
+    responses_excel_path: Path,
+    questions: List[str],
+    rubrics: Dict[str, Any],
+) -> Iterator[ScoringTask]:
+    """
+    回答 Excel を 1 受験者ずつ読みながら、空欄以外の (受験者, 設問) の採点タスクを作る。
+    回答シートの DataFrame は作らない。
+    """
+    for student_id, answers in iter_response_rows(responses_excel_path, questions):
+        yield from tasks_for_answers(student_id, answers, questions, rubrics)
+
+
+def score_result_to_row(
+    r: ScoreResult,
+    include_relative_features: bool,
+    raw_store: Optional[RawResponseStore] = None,
+) -> Dict[str, Any]:
+    """
+    ScoreResult を absolute_scores.csv の 1 行（dict）にする。
+
+    raw_store を渡すと、LLM の生応答は raw_store に入れて raw_response_hash 列にハッシュだけを書く
+    （渡さなければ従来どおり raw_response 列に本文を書く）。
+    reason / brief_explanation / detailed_explanation は brief / detailed と同じ内容なので書かない。
+    読むときに load_absolute_scores(..., legacy_columns=True) で作れる。
+    """
+    # --- 簡易説明（brief） ---
+    # 原則: summary_bullets をつないだもの
+    if r.summary_bullets:
+        brief_text = " / ".join(r.summary_bullets)
+    elif r.detailed_explanation:
+        # bullet がないときだけ詳細文を流用
+        brief_text = r.detailed_explanation
+    else:
+        brief_text = ""
+
+    # --- 詳細説明（detailed） ---
+    detailed_text = r.detailed_explanation or ""
+
+    base: Dict[str, Any] = {
+        "student_id": r.student_id,
+        "question": r.question_label,
+        "score": r.score,
+
+        # === 正式名称 ===
+        "brief": brief_text,
+        "detailed": detailed_text,
+
+        # 箇条書きの元データ
+        "summary_bullets": " • ".join(r.summary_bullets) if r.summary_bullets else "",
+
+        # evidence は JSON 文字列で保存
+        "evidence": json.dumps(r.evidence, ensure_ascii=False),
+    }
+    if raw_store is not None:
+        base["raw_response_hash"] = raw_store.put(r.raw_response)
+    else:
+        base["raw_response"] = r.raw_response
+
+    # relative-features 用の要約・引用（同じ応答で出させたときだけ）
+    if include_relative_features:
+        quotes = (list(r.relative_quotes) + ["", "", ""])[:3]
+        base["relative_summary"] = r.relative_summary
+        base["relative_quote1"] = quotes[0]
+        base["relative_quote2"] = quotes[1]
+        base["relative_quote3"] = quotes[2]
+
+    # subscores 展開（今の実装に合わせて）
+    for k, v in r.subscores.items():
+        base[f"sub_{k}"] = v
+
+    return base
+
+
 def run_scoring(
     responses_excel_path: Path,
     rubric_dir: Path,
@@ -52,10 +149,14 @@ def run_scoring(
     llm_provider: str = "ollama",
     max_workers: int = SCORING_MAX_WORKERS,
     ollama_timeout: int | None = int(LLM_SCORING_TIMEOUT),
+    include_relative_features: bool = SCORING_INCLUDE_RELATIVE_FEATURES,
 ) -> None:
     """
     匿名化された回答 Excel を読み込み、Q1〜Q? を絶対評価。
     結果を CSV で保存する。
+
+    include_relative_features=True なら relative_summary / relative_quote1〜3 列も出力し、
+    relative-features はこの CSV から LLM なしで作れるようになる。
     """
     setup_logging(log_path)
     logger.info("Start scoring pipeline")
@@ -72,8 +173,10 @@ def run_scoring(
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    df, questions = load_responses_and_questions(responses_excel_path)
-    rubrics = load_all_rubrics(rubric_dir, questions)
+    with get_run_metrics().stage("score:load"):
+        questions = read_question_columns(responses_excel_path)
+        logger.info("Detected questions: %s", questions)
+        rubrics = load_all_rubrics(rubric_dir, questions)
 
     # --- LLM クライアント & scorer の生成（2GPU 対応プール） ---
     client = get_ollama_client()
@@ -84,125 +187,47 @@ def run_scoring(
         OLLAMA_DEFAULT_SEED,
         LLM_SCORING_TIMEOUT,
     )
-    scorer = AbsoluteScorer(client)
+    scorer = AbsoluteScorer(
+        client,
+        include_relative_features=include_relative_features,
+    )
+    if include_relative_features:
+        logger.info("Scoring also extracts relative-features fields (summary / quotes)")
 
     results: List[ScoreResult] = []
 
     # --- まずタスクを全部作る ---
-    tasks: List[ScoringTask] = []
-    for _, row in df.iterrows():
-        student_id = str(row["student_id"])
-        for q_label in questions:
-            answer = str(row.get(q_label, "") or "").strip()
-            if not answer:
-                # 空欄は普通にスキップ。warning にするか info にするかは好み
-                logger.debug("Empty answer: %s %s", student_id, q_label)
-                continue
-
-            rubric = rubrics[q_label]
-            tasks.append(
-                ScoringTask(
-                    student_id=student_id,
-                    question_label=q_label,
-                    answer_text=answer,
-                    rubric=rubric,
-                )
-            )
+    tasks = list(iter_scoring_tasks(responses_excel_path, questions, rubrics))
 
     total_tasks = len(tasks)
     if total_tasks == 0:
         logger.warning("No scoring tasks generated. Check input.")
         return
 
-    logger.info("Total scoring tasks: %d", total_tasks)
-    logger.info("Using %d workers", max_workers)
-
     # --- 並列で採点 ---
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_task = {
-            executor.submit(_score_one_task, scorer, task): task
-            for task in tasks
-        }
-
-        for i, future in enumerate(as_completed(future_to_task), start=1):
-            task = future_to_task[future]
-            try:
-                res = future.result()
-                results.append(res)
-            except Exception as e:  # noqa: BLE001
-                logger.exception(
-                    "Failed to score %s %s: %s",
-                    task.student_id,
-                    task.question_label,
-                    e,
-                )
-
-            # 進捗ログ（残り件数込み）
-            remaining = total_tasks - i
-            logger.info(
-                "[score] %d/%d (remaining=%d) sid=%s q=%s",
-                i,
-                total_tasks,
-                remaining,
-                task.student_id,
-                task.question_label,
-            )
-
-            logger.debug(
-                "[score] worker started: sid=%s q=%s",
-                task.student_id,
-                task.question_label,
-            )
-    # 結果を DataFrame に変換
-    rows: List[Dict[str, Any]] = []
-    for r in results:
-        # --- 簡易説明（brief） ---
-        # 原則: summary_bullets をつないだもの
-        if r.summary_bullets:
-            brief_text = " / ".join(r.summary_bullets)
-        elif r.detailed_explanation:
-            # bullet がないときだけ詳細文を流用
-            brief_text = r.detailed_explanation
-        else:
-            brief_text = ""
-
-        # --- 詳細説明（detailed） ---
-        detailed_text = r.detailed_explanation or ""
-
-        base: Dict[str, Any] = {
-            "student_id": r.student_id,
-            "question": r.question_label,
-            "score": r.score,
-
-            # === 正式名称 ===
-            "brief": brief_text,
-            "detailed": detailed_text,
-
-            # 箇条書きの元データ
-            "summary_bullets": " • ".join(r.summary_bullets) if r.summary_bullets else "",
-
-            # === 互換カラム（レガシー） ===
-            # これらは読み取り専用扱いにしていく
-            "reason": brief_text,                 # 簡易コメントとして互換
-            "brief_explanation": brief_text,
-            "detailed_explanation": detailed_text,
-
-            # evidence は JSON 文字列で保存
-            "evidence": json.dumps(r.evidence, ensure_ascii=False),
-
-            "raw_response": r.raw_response,
-        }
-
-        # subscores 展開（今の実装に合わせて）
-        for k, v in r.subscores.items():
-            base[f"sub_{k}"] = v
-
-        rows.append(base)
+    for _, res in run_llm_tasks(
+        tasks,
+        lambda task: _score_one_task(scorer, task),
+        max_workers=max_workers,
+        tag="score",
+    ):
+        results.append(res)
+
+    # 結果を DataFrame に変換（生応答は CSV の横の圧縮ストアへ）
+    with RawResponseStore(raw_response_store_path_for(output_path)) as raw_store:
+        rows = [score_result_to_row(r, include_relative_features, raw_store) for r in results]
+        logger.info(
+            "Stored raw responses in %s (%d new of %d)",
+            raw_store.path,
+            raw_store.n_new,
+            raw_store.n_put,
+        )
 
     if not rows:
         logger.warning("No scores generated. Check logs.")
         return
 
     out_df = pd.DataFrame(rows)
-    out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
+    with get_run_metrics().stage("score:write"):
+        out_df.to_csv(output_path, index=False, encoding="utf-8-sig")
     logger.info("Wrote scores to %s", output_path)
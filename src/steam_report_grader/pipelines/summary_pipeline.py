@@ -4,6 +4,7 @@ from pathlib import Path
 import logging
 
 from ..utils.logging_utils import setup_logging
+from ..utils.telemetry import get_run_metrics
 from ..features.aggregate_scores import (
     load_absolute_scores,
     aggregate_per_student,
@@ -26,7 +27,8 @@ def run_summary(
     setup_logging(log_path)
     logger.info("Start summary pipeline")
 
-    scores_df = load_absolute_scores(absolute_scores_csv)
+    with get_run_metrics().stage("summary:load"):
+        scores_df = load_absolute_scores(absolute_scores_csv)
     logger.info("Loaded absolute scores: %d rows", len(scores_df))
 
     summary_df = aggregate_per_student(scores_df)
@@ -34,10 +36,11 @@ def run_summary(
 
     summary_with_names_df = attach_real_names(summary_df, id_map_excel)
 
-    write_scores_summary_excel(
-        path=output_excel,
-        summary_with_names_df=summary_with_names_df,
-        raw_scores_df=scores_df,
-    )
+    with get_run_metrics().stage("summary:write"):
+        write_scores_summary_excel(
+            path=output_excel,
+            summary_with_names_df=summary_with_names_df,
+            raw_scores_df=scores_df,
+        )
 
     logger.info("Wrote summary excel to %s", output_excel)
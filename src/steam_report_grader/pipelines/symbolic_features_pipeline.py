@@ -4,9 +4,20 @@ from pathlib import Path
 import logging
 
 from ..utils.logging_utils import setup_logging
-from ..features.symbolic_features import calculate_symbolic_features
+from ..utils.telemetry import get_run_metrics
+from ..features.symbolic_features import (
+    extract_symbolic_features_frame,
+    symbolic_features_for_question,
+    SYMBOLIC_COMPONENT_COLUMNS,
+)
+from ..io.responses_loader import (
+    read_question_columns,
+    iter_responses_chunks,
+    melt_responses,
+)
+from ..utils.parallel import map_per_question
+from ..config import FEATURE_JOBS
 import pandas as pd
-from ..io.responses_loader import load_responses_and_questions
 
 logger = logging.getLogger(__name__)
 
@@ -15,46 +26,47 @@ def run_symbolic_features(
     responses_excel: Path,
     output_csv: Path,
     log_path: Path,
+    jobs: int = FEATURE_JOBS,
 ) -> None:
     """
     匿名回答Excelから、記号的特徴量（太字頻度、見出し、箇条書き、接続詞）を計算し、
     出力するCSVを作成する。
+    symbolic_ai_score に加えて、各カウント（bold_count など）も列として出す。
     """
     setup_logging(log_path)
-    logger.info("Start symbolic features pipeline")
+    logger.info("Start symbolic features pipeline (jobs=%s)", jobs)
 
     responses_excel = Path(responses_excel)
     output_csv = Path(output_csv)
 
-    responses_df, questions = load_responses_and_questions(responses_excel)
+    # 回答シートはチャンクごとに縦持ち (student_id, question, answer) にしてつなぐ
+    # （横持ちの DataFrame を全員ぶん作らない）。列単位でまとめて計算し、
+    # jobs > 1 なら設問ごとにプロセスへ振り分ける
+    with get_run_metrics().stage("symbolic-features:load"):
+        questions = read_question_columns(responses_excel)
+        parts = [melt_responses(chunk, questions) for chunk in iter_responses_chunks(responses_excel)]
+    if not parts:
+        logger.warning("No responses found in %s", responses_excel)
+        return
+    long_df = pd.concat(parts, ignore_index=True)
     logger.info(
-        "Loaded responses for symbolic feature extraction: %d rows",
-        len(responses_df),
+        "Loaded responses for symbolic feature extraction: %d answers (questions=%s)",
+        len(long_df),
+        questions,
     )
+    tasks = [(q, sub) for q, sub in long_df.groupby("question", sort=False)]
+    with get_run_metrics().stage("symbolic-features:compute"):
+        frames = map_per_question(symbolic_features_for_question, tasks, jobs=jobs)
+    if frames:
+        features_df = pd.concat(frames).sort_index()
+    else:
+        features_df = extract_symbolic_features_frame(long_df, text_col="answer")
 
-    result_rows = []
-
-
-    for _, row in responses_df.iterrows():
-        student_id = str(row["student_id"])
-
-        for q in questions:
-            answer_text = str(row.get(q, "") or "").strip()
-
-            if not answer_text:
-                continue
-
-            symbolic_score = calculate_symbolic_features(answer_text)
-
-            result_rows.append(
-                {
-                    "student_id": student_id,
-                    "question": q,
-                    "symbolic_ai_score": symbolic_score,
-                    "answer_text": answer_text,
-                }
-            )
-
-    result_df = pd.DataFrame(result_rows)
-    result_df.to_csv(output_csv, index=False, encoding="utf-8-sig")
+    result_df = features_df.rename(columns={"answer": "answer_text"})
+    result_df = result_df[
+        ["student_id", "question", "symbolic_ai_score", "answer_text"]
+        + SYMBOLIC_COMPONENT_COLUMNS
+    ]
+    with get_run_metrics().stage("symbolic-features:write"):
+        result_df.to_csv(output_csv, index=False, encoding="utf-8-sig")
     logger.info("Wrote symbolic features to %s (rows=%d)", output_csv, len(result_df))
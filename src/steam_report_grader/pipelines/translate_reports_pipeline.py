@@ -2,9 +2,8 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
-import json
 import logging
 from textwrap import dedent
 
@@ -12,14 +11,22 @@ import pandas as pd
 
 from ..utils.logging_utils import setup_logging
 from ..llm.ollama_pool import get_ollama_client
+from ..io.excel_writer import write_excel_streaming
+from ..io.translation_memory import TranslationMemory
+from ..utils.telemetry import get_run_metrics
 from ..config import (
+    AI_SUSPECT_THRESHOLD,
     LLM_TRANSLATION_TIMEOUT,
     LLM_TRANSLATION_MAX_TOKENS,
     OLLAMA_DEFAULT_MODEL,
+    TRANSLATION_MEMORY_PATH,
 )
 
 logger = logging.getLogger(__name__)
 
+# 翻訳プロンプトを変えたら上げる（翻訳メモリの prompt_version 列に入る）
+TRANSLATION_PROMPT_VERSION = "v1"
+
 
 # どの Excel / シート / 列を翻訳するかの定義
 TRANSLATION_TARGETS: Dict[str, Dict[str, List[str]]] = {
@@ -120,61 +127,106 @@ def _translate_dataframe(
     return df
 
 
-def _parse_json_like(text: str, expected_keys: List[str]) -> Dict[str, str]:
+def _translate_text(
+    text: str,
+    client,
+    memory: TranslationMemory,
+) -> Optional[str]:
     """
-    LLM が返したテキストから JSON を抜き出して parse する。
-    - 正常な JSON のとき → そのまま dict で返す
-    - 失敗したとき     → テキスト全体を使ったフォールバックに切り替える
+    1 テキストを翻訳する。翻訳メモリにあればそれを返し、なければ LLM に投げて登録する。
+    LLM が空を返したら None（メモリには登録しない）。
+    LLM 呼び出しの失敗は例外のまま投げる（呼び出し側でセルごとに飛ばす）。
     """
-    raw = (text or "").strip()
-    if not raw:
-        return {}
-
-    # ```json ... ``` を剥がす
-    if raw.startswith("```"):
-        lines = raw.splitlines()
-        if len(lines) >= 2:
-            if lines[-1].strip().startswith("```"):
-                lines = lines[1:-1]
-            else:
-                lines = lines[1:]
-            raw = "\n".join(lines).strip()
-
-    # { ... } の範囲だけ抜き出す（余計な前後が付いていても対応）
-    json_str = raw
-    start = raw.find("{")
-    end = raw.rfind("}")
-    if start != -1 and end != -1 and start < end:
-        json_str = raw[start : end + 1]
-
-    # まずはちゃんと JSON として読めるか試す
-    try:
-        data = json.loads(json_str)
-        if isinstance(data, dict):
-            return {k: ("" if v is None else str(v)) for k, v in data.items()}
-    except Exception as e:  # noqa: BLE001
-        # JSON として読めなかったときはフォールバックに任せる
-        logger.debug("Failed to parse translation JSON: %s", e)
-
-    # 単一列なら「全文＝その列の訳」でいい
-    if len(expected_keys) == 1:
-        return {expected_keys[0]: raw}
-
-    # 複数列なら、行ごとに順番に割り当てるだけのシンプル戦略
-    lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
-    out: Dict[str, str] = {}
-    for i, key in enumerate(expected_keys):
-        out[key] = lines[i] if i < len(lines) else ""
+    cached = memory.get(text)
+    get_run_metrics().record_cache("translation_memory", hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    llm_text = client.generate(
+        _build_translation_prompt(text),
+        max_tokens=LLM_TRANSLATION_MAX_TOKENS,
+    )
+    translated = (llm_text or "").strip()
+    if not translated:
+        return None
+    memory.put(text, translated)
+    return translated
 
+
+def parse_row_specs(specs: Sequence[str] | None) -> Set[Tuple[str, Optional[str]]]:
+    """
+    --rows の指定（"S001" / "S001:Q3"）を {(student_id, question or None)} にする。
+    カンマ区切りも受け付ける。
+    """
+    out: Set[Tuple[str, Optional[str]]] = set()
+    for spec in specs or []:
+        for item in str(spec).split(","):
+            item = item.strip()
+            if not item:
+                continue
+            sid, _, q = item.partition(":")
+            out.add((sid.strip(), q.strip() or None))
     return out
 
 
+def _load_suspected(
+    ai_likeness_csv: Path,
+    threshold: float,
+) -> Set[Tuple[str, Optional[str]]]:
+    """
+    ai_likeness.csv から「AI疑惑あり」の (student_id, question) を集める。
+    （受験者単位のシートでは _row_mask が student_id だけで照合する）
+    """
+    if not ai_likeness_csv.exists():
+        logger.warning(
+            "AI likeness file %s not found; --only-suspected selects no rows.",
+            ai_likeness_csv,
+        )
+        return set()
+
+    df = pd.read_csv(ai_likeness_csv)
+    df = df[df["ai_likeness_score"] >= threshold]
+    sids = df["student_id"].astype(str)
+    qs = df["question"].astype(str)
+    return set(zip(sids, qs))
+
+
+def _row_mask(
+    df: pd.DataFrame,
+    selected: Set[Tuple[str, Optional[str]]],
+) -> pd.Series:
+    """
+    selected に入っている行だけ True にする。
+    - question 列のあるシートは (student_id, question) か (student_id, None) で一致
+    - question 列のないシート（受験者単位）は student_id だけで一致
+    """
+    if "student_id" not in df.columns:
+        # 受験者に紐づかないシートは絞り込めないので全部訳す
+        return pd.Series(True, index=df.index)
+
+    sids = df["student_id"].astype(str)
+    whole_students = {sid for sid, q in selected if q is None}
+    mask = sids.isin(whole_students)
+    if "question" in df.columns:
+        pairs = {(sid, q) for sid, q in selected if q is not None}
+        keys = pd.Series(list(zip(sids, df["question"].astype(str))), index=df.index)
+        mask |= keys.isin(pairs)
+    else:
+        mask |= sids.isin({sid for sid, _ in selected})
+    return mask
+
+
 def run_translate_reports(
     output_dir: Path,
     model_name: str = "gpt-oss:20b",
     llm_provider: str = "ollama",
     log_path: Path | str = Path("logs/app.log"),
     inplace: bool = False,
+    only_suspected: bool = False,
+    rows: Sequence[str] | None = None,
+    memory_path: Path | str = TRANSLATION_MEMORY_PATH,
+    ai_likeness_csv: Path = Path("data/intermediate/features/ai_likeness.csv"),
+    suspect_threshold: float = AI_SUSPECT_THRESHOLD,
 ) -> None:
     """
     採点後に生成された Excel レポート群を日本語化する後処理パイプライン。
@@ -188,6 +240,11 @@ def run_translate_reports(
         - sheet 'suspected', 'full_features' の
           answer_text, answer_text_x, answer_text_y, ai_likeness_comment
           → *_ja 列
+
+    翻訳はすべて翻訳メモリ（memory_path の SQLite）を通す。同じ原文は 2 回目以降 LLM を呼ばない。
+    only_suspected / rows を指定すると、その行だけ訳す（それ以外の *_ja は空欄のまま）。
+      - only_suspected: ai_likeness_score >= suspect_threshold の (受験者, 設問)
+      - rows: "S001"（その受験者の全行）/ "S001:Q3"（その設問だけ）
     """
     setup_logging(log_path)
     logger.info(
@@ -200,6 +257,19 @@ def run_translate_reports(
 
     output_dir = Path(output_dir)
 
+    # 訳す行の絞り込み（None なら全行）
+    selected: Set[Tuple[str, Optional[str]]] | None = None
+    if only_suspected or rows:
+        selected = parse_row_specs(rows)
+        if only_suspected:
+            selected |= _load_suspected(Path(ai_likeness_csv), suspect_threshold)
+        logger.info(
+            "Selective translation: %d selectors (only_suspected=%s, threshold=%.2f)",
+            len(selected),
+            only_suspected,
+            suspect_threshold,
+        )
+
     # 2GPU対応の Ollama クライアント（プール）を取得
     client = get_ollama_client()
     logger.info(
@@ -208,122 +278,130 @@ def run_translate_reports(
         LLM_TRANSLATION_TIMEOUT,
     )
 
-    for filename, sheet_map in TRANSLATION_TARGETS.items():
-        src_path = output_dir / filename
-        if not src_path.exists():
-            logger.info("Skip %s (not found)", src_path)
-            continue
+    memory = TranslationMemory(
+        memory_path,
+        model=OLLAMA_DEFAULT_MODEL,
+        prompt_version=TRANSLATION_PROMPT_VERSION,
+    )
+    logger.info(
+        "Using translation memory %s (%d entries for model=%s, prompt=%s)",
+        memory.path,
+        len(memory),
+        memory.model,
+        memory.prompt_version,
+    )
 
-        logger.info("Translating %s", src_path)
+    with memory:
+        for filename, sheet_map in TRANSLATION_TARGETS.items():
+            src_path = output_dir / filename
+            if not src_path.exists():
+                logger.info("Skip %s (not found)", src_path)
+                continue
 
-        xls = pd.ExcelFile(src_path)
-        new_sheets: Dict[str, pd.DataFrame] = {}
+            logger.info("Translating %s", src_path)
 
-        # 翻訳対象シートを処理
-        for sheet_name, cols in sheet_map.items():
-            if sheet_name not in xls.sheet_names:
-                logger.warning(
-                    "Sheet %s not found in %s; skipping that sheet",
-                    sheet_name,
-                    filename,
-                )
-                continue
+            xls = pd.ExcelFile(src_path)
+            new_sheets: Dict[str, pd.DataFrame] = {}
+
+            # 翻訳対象シートを処理
+            for sheet_name, cols in sheet_map.items():
+                if sheet_name not in xls.sheet_names:
+                    logger.warning(
+                        "Sheet %s not found in %s; skipping that sheet",
+                        sheet_name,
+                        filename,
+                    )
+                    continue
+
+                df = xls.parse(sheet_name=sheet_name)
 
-            df = xls.parse(sheet_name=sheet_name)
+                # 対象列が存在しない場合はスキップ
+                actual_cols = [c for c in cols if c in df.columns]
+                if not actual_cols:
+                    logger.info(
+                        "No target columns in sheet %s of %s; skipping",
+                        sheet_name,
+                        filename,
+                    )
+                    new_sheets[sheet_name] = df
+                    continue
 
-            # 対象列が存在しない場合はスキップ
-            actual_cols = [c for c in cols if c in df.columns]
-            if not actual_cols:
                 logger.info(
-                    "No target columns in sheet %s of %s; skipping",
+                    "Translating sheet %s of %s (columns=%s)",
                     sheet_name,
                     filename,
+                    actual_cols,
                 )
-                new_sheets[sheet_name] = df
-                continue
 
-            logger.info(
-                "Translating sheet %s of %s (columns=%s)",
-                sheet_name,
-                filename,
-                actual_cols,
-            )
-
-            # *_ja 列を準備
-            for col in actual_cols:
-                ja_col = f"{col}_ja"
-                if ja_col not in df.columns:
-                    df[ja_col] = ""
-
-            # 各行ごとに JSON を投げて翻訳
-            total_rows = len(df)
-            done_rows = 0
-
-            for idx, row in df.iterrows():
-                fields: Dict[str, str] = {}
+                # *_ja 列を準備
                 for col in actual_cols:
-                    val = row[col]
-                    if pd.isna(val):
-                        fields[col] = ""
-                    else:
+                    ja_col = f"{col}_ja"
+                    if ja_col not in df.columns:
+                        df[ja_col] = ""
+
+                target_idx = df.index
+                if selected is not None:
+                    target_idx = df.index[_row_mask(df, selected)]
+
+                # 各行・各列のテキストを翻訳メモリ経由で翻訳
+                total_rows = len(target_idx)
+                done_rows = 0
+
+                for idx in target_idx:
+                    fields: Dict[str, str] = {}
+                    for col in actual_cols:
+                        val = df.at[idx, col]
+                        if pd.isna(val) or not str(val).strip():
+                            continue
                         fields[col] = str(val)
 
-                # すべて空なら翻訳しない
-                if not any(v for v in fields.values()):
-                    continue
+                    # すべて空なら翻訳しない
+                    if not fields:
+                        continue
 
-                done_rows += 1
-                remaining = total_rows - done_rows
-                logger.info(
-                    "[translate] %s[%s] %d/%d (remaining=%d)",
-                    filename,
-                    sheet_name,
-                    done_rows,
-                    total_rows,
-                    remaining,
-                )
-
-                prompt = _build_translation_prompt(fields)
-                try:
-                    llm_text = client.generate(
-                        prompt,
-                        max_tokens=LLM_TRANSLATION_MAX_TOKENS,
-                    )
-                except Exception as e:  # noqa: BLE001
-                    logger.warning(
-                        "LLM translation failed at %s[%d]: %s",
+                    done_rows += 1
+                    logger.info(
+                        "[translate] %s[%s] %d/%d (remaining=%d)",
+                        filename,
                         sheet_name,
-                        idx,
-                        e,
+                        done_rows,
+                        total_rows,
+                        total_rows - done_rows,
                     )
-                    continue
-
-                translated = _parse_json_like(llm_text, expected_keys=actual_cols)
 
-                # *_ja 列に書き込み
-                for col in actual_cols:
-                    ja_col = f"{col}_ja"
-                    if col in translated:
-                        df.at[idx, ja_col] = translated[col]
+                    # *_ja 列に書き込み
+                    for col, text in fields.items():
+                        try:
+                            translated = _translate_text(text, client, memory)
+                        except Exception as e:  # noqa: BLE001
+                            logger.warning(
+                                "LLM translation failed at %s[%d], col=%s: %s",
+                                sheet_name,
+                                idx,
+                                col,
+                                e,
+                            )
+                            continue
+                        if translated is not None:
+                            df.at[idx, f"{col}_ja"] = translated
 
-            new_sheets[sheet_name] = df
+                new_sheets[sheet_name] = df
 
-        # 翻訳対象以外のシートはそのままコピー
-        for sheet_name in xls.sheet_names:
-            if sheet_name not in new_sheets:
-                new_sheets[sheet_name] = xls.parse(sheet_name=sheet_name)
+            # 翻訳対象以外のシートはそのままコピー
+            for sheet_name in xls.sheet_names:
+                if sheet_name not in new_sheets:
+                    new_sheets[sheet_name] = xls.parse(sheet_name=sheet_name)
 
-        # 出力先パス決定
-        if inplace:
-            dst_path = src_path
-        else:
-            dst_path = src_path.with_name(src_path.stem + "_ja" + src_path.suffix)
+            # 出力先パス決定
+            if inplace:
+                dst_path = src_path
+            else:
+                dst_path = src_path.with_name(src_path.stem + "_ja" + src_path.suffix)
 
-        dst_path.parent.mkdir(parents=True, exist_ok=True)
-        with pd.ExcelWriter(dst_path, engine="openpyxl") as writer:
-            for sheet_name, df in new_sheets.items():
-                df.to_excel(writer, index=False, sheet_name=sheet_name)
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            with get_run_metrics().stage("translate:write"):
+                write_excel_streaming(dst_path, new_sheets.items())
 
-        logger.info("Wrote translated report to %s", dst_path)
+            logger.info("Wrote translated report to %s", dst_path)
 
     logger.info("Finished translate-reports pipeline")
@@ -0,0 +1,311 @@
+# src/steam_report_grader/pipelines/watch_pipeline.py
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
+import time
+
+import pandas as pd
+
+from ..utils.logging_utils import setup_logging
+from ..utils.journal import TaskJournal
+from ..utils.llm_task_pool import ScoringTask, run_llm_tasks
+from ..utils.telemetry import get_run_metrics
+from ..io.watch_state import WatchState
+from ..io.raw_response_store import RawResponseStore, raw_response_store_path_for
+from ..io.responses_loader import read_question_columns
+from ..grading.rubric import load_all_rubrics
+from ..grading.absolute_scorer import AbsoluteScorer
+from ..llm.ollama_pool import get_ollama_client
+from .preprocess_pipeline import extract_submission, write_preprocess_outputs
+from .scoring_pipeline import iter_scoring_tasks, score_result_to_row
+from .relative_features_pipeline import journal_path_for
+from .ai_similarity_pipeline import run_ai_similarity
+from .peer_similarity_pipeline import run_peer_similarity
+from ..config import (
+    SCORING_MAX_WORKERS,
+    SCORING_INCLUDE_RELATIVE_FEATURES,
+    WATCH_POLL_INTERVAL_S,
+    WATCH_STATE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _answer_hash(answer_text: str) -> str:
+    return hashlib.sha256(answer_text.encode("utf-8")).hexdigest()
+
+
+def _list_docx(docx_dir: Path) -> Dict[str, Tuple[int, int]]:
+    """
+    docx_dir の .docx → (size, mtime_ns)。Word の一時ファイル（~$xxx.docx）は除く。
+    """
+    files: Dict[str, Tuple[int, int]] = {}
+    for path in docx_dir.glob("*.docx"):
+        if path.name.startswith("~$"):
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            # 一覧を取ってから stat するまでに消えた
+            continue
+        files[path.name] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+class SubmissionWatcher:
+    """
+    docx の入力フォルダを見張って、届いた答案をその場で取り込み・採点するデーモン。
+
+    1 回の poll で:
+      1. 新しい・書き換わった docx を extract_submission で読む
+         （settle=True なら、2 回続けて同じサイズ・更新時刻だったものだけ。コピー途中のファイルを読まない）
+      2. 回答Excel・IDマップ・ID 台帳を書き直す（ID 台帳があるので既存の受験者の ID は変わらない）
+      3. ai-similarity / peer-similarity --incremental で、新しい受験者のぶんだけ類似度を足す
+      4. まだ採点していない（または回答が変わった）(受験者, 設問) だけを採点し、
+         ジャーナル（absolute_scores.journal.jsonl）に 1 件ずつ追記して absolute_scores.csv を書き直す
+    """
+
+    def __init__(
+        self,
+        docx_dir: Path,
+        output_excel_dir: Path,
+        rubric_dir: Path,
+        scores_csv: Path,
+        features_dir: Path,
+        ai_reference_dir: Path,
+        log_path: Path,
+        state_path: Path | str = WATCH_STATE_PATH,
+        max_workers: int = SCORING_MAX_WORKERS,
+        include_relative_features: bool = SCORING_INCLUDE_RELATIVE_FEATURES,
+        similarity: bool = True,
+    ) -> None:
+        self.docx_dir = Path(docx_dir)
+        self.output_excel_dir = Path(output_excel_dir)
+        self.responses_path = self.output_excel_dir / "steam_exam_responses.xlsx"
+        self.rubric_dir = Path(rubric_dir)
+        self.scores_csv = Path(scores_csv)
+        self.features_dir = Path(features_dir)
+        self.ai_reference_dir = Path(ai_reference_dir)
+        self.log_path = Path(log_path)
+        self.max_workers = max_workers
+        self.include_relative_features = include_relative_features
+        self.similarity = similarity
+
+        self.state = WatchState(state_path)
+        self.journal = TaskJournal(journal_path_for(self.scores_csv))
+        self.raw_store = RawResponseStore(raw_response_store_path_for(self.scores_csv))
+        self.scored = self.journal.load()
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._scorer: Optional[AbsoluteScorer] = None
+        self._scoring_incomplete = False
+
+    def close(self) -> None:
+        self.journal.close()
+        self.raw_store.close()
+        self.state.close()
+
+    # ---- 1. 取り込み ----
+
+    def ingest(self, settle: bool = True) -> bool:
+        """
+        新しい・書き換わった・消えた docx を state に反映する。何か変わったら True。
+        """
+        current = _list_docx(self.docx_dir)
+        known = self.state.known()
+        changed = False
+
+        removed = sorted(set(known) - set(current))
+        if removed:
+            logger.info("Removed submissions: %s", ", ".join(removed))
+            self.state.remove(removed)
+            changed = True
+
+        for name in sorted(current):
+            stat = current[name]
+            if known.get(name) == stat:
+                continue
+            if settle and self._pending.get(name) != stat:
+                # まだ書き込み中かもしれないので、次の poll で同じなら読む
+                self._pending[name] = stat
+                continue
+            self._pending.pop(name, None)
+
+            try:
+                submission = extract_submission(self.docx_dir / name)
+            except Exception as e:
+                logger.exception("Failed to ingest %s: %s", name, e)
+                self.state.put_failed(name, *stat)
+                continue
+            self.state.put_ok(name, stat[0], stat[1], submission)
+            logger.info("Ingested %s (name=%s)", name, submission.get("name"))
+            changed = True
+        return changed
+
+    # ---- 2. 回答Excel ----
+
+    def write_responses(self) -> bool:
+        submissions = self.state.submissions()
+        if not submissions:
+            logger.warning("No readable submissions in %s yet", self.docx_dir)
+            return False
+        write_preprocess_outputs(submissions, self.output_excel_dir)
+        return True
+
+    # ---- 3. 類似度 ----
+
+    def update_similarity(self) -> None:
+        try:
+            run_ai_similarity(
+                responses_excel=self.responses_path,
+                ai_reference_dir=self.ai_reference_dir,
+                output_csv=self.features_dir / "ai_similarity.csv",
+                log_path=self.log_path,
+                index_path=self.features_dir / "ai_similarity_index.sqlite",
+            )
+            run_peer_similarity(
+                responses_excel=self.responses_path,
+                per_student_output_csv=self.features_dir / "peer_similarity_per_student.csv",
+                pair_output_csv=self.features_dir / "peer_similarity_pairs.csv",
+                log_path=self.log_path,
+                index_path=self.features_dir / "peer_similarity_index.sqlite",
+                incremental=True,
+            )
+        except Exception as e:
+            # 類似度は締切後にまとめて出し直せるので、デーモンは止めない
+            logger.exception("Similarity update failed: %s", e)
+
+    # ---- 4. 採点 ----
+
+    def _get_scorer(self) -> AbsoluteScorer:
+        if self._scorer is None:
+            self._scorer = AbsoluteScorer(
+                get_ollama_client(),
+                include_relative_features=self.include_relative_features,
+            )
+        return self._scorer
+
+    def score_pending(self) -> None:
+        with get_run_metrics().stage("watch:load"):
+            questions = read_question_columns(self.responses_path)
+            rubrics = load_all_rubrics(self.rubric_dir, questions)
+        tasks = list(iter_scoring_tasks(self.responses_path, questions, rubrics))
+
+        todo: List[ScoringTask] = [
+            t
+            for t in tasks
+            if self.scored.get((t.student_id, t.question_label), {}).get("answer_hash")
+            != _answer_hash(t.answer_text)
+        ]
+        logger.info(
+            "Scoring %d new/changed answer(s) (%d already scored)",
+            len(todo),
+            len(tasks) - len(todo),
+        )
+
+        self._scoring_incomplete = False
+        if todo:
+            scorer = self._get_scorer()
+            n_done = 0
+            for task, res in run_llm_tasks(
+                todo,
+                lambda task: scorer.score_answer(task.student_id, task.rubric, task.answer_text),
+                max_workers=self.max_workers,
+                tag="watch-score",
+            ):
+                row = score_result_to_row(res, self.include_relative_features, self.raw_store)
+                row["answer_hash"] = _answer_hash(task.answer_text)
+                self.journal.append(row)
+                self.scored[self.journal.key_of(row)] = row
+                n_done += 1
+            # ジャーナルの行が指すハッシュより先に本文を確定しておく
+            self.raw_store.commit()
+            # 失敗したタスクは次の poll でもう一度試す
+            self._scoring_incomplete = n_done < len(todo)
+
+        # 今ある (受験者, 設問) のぶんだけ、回答シートの順で CSV にする
+        rows = [
+            self.scored[(t.student_id, t.question_label)]
+            for t in tasks
+            if (t.student_id, t.question_label) in self.scored
+        ]
+        if not rows:
+            return
+        out_df = pd.DataFrame(rows).drop(columns=["answer_hash"], errors="ignore")
+        self.scores_csv.parent.mkdir(parents=True, exist_ok=True)
+        with get_run_metrics().stage("watch:write"):
+            out_df.to_csv(self.scores_csv, index=False, encoding="utf-8-sig")
+        logger.info("Wrote scores to %s (rows=%d)", self.scores_csv, len(out_df))
+
+    # ---- ループ ----
+
+    def poll_once(self, settle: bool = True) -> bool:
+        changed = self.ingest(settle=settle)
+        if changed and self.write_responses() and self.similarity:
+            self.update_similarity()
+        if (changed or self._scoring_incomplete) and self.responses_path.exists():
+            self.score_pending()
+        return changed
+
+
+def run_watch(
+    docx_dir: Path,
+    output_excel_dir: Path,
+    rubric_dir: Path,
+    scores_csv: Path,
+    features_dir: Path,
+    ai_reference_dir: Path,
+    log_path: Path,
+    poll_interval: float = WATCH_POLL_INTERVAL_S,
+    until: Optional[datetime] = None,
+    once: bool = False,
+    state_path: Path | str = WATCH_STATE_PATH,
+    max_workers: int = SCORING_MAX_WORKERS,
+    include_relative_features: bool = SCORING_INCLUDE_RELATIVE_FEATURES,
+    similarity: bool = True,
+) -> None:
+    """
+    docx_dir を poll_interval 秒ごとに見張り、届いた答案を取り込んで採点・類似度まで済ませる。
+    締切（until）を過ぎるか Ctrl+C で止まる。once=True なら今ある答案を 1 回処理して終わる。
+
+    締切後に残るのは、受験者全体を見る段（ai-cluster / plagiarism-rings / ai-likeness /
+    relative-ranking / summary / explain / final-report など）だけ。
+    """
+    setup_logging(log_path)
+    logger.info(
+        "Start watch (docx_dir=%s, poll_interval=%.1fs, until=%s, once=%s)",
+        docx_dir,
+        poll_interval,
+        until,
+        once,
+    )
+
+    watcher = SubmissionWatcher(
+        docx_dir=docx_dir,
+        output_excel_dir=output_excel_dir,
+        rubric_dir=rubric_dir,
+        scores_csv=scores_csv,
+        features_dir=features_dir,
+        ai_reference_dir=ai_reference_dir,
+        log_path=log_path,
+        state_path=state_path,
+        max_workers=max_workers,
+        include_relative_features=include_relative_features,
+        similarity=similarity,
+    )
+    try:
+        while True:
+            watcher.poll_once(settle=not once)
+            if once:
+                break
+            if until is not None and datetime.now() >= until:
+                logger.info("Reached deadline %s; stopping watch", until)
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        logger.info("Watch interrupted; stopping")
+    finally:
+        watcher.close()
@@ -5,3 +5,13 @@ def generate_student_id(index: int, prefix: str = "S") -> str:
     1 -> S001, 12 -> S012 みたいな形式で ID を作る。
     """
     return f"{prefix}{index:03d}"
+
+
+def parse_student_id(student_id: str, prefix: str = "S") -> int | None:
+    """
+    generate_student_id の逆。S012 -> 12。形式が違えば None。
+    """
+    if not student_id.startswith(prefix):
+        return None
+    digits = student_id[len(prefix):]
+    return int(digits) if digits.isdigit() else None
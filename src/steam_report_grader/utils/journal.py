@@ -0,0 +1,128 @@
+# src/steam_report_grader/utils/journal.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskJournal:
+    """
+    1 レコード = 1 行の JSONL ジャーナル。
+    LLM を 1 件回すたびに追記しておき、途中で落ちても --resume で続きから再開できるようにする。
+
+        with TaskJournal(path) as journal:
+            done = journal.load()          # {(student_id, question): record}
+            journal.append(record)
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        key_fields: Iterable[str] = ("student_id", "question"),
+    ) -> None:
+        self.path = Path(path)
+        self.key_fields = tuple(key_fields)
+        self._fh = None
+
+    def __enter__(self) -> "TaskJournal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def key_of(self, record: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(record.get(k, "")) for k in self.key_fields)
+
+    def load(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        """
+        既存のジャーナルを読む。同じキーが複数回あれば後勝ち。
+        書きかけで壊れた最終行（強制終了時など）は読み飛ばす。
+        """
+        records: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        if not self.path.exists():
+            return records
+
+        with self.path.open("r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        "Skip broken journal line %s:%d", self.path, lineno
+                    )
+                    continue
+                records[self.key_of(rec)] = rec
+
+        logger.info("Loaded %d records from journal %s", len(records), self.path)
+        return records
+
+    def reset(self) -> None:
+        """
+        ジャーナルを空にする（--resume なしで最初からやり直すとき）。
+        """
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text("", encoding="utf-8")
+
+    def _repair_tail(self) -> None:
+        """
+        最終行が改行で終わっていない（書きかけで落ちた）なら、追記の前に直しておく。
+        そのままだと次に追記したレコードが壊れた行の続きになり、その行ごと読み飛ばされる。
+        - 残りが JSON として読めるなら改行だけ足す
+        - 読めない書きかけなら直前の改行まで切り詰める
+        """
+        if not self.path.exists():
+            return
+        with self.path.open("rb+") as f:
+            size = f.seek(0, 2)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # 最後の改行を後ろから探す（壊れているのは最終行だけなので、読むのは末尾だけ）
+            pos = size
+            tail = b""
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+                nl = tail.rfind(b"\n")
+                if nl >= 0:
+                    pos += nl + 1
+                    tail = tail[nl + 1:]
+                    break
+
+            try:
+                json.loads(tail.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                f.truncate(pos)
+                logger.warning(
+                    "Dropped a torn last line (%d bytes) from journal %s", len(tail), self.path
+                )
+            else:
+                f.seek(size)
+                f.write(b"\n")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._repair_tail()
+            self._fh = self.path.open("a", encoding="utf-8")
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # 1 件ごとに flush して、落ちてもそこまでは残るようにする
+        self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,167 @@
+# src/steam_report_grader/utils/llm_task_pool.py
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, TypeVar
+import logging
+import time
+
+from .telemetry import get_run_metrics
+from .progress import ProgressLogger
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+@dataclass
+class ScoringTask:
+    """
+    LLM に投げる 1 件ぶんの仕事（受験者 × 設問）。
+    score / relative-features で共通に使う。rubric は採点のときだけ使う。
+    """
+    student_id: str
+    question_label: str
+    answer_text: str
+    rubric: Any = None
+
+
+def run_llm_tasks(
+    tasks: Sequence[ScoringTask],
+    worker: Callable[[ScoringTask], R],
+    max_workers: int,
+    tag: str,
+) -> Iterator[Tuple[ScoringTask, R]]:
+    """
+    tasks を max_workers 本のスレッドで worker に流し、終わった順に (task, 結果) を返す。
+
+    - LLM クライアントは 2GPU プール（get_ollama_client）を共有する前提なので
+      スレッド数 = 同時に投げるリクエスト数の上限
+      （適応制御が有効なら、実際の同時数はバックエンドごとのリミッタが決める）
+    - worker が例外を出したタスクはログに残して飛ばす（呼び出し側には返さない）
+    - 進捗は "[tag] i/total (remaining=...)" の形式で、PROGRESS_LOG_EVERY_N 件か
+      PROGRESS_LOG_EVERY_S 秒ごとに INFO に出す（1 件ごとの行は DEBUG）
+    """
+    total = len(tasks)
+    logger.info("Total %s tasks: %d", tag, total)
+    logger.info("Using %d workers", max_workers)
+
+    metrics = get_run_metrics()
+
+    def _timed(task: ScoringTask, submitted: float) -> R:
+        # プールの空き待ち時間（ワーカー数が足りないと伸びる）
+        metrics.record_queue_wait(tag, time.perf_counter() - submitted)
+        return worker(task)
+
+    with metrics.stage(f"{tag}:llm"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_task = {
+            executor.submit(_timed, task, time.perf_counter()): task
+            for task in tasks
+        }
+
+        progress = ProgressLogger(tag, total=total, logger=logger)
+        for future in as_completed(future_to_task):
+            task = future_to_task[future]
+            try:
+                res = future.result()
+            except Exception as e:  # noqa: BLE001
+                logger.exception(
+                    "Failed to %s %s %s: %s",
+                    tag,
+                    task.student_id,
+                    task.question_label,
+                    e,
+                )
+                res = None
+
+            # 進捗ログ（残り件数込み、間引いて出す）
+            progress.step(f"sid={task.student_id} q={task.question_label}", ok=res is not None)
+
+            if res is not None:
+                yield task, res
+
+    _log_concurrency(tag)
+
+
+def run_llm_task_stream(
+    tasks: Iterable[ScoringTask],
+    worker: Callable[[ScoringTask], R],
+    max_workers: int,
+    tag: str,
+    prefetch: Optional[int] = None,
+) -> Iterator[Tuple[ScoringTask, R]]:
+    """
+    run_llm_tasks の、全件そろう前から流し始める版。
+    tasks はジェネレータでよく（キューから取り出しながら作る、など）、
+    取り出したぶんから max_workers 本のスレッドで worker に流し、終わった順に (task, 結果) を返す。
+
+    - プールに入れておく件数は prefetch（既定 max_workers * 2）まで。
+      それ以上は tasks から取り出さないので、上流のキューに背圧がかかる
+    - 例外の扱い・進捗ログは run_llm_tasks と同じ（総数は分からないので件数だけ出す）
+    """
+    if prefetch is None:
+        prefetch = max_workers * 2
+    logger.info("Streaming %s tasks (workers=%d, prefetch=%d)", tag, max_workers, prefetch)
+
+    metrics = get_run_metrics()
+
+    def _timed(task: ScoringTask, submitted: float) -> R:
+        metrics.record_queue_wait(tag, time.perf_counter() - submitted)
+        return worker(task)
+
+    with metrics.stage(f"{tag}:llm"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Dict[Future, ScoringTask] = {}
+        source = iter(tasks)
+        exhausted = False
+        progress = ProgressLogger(tag, logger=logger)
+
+        while pending or not exhausted:
+            # 空きがあるだけ tasks から取り出して投入する（上流が詰まっていればここで待つ）
+            while not exhausted and len(pending) < prefetch:
+                try:
+                    task = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(_timed, task, time.perf_counter())] = task
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    res = future.result()
+                except Exception as e:  # noqa: BLE001
+                    logger.exception(
+                        "Failed to %s %s %s: %s",
+                        tag,
+                        task.student_id,
+                        task.question_label,
+                        e,
+                    )
+                    res = None
+
+                progress.step(
+                    f"sid={task.student_id} q={task.question_label} in_flight={len(pending)}",
+                    ok=res is not None,
+                )
+
+                if res is not None:
+                    yield task, res
+
+    _log_concurrency(tag)
+
+
+def _log_concurrency(tag: str) -> None:
+    metrics = get_run_metrics()
+    if metrics.concurrency:
+        logger.info(
+            "Concurrency limits after %s: %s",
+            tag,
+            ", ".join(
+                f"{backend}={c['final']} (range {c['min']}-{c['max']}, changes={c['changes']})"
+                for backend, c in sorted(metrics.concurrency.items())
+            ),
+        )
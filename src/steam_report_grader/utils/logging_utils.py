@@ -1,8 +1,120 @@
 # src/steam_report_grader/utils/logging_utils.py
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+from ..config import (
+    LOG_QUEUE_MODE,
+    LOG_FILE_FLUSH_RECORDS,
+    LOG_FILE_FLUSH_INTERVAL_S,
+)
+
+# queue モードのときの QueueListener（プロセスに 1 つ）
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    1 行ごとに flush せず、flush_records 行たまるか flush_interval_s 秒たつか
+    WARNING 以上が来たときにまとめて書く FileHandler。
+    QueueListener のスレッドだけが書くので、ワーカーのスレッドは待たされない。
+    """
+
+    def __init__(
+        self,
+        filename: Path | str,
+        flush_records: int = LOG_FILE_FLUSH_RECORDS,
+        flush_interval_s: float = LOG_FILE_FLUSH_INTERVAL_S,
+        encoding: str = "utf-8",
+    ) -> None:
+        super().__init__(filename, encoding=encoding)
+        self.flush_records = max(1, flush_records)
+        self.flush_interval_s = flush_interval_s
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if (
+                self._pending >= self.flush_records
+                or record.levelno >= logging.WARNING
+                or time.monotonic() - self._last_flush >= self.flush_interval_s
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        super().flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler はキューに入れるだけなので、Handler のロックを取らずに入れる
+    （スレッドが増えてもロックの取り合いにならない）。
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    ログが flush_interval_s 秒来なければ、たまっている分をファイルに書き出す QueueListener
+    （watch のように暇な時間が長いときも、ログファイルが止まって見えないように）。
+    """
+
+    def __init__(self, log_queue, *handlers, flush_interval_s: float = LOG_FILE_FLUSH_INTERVAL_S):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval_s = flush_interval_s
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval_s)
+            except queue.Empty:
+                for h in self.handlers:
+                    h.flush()
+
+
+def stop_logging() -> None:
+    """
+    queue モードのリスナーを止める（キューに残っているログを書き切ってから止まる）。
+    プロセス終了時には atexit から呼ばれる。
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.flush()
+        _listener = None
+
+
+def setup_logging(log_path: Path | str, queue_mode: bool = LOG_QUEUE_MODE) -> None:
+    """
+    root ロガーにファイル（log_path）とコンソールへの出力を付ける。2 回目以降は何もしない。
+
+    queue_mode=True なら、root には QueueHandler だけを付け、実際の書き込みは
+    QueueListener のスレッドがまとめて行う（ファイルは BatchedFileHandler でまとめ書き）。
+    採点ワーカーなど多数のスレッドがログを出しても、書き込みやコンソール出力を待たない。
+    """
+    global _listener
 
-def setup_logging(log_path: Path | str) -> None:
     log_path = Path(log_path)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -18,10 +130,78 @@ def setup_logging(log_path: Path | str) -> None:
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    fh = logging.FileHandler(log_path, encoding="utf-8")
+    if queue_mode:
+        fh = BatchedFileHandler(log_path)
+    else:
+        fh = logging.FileHandler(log_path, encoding="utf-8")
     fh.setFormatter(fmt)
-    logger.addHandler(fh)
 
     ch = logging.StreamHandler()
     ch.setFormatter(fmt)
-    logger.addHandler(ch)
+
+    if not queue_mode:
+        logger.addHandler(fh)
+        logger.addHandler(ch)
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(_NonBlockingQueueHandler(log_queue))
+    _listener = _FlushingQueueListener(log_queue, fh, ch)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+class _ForwardToRootHandler(logging.Handler):
+    """
+    ワーカープロセスから届いたログを、親プロセスの root ロガーのハンドラに渡す。
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger().handle(record)
+
+
+def _init_worker_logging(log_queue, level: int) -> None:
+    """
+    ProcessPoolExecutor の initializer。fork で引き継いだ root のハンドラ
+    （queue モードなら読み手のいない SimpleQueue 行きの QueueHandler）を外し、
+    親のリスナーが読んでいる multiprocessing のキューへ送る QueueHandler に付け替える。
+    """
+    global _listener
+    _listener = None
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_NonBlockingQueueHandler(log_queue))
+    root.setLevel(level)
+
+
+@contextmanager
+def worker_logging() -> Iterator[Tuple[Optional[Callable[..., None]], tuple]]:
+    """
+    プロセスプールのワーカーのログを、親プロセスのログファイル・コンソールに流すための
+    (initializer, initargs) を返す。with を抜けるとき、残ったログを書き切ってから止まる。
+
+        with worker_logging() as (init, initargs), ProcessPoolExecutor(
+            max_workers=n, initializer=init, initargs=initargs
+        ) as executor:
+            ...
+
+    ワーカーは fork で root のハンドラを引き継ぐが、queue モードの QueueListener のスレッドは
+    引き継がれないので、そのままだとワーカーのログはどこにも書かれない。
+    setup_logging がまだ呼ばれていなければ何もしない（initializer=None）。
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        yield None, ()
+        return
+
+    log_queue = multiprocessing.get_context().Queue()
+    listener = logging.handlers.QueueListener(log_queue, _ForwardToRootHandler())
+    listener.start()
+    try:
+        yield _init_worker_logging, (log_queue, root.level)
+    finally:
+        listener.stop()
+        log_queue.close()
+        log_queue.join_thread()
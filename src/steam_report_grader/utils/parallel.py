@@ -0,0 +1,57 @@
+# src/steam_report_grader/utils/parallel.py
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Sequence, Tuple, TypeVar
+import logging
+import os
+
+from .logging_utils import worker_logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def resolve_jobs(jobs: int | None) -> int:
+    """
+    --jobs の値を実際のプロセス数に直す。
+    - None / 1 → 1（逐次実行）
+    - 0 以下   → CPU コア数
+    """
+    if jobs is None:
+        return 1
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def map_per_question(
+    func: Callable[[str, T], R],
+    tasks: Sequence[Tuple[str, T]],
+    jobs: int | None = 1,
+) -> List[R]:
+    """
+    設問ごとに独立した処理 func(question, payload) を jobs 個のプロセスで回し、
+    tasks と同じ順番で結果を返す。
+
+    - func はプロセスに渡すのでモジュールトップレベルの関数にすること
+    - payload にはその設問の列（student_id, answer など）だけを入れて渡す
+    - jobs=1（または設問が 1 つ）のときはプロセスを作らずその場で逐次実行
+    """
+    n_jobs = min(resolve_jobs(jobs), len(tasks))
+    if n_jobs <= 1:
+        return [func(q, payload) for q, payload in tasks]
+
+    logger.info(
+        "Running %d question tasks on %d processes",
+        len(tasks),
+        n_jobs,
+    )
+    with worker_logging() as (init, initargs), ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=init, initargs=initargs
+    ) as executor:
+        futures = [executor.submit(func, q, payload) for q, payload in tasks]
+        # 投入順に result() を取るので、マージ順は常に設問順
+        return [f.result() for f in futures]
@@ -1,7 +1,14 @@
 # src/steam_report_grader/utils/progress.py
 from contextlib import contextmanager
 from typing import Iterable, Iterator
+import logging
 import sys
+import threading
+import time
+
+from ..config import PROGRESS_LOG_EVERY_N, PROGRESS_LOG_EVERY_S
+
+_logger = logging.getLogger(__name__)
 
 def simple_progress(iterable: Iterable, total: int | None = None, prefix: str = "") -> Iterator:
     """
@@ -22,3 +29,80 @@ def simple_progress(iterable: Iterable, total: int | None = None, prefix: str =
         sys.stdout.flush()
         yield item
     sys.stdout.write("\n")
+
+
+class ProgressLogger:
+    """
+    並列タスクの進捗を、1 件ごとではなく every_n 件ごとか every_s 秒ごとに INFO で出す。
+    最後の 1 件（i == total）は必ず出す。1 件ごとの詳細は DEBUG に出す。
+    ワーカーが増えても INFO の行数は増えないので、ログの負荷が並列数によらず一定になる。
+
+        progress = ProgressLogger("score", total=len(tasks))
+        for task, res in ...:
+            progress.step(f"sid={task.student_id} q={task.question_label}")
+    """
+
+    def __init__(
+        self,
+        tag: str,
+        total: int | None = None,
+        every_n: int = PROGRESS_LOG_EVERY_N,
+        every_s: float = PROGRESS_LOG_EVERY_S,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.tag = tag
+        self.total = total
+        self.every_n = max(1, every_n)
+        self.every_s = every_s
+        self.logger = logger or _logger
+        self.done = 0
+        self.failed = 0
+        self._start = time.monotonic()
+        self._last_log = self._start
+        self._lock = threading.Lock()
+
+    def step(self, detail: str = "", ok: bool = True) -> None:
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            done, failed = self.done, self.failed
+            now = time.monotonic()
+            due = (
+                done % self.every_n == 0
+                or now - self._last_log >= self.every_s
+                or done == self.total
+            )
+            if due:
+                self._last_log = now
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("[%s] %d %s", self.tag, done, detail)
+        if not due:
+            return
+
+        elapsed = now - self._start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            remaining = self.total - done
+            eta = remaining / rate if rate > 0 else float("nan")
+            self.logger.info(
+                "[%s] %d/%d (remaining=%d, failed=%d, %.1f/s, eta=%.0fs) last: %s",
+                self.tag,
+                done,
+                self.total,
+                remaining,
+                failed,
+                rate,
+                eta,
+                detail,
+            )
+        else:
+            self.logger.info(
+                "[%s] %d (failed=%d, %.1f/s) last: %s",
+                self.tag,
+                done,
+                failed,
+                rate,
+                detail,
+            )
@@ -0,0 +1,276 @@
+# src/steam_report_grader/utils/telemetry.py
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+import json
+import threading
+import time
+
+# LLM 1 回あたりのレイテンシのヒストグラムの境界（秒）
+LATENCY_BUCKETS_S: List[float] = [0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300]
+
+
+def _histogram(values: List[float]) -> Dict[str, int]:
+    """
+    {"<=0.5": n, "<=1": n, ..., ">300": n} の形にする。
+    """
+    # numpy は集計するときだけ読む（CLI の起動時間に効くので）
+    import numpy as np
+
+    counts = np.histogram(
+        values,
+        bins=[0.0] + LATENCY_BUCKETS_S + [float("inf")],
+    )[0] if values else np.zeros(len(LATENCY_BUCKETS_S) + 1, dtype=int)
+    labels = [f"<={b:g}" for b in LATENCY_BUCKETS_S] + [f">{LATENCY_BUCKETS_S[-1]:g}"]
+    return {label: int(c) for label, c in zip(labels, counts)}
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    import numpy as np
+
+    arr = np.asarray(values, dtype=float)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p90": round(float(np.percentile(arr, 90)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+def _rate(count: int, duration_ns: int) -> Optional[float]:
+    # トークン数 / 秒（Ollama の *_duration はナノ秒）
+    if not duration_ns:
+        return None
+    return round(count / (duration_ns / 1e9), 2)
+
+
+class RunMetrics:
+    """
+    1 プロセス（= 1 CLI コマンド）ぶんの計測値を集める入れ物。
+    パイプライン・LLM クライアントはここに記録するだけで、集計と出力は最後にまとめてやる。
+
+    - stage(name)           : ステージごとの経過時間
+    - record_llm_call(...)  : LLM 1 回ぶんのレイテンシ・サイズ・Ollama のトークン統計
+    - record_retry(...)     : リトライ
+    - record_queue_wait(...): ワーカープールで待たされた時間
+    - record_cache(...)     : キャッシュ（翻訳メモリ・ジャーナルなど）のヒット/ミス
+    - record_concurrency(...): 適応制御で決まったバックエンドごとの同時リクエスト数
+    - record_circuit(...)   : サーキットブレーカーの状態遷移
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started_at = datetime.now(ZoneInfo("Asia/Tokyo"))
+        self.stages: List[Dict[str, Any]] = []
+        self.llm_calls: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.retries: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.queue_waits: Dict[str, List[float]] = defaultdict(list)
+        self.cache: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.concurrency: Dict[str, Dict[str, int]] = {}
+        self.circuit: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    # ---- 記録する側 ----
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        status = "success"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            with self._lock:
+                self.stages.append(
+                    {
+                        "stage": name,
+                        "wall_s": round(time.perf_counter() - start, 3),
+                        "status": status,
+                    }
+                )
+
+    def record_llm_call(
+        self,
+        backend: str,
+        latency_s: float,
+        prompt_chars: int,
+        response_chars: int = 0,
+        ok: bool = True,
+        response_json: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        response_json には Ollama /api/generate の応答 JSON をそのまま渡す
+        （prompt_eval_count / eval_count / *_duration を拾う）。
+        """
+        data = response_json or {}
+        call = {
+            "latency_s": latency_s,
+            "prompt_chars": prompt_chars,
+            "response_chars": response_chars,
+            "ok": ok,
+            "prompt_eval_count": int(data.get("prompt_eval_count") or 0),
+            "prompt_eval_duration": int(data.get("prompt_eval_duration") or 0),
+            "eval_count": int(data.get("eval_count") or 0),
+            "eval_duration": int(data.get("eval_duration") or 0),
+            "load_duration": int(data.get("load_duration") or 0),
+            "total_duration": int(data.get("total_duration") or 0),
+        }
+        with self._lock:
+            self.llm_calls[backend].append(call)
+
+    def record_retry(self, backend: str, reason: str) -> None:
+        with self._lock:
+            self.retries[backend][reason] += 1
+
+    def record_queue_wait(self, pool: str, wait_s: float) -> None:
+        with self._lock:
+            self.queue_waits[pool].append(wait_s)
+
+    def record_cache(self, name: str, hit: bool, n: int = 1) -> None:
+        with self._lock:
+            self.cache[name]["hits" if hit else "misses"] += n
+
+    def record_concurrency(self, backend: str, limit: int) -> None:
+        with self._lock:
+            c = self.concurrency.get(backend)
+            if c is None:
+                self.concurrency[backend] = {
+                    "initial": limit,
+                    "final": limit,
+                    "min": limit,
+                    "max": limit,
+                    "changes": 0,
+                }
+                return
+            c["final"] = limit
+            c["min"] = min(c["min"], limit)
+            c["max"] = max(c["max"], limit)
+            c["changes"] += 1
+
+    def record_circuit(self, backend: str, state: str) -> None:
+        with self._lock:
+            self.circuit[backend][state] += 1
+
+    # ---- 集計する側 ----
+
+    def _llm_summary(self, backend: str, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        ok_calls = [c for c in calls if c["ok"]]
+        latencies = [c["latency_s"] for c in ok_calls]
+        prompt_tokens = sum(c["prompt_eval_count"] for c in ok_calls)
+        eval_tokens = sum(c["eval_count"] for c in ok_calls)
+        prefill_ns = sum(c["prompt_eval_duration"] for c in ok_calls)
+        decode_ns = sum(c["eval_duration"] for c in ok_calls)
+        load_ns = sum(c["load_duration"] for c in ok_calls)
+        server_ns = sum(c["total_duration"] for c in ok_calls)
+        client_s = sum(latencies)
+        return {
+            "backend": backend,
+            "calls": len(calls),
+            "errors": len(calls) - len(ok_calls),
+            "retries": sum(self.retries.get(backend, {}).values()),
+            "retry_reasons": dict(self.retries.get(backend, {})),
+            "latency_s": _percentiles(latencies),
+            "latency_histogram": _histogram(latencies),
+            "prompt_chars_total": sum(c["prompt_chars"] for c in calls),
+            "response_chars_total": sum(c["response_chars"] for c in ok_calls),
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": eval_tokens,
+            "prefill_s": round(prefill_ns / 1e9, 3),
+            "decode_s": round(decode_ns / 1e9, 3),
+            "load_s": round(load_ns / 1e9, 3),
+            # クライアントで測った時間のうち、Ollama が処理していなかった時間（待ち行列＋通信）
+            "queue_and_transport_s": round(max(client_s - server_ns / 1e9, 0.0), 3),
+            "prefill_tokens_per_s": _rate(prompt_tokens, prefill_ns),
+            "decode_tokens_per_s": _rate(eval_tokens, decode_ns),
+        }
+
+    def to_dict(self, command: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            llm = [self._llm_summary(b, calls) for b, calls in sorted(self.llm_calls.items())]
+            # 呼び出しは無いがリトライだけ記録されたバックエンド（全部失敗など）
+            for backend in sorted(set(self.retries) - set(self.llm_calls)):
+                llm.append(self._llm_summary(backend, []))
+            return {
+                "command": command,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "stages": list(self.stages),
+                "llm": llm,
+                "queue_wait_s": {
+                    pool: _percentiles(waits) for pool, waits in self.queue_waits.items()
+                },
+                "cache": {name: dict(v) for name, v in self.cache.items()},
+                "concurrency": {b: dict(v) for b, v in sorted(self.concurrency.items())},
+                "circuit": {b: dict(v) for b, v in sorted(self.circuit.items())},
+            }
+
+    def summary_table(self) -> List[Dict[str, Any]]:
+        """
+        audit_log に 1 行で残すための表（ステージ行 + LLM バックエンド行）。
+        """
+        data = self.to_dict()
+        rows: List[Dict[str, Any]] = [
+            {"kind": "stage", "name": s["stage"], "wall_s": s["wall_s"], "status": s["status"]}
+            for s in data["stages"]
+        ]
+        for b in data["llm"]:
+            rows.append(
+                {
+                    "kind": "llm",
+                    "name": b["backend"],
+                    "calls": b["calls"],
+                    "errors": b["errors"],
+                    "retries": b["retries"],
+                    "p50_s": b["latency_s"]["p50"],
+                    "p90_s": b["latency_s"]["p90"],
+                    "prefill_s": b["prefill_s"],
+                    "decode_s": b["decode_s"],
+                    "queue_and_transport_s": b["queue_and_transport_s"],
+                    "decode_tokens_per_s": b["decode_tokens_per_s"],
+                }
+            )
+        for pool, p in data["queue_wait_s"].items():
+            rows.append({"kind": "queue", "name": pool, "p50_s": p["p50"], "p90_s": p["p90"]})
+        for name, c in data["cache"].items():
+            rows.append({"kind": "cache", "name": name, **c})
+        for backend, c in data["concurrency"].items():
+            rows.append({"kind": "concurrency", "name": backend, **c})
+        for backend, c in data["circuit"].items():
+            rows.append({"kind": "circuit", "name": backend, **c})
+        return rows
+
+    def write_json(self, path: Path | str, command: Optional[str] = None) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(self.to_dict(command), ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        return path
+
+
+# プロセス全体で 1 つ（CLI は 1 コマンド = 1 プロセス）
+_run_metrics: RunMetrics | None = None
+_run_metrics_lock = threading.Lock()
+
+
+def get_run_metrics() -> RunMetrics:
+    global _run_metrics
+    with _run_metrics_lock:
+        if _run_metrics is None:
+            _run_metrics = RunMetrics()
+        return _run_metrics
+
+
+def reset_run_metrics() -> RunMetrics:
+    global _run_metrics
+    with _run_metrics_lock:
+        _run_metrics = RunMetrics()
+        return _run_metrics
@@ -0,0 +1,64 @@
+# tests/test_concurrency.py
+import heapq
+import random
+
+import pytest
+
+from src.steam_report_grader.llm import concurrency
+from src.steam_report_grader.llm.concurrency import AdaptiveConcurrencyLimiter
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+def _simulate(monkeypatch, sample_latency, capacity=None, n_requests=3000):
+    """
+    リミッタの枠いっぱいまでリクエストを投げ続ける（スレッドの代わりに時刻を進める）。
+    capacity を指定すると、同時にその件数を超えた分だけレイテンシが伸びる（バックエンドの混雑）。
+    完了ごとの limit の列を返す。
+    """
+    clock = _FakeClock()
+    monkeypatch.setattr(concurrency.time, "perf_counter", clock.perf_counter)
+    limiter = AdaptiveConcurrencyLimiter("http://backend", initial=2, min_limit=1, max_limit=6)
+
+    running = []  # (終わる時刻, 連番, slot)
+    seq = 0
+    limits = []
+    while len(limits) < n_requests:
+        while limiter.inflight < limiter.limit:
+            slot = limiter.slot()
+            slot.__enter__()
+            latency = sample_latency()
+            if capacity is not None:
+                latency *= max(1.0, limiter.inflight / capacity)
+            heapq.heappush(running, (clock.now + latency, seq, slot))
+            seq += 1
+        clock.now, _, slot = heapq.heappop(running)
+        slot.__exit__(None, None, None)
+        limits.append(limiter.limit)
+    return limits
+
+
+@pytest.mark.parametrize("sigma", [0.4, 0.5, 0.8])
+def test_limit_stays_up_under_latency_variance_without_contention(monkeypatch, sigma):
+    rng = random.Random(0)
+    limits = _simulate(monkeypatch, lambda: 0.05 * rng.lognormvariate(0.0, sigma))
+
+    # 空いているなら、ばらつきがあっても上限（6）近くに留まる（1 まで落ちない）
+    tail = limits[-1000:]
+    assert sum(tail) / len(tail) >= 4.5
+    assert min(tail) >= 2
+
+
+def test_limit_backs_off_when_backend_is_contended(monkeypatch):
+    rng = random.Random(0)
+    limits = _simulate(monkeypatch, lambda: 0.05 * rng.lognormvariate(0.0, 0.4), capacity=2)
+
+    # 同時 2 件を超えるとレイテンシが伸びるだけなので、上限（6）には張り付かない
+    tail = limits[-1000:]
+    assert sum(tail) / len(tail) <= 4.5
@@ -0,0 +1,29 @@
+# tests/test_journal.py
+import json
+
+from src.steam_report_grader.utils.journal import TaskJournal
+
+
+def _line(sid):
+    return json.dumps({"student_id": sid, "question": "Q1"}) + "\n"
+
+
+def test_append_after_torn_last_line_keeps_new_record(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text(_line("S1") + '{"student_id": "S2", "quest', encoding="utf-8")
+
+    with TaskJournal(path) as journal:
+        journal.append({"student_id": "S3", "question": "Q1"})
+
+    assert sorted(TaskJournal(path).load()) == [("S1", "Q1"), ("S3", "Q1")]
+    assert path.read_text(encoding="utf-8") == _line("S1") + _line("S3")
+
+
+def test_append_after_complete_line_without_newline(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text(_line("S1") + _line("S2").rstrip("\n"), encoding="utf-8")
+
+    with TaskJournal(path) as journal:
+        journal.append({"student_id": "S3", "question": "Q1"})
+
+    assert sorted(TaskJournal(path).load()) == [("S1", "Q1"), ("S2", "Q1"), ("S3", "Q1")]
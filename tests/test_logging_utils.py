@@ -0,0 +1,52 @@
+# tests/test_logging_utils.py
+import logging
+
+import pytest
+
+from src.steam_report_grader.utils import logging_utils
+from src.steam_report_grader.utils.parallel import map_per_question
+
+
+def _log_in_worker(question, payload):
+    logging.getLogger("worker").info("worker log line %s", question)
+    return payload
+
+
+@pytest.fixture
+def clean_root_logger():
+    """
+    setup_logging はハンドラが付いていると何もしないので、pytest のものも含めて一度外す
+    （pytest は呼び出しの直前にハンドラを付けるので、テストの中で呼ぶ）。
+    """
+    root = logging.getLogger()
+    saved = []
+
+    def clear():
+        for h in list(root.handlers):
+            root.removeHandler(h)
+            saved.append(h)
+
+    yield clear
+    logging_utils.stop_logging()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        h.close()
+    for h in saved:
+        root.addHandler(h)
+
+
+@pytest.mark.parametrize("queue_mode", [True, False])
+def test_worker_log_lines_reach_log_file(tmp_path, clean_root_logger, queue_mode):
+    clean_root_logger()
+    log_path = tmp_path / "run.log"
+    logging_utils.setup_logging(log_path, queue_mode=queue_mode)
+
+    results = map_per_question(_log_in_worker, [("Q1", 1), ("Q2", 2)], jobs=2)
+
+    logging_utils.stop_logging()
+    for h in logging.getLogger().handlers:
+        h.flush()
+    text = log_path.read_text(encoding="utf-8")
+    assert results == [1, 2]
+    assert "worker log line Q1" in text
+    assert "worker log line Q2" in text